@@ -1,3 +1,5 @@
+import columnar
+import compact
 from ciphers import Cipher
 from polybius_square import PolybiusSquare
 
@@ -25,21 +27,11 @@ class Adfgvx(Cipher):
         '''Takes a string and returns an encrypted string
         '''
         # get the (A,D) (F,G) etc ciphertext using the custom polybius
-        self.polybius_text = self.polybius_cipher.encrypt(plaintext)
+        polybius_text = self.polybius_cipher.encrypt(plaintext)
 
-        # create keyphrase columns and take each character from the
-        # polybius_text and put it into keyphrase_columns
-        self._populate_keyphrase_columns()
-
-        # sort the columns alphabetically
-        self.keyphrase_columns.sort()
-
-        # take the letters from the columns and create a single long list
-        # of characters
-        ciphertext = ""
-        for column in self.keyphrase_columns:
-            for character in column[1:]:
-                ciphertext += character
+        # write it out in rows under the keyphrase and read the columns
+        # out in alphabetical order (see columnar.py)
+        ciphertext = columnar.transpose(polybius_text, self._headings())
 
         # perform grouping
         grouped_text = self._group_text(ciphertext)
@@ -50,63 +42,40 @@ class Adfgvx(Cipher):
         '''
         # ungroup text
         ungrouped_text = self._ungroup_text(ciphertext)
-        # create sorted columns
-        columns = self._create_cols_kp_chars(self.keyphrase)
-        sorted_columns = sorted(columns)
-
-        # populate columns
-        # (fill each column vertically)
-        # (note, some columns will be shorter than others if ciphertext length
-        # is not a multiple of unique_length)
-        # need to know when repopulating the columns which position each
-        # column will be in once unsorted
-        text_length = len(ungrouped_text)
-        number_of_columns = len(columns)
-        characters_in_short_column = text_length // number_of_columns
-        if text_length / number_of_columns == text_length // number_of_columns:
-            characters_in_full_column = characters_in_short_column
-        else:
-            characters_in_full_column = characters_in_short_column + 1
-        number_of_full_columns = ((text_length - 1) % number_of_columns) + 1
-
-        # suppose key 'PRIVACY'
-        # when we start populating the first column, 'A', we can get the index
-        # of that value in the string (where all characters are unique)
-        # e.g., unique_text.index('A') --> 4
-        # thus we know that this will be the column with index 4 (i.e, 5th)
-        # if we know that 5 is <= number of full columns then we know this
-        # is a full column otherwise it is a short column
-        unique_keyphrase = self._uniquify_keyphrase(self.keyphrase)
-        char_index = 0
-        for i in range(len(sorted_columns)):
-            letter = sorted_columns[i][0].upper()
-            letter_index_in_keyphrase = unique_keyphrase.index(letter)
-            if letter_index_in_keyphrase + 1 <= number_of_full_columns:
-                characters_to_append = characters_in_full_column
-            else:
-                characters_to_append = characters_in_short_column
-            for j in range(char_index, char_index + characters_to_append):
-                sorted_columns[i].append(ungrouped_text[j])
-            char_index = char_index + characters_to_append
-
-        # unsort the columns
-        unsorted_columns = self._unsorter(self.keyphrase, sorted_columns)
-        # create text string from values in columns
-        text = ""
-        column_index = 0
-        row_index = 1
-        while len(text) < len(ungrouped_text):
-            character = unsorted_columns[column_index][row_index]
-            text += character
-            if column_index + 1 > len(unsorted_columns) - 1:
-                row_index += 1
-            column_index = (column_index + 1) % len(unsorted_columns)
+
+        # put the columns back in keyphrase order and read them out row
+        # by row
+        text = columnar.restore(ungrouped_text, self._headings())
 
         # decode text
         decoded_text = self.polybius_cipher.decrypt(text, use_ids=True)
         return(decoded_text)
 
+    def encrypt_compact(self, plaintext):
+        '''Takes a string and returns the encrypted text packed into bytes
+        (see compact.py)
+        '''
+        return compact.pack(self.encrypt(plaintext),
+                            self.polybius_cipher._symbols(),
+                            self.grouping)
+
+    def decrypt_compact(self, data):
+        '''Takes bytes created by encrypt_compact and returns the decrypted
+        string
+        '''
+        return self.decrypt(compact.unpack(data))
+
     # Helper methods
+    def _headings(self):
+        '''the column headings: each distinct character of the keyphrase,
+        upper cased, with its position, so that columns whose characters
+        differ only in case are read out in keyphrase order
+        e.g., 'PEOPLE' becomes (('P', 0), ('E', 1), ('O', 2), ('L', 3))
+        '''
+        characters = dict.fromkeys(self.keyphrase)
+        return tuple((character.upper(), position)
+                     for position, character in enumerate(characters))
+
     def _create_polybius_square_cipher(self):
         '''Specifies the charateristics for the custom polybius square
         and then creates a PolybiusSquare instance with those inputs
@@ -126,57 +95,6 @@ class Adfgvx(Cipher):
                          'square': square_values}
         self.polybius_cipher = PolybiusSquare(custom_square=custom_square)
 
-    def _populate_keyphrase_columns(self):
-        '''Generates keyphrase columns and then fills each column with the
-        individual characters from cipher pairs
-        '''
-        self.keyphrase_columns = self._create_cols_kp_chars(self.keyphrase)
-
-        i = 0
-        unique_length = len(self._uniquify_keyphrase(self.keyphrase))
-        for character in self.polybius_text:
-            self.keyphrase_columns[i].append(character)
-            i = (i + 1) % unique_length
-
-    def _uniquify_keyphrase(self, keyphrase):
-        '''for the column sorting to work, the characters in the keyphrase
-        must be individually unique (and preserve order)
-        e.g., 'PEOPLE' becomes 'PEOL'
-        '''
-        unique = []
-        for character in keyphrase:
-            if character not in unique:
-                unique.append(character)
-        return unique
-
-    def _create_cols_kp_chars(self, keyphrase):
-        '''takes the keyphrase and returns a list of lists where each
-        inner list is the next sequential unique character from the
-        keyphrase.
-        e.g., 'PEOPLE' becomes [['P'],['E'],['O'],['L']]
-        '''
-        unique = self._uniquify_keyphrase(keyphrase)
-        columns = []
-        for character in unique:
-            columns.append([character.upper()])
-        return columns
-
-    def _unsorter(self, keyphrase, sorted):
-        '''takes a keyphrase of unique values and a list of lists where
-        each inner list has a sorted character from keyphrase as the first
-        element.
-        Returns a new list of lists where each inner list is in the order
-        of the keyphrase
-        '''
-        unsorted = []
-        for letter in keyphrase:
-            for i in range(len(sorted)):
-                if sorted[i][0].lower() == letter.lower():
-                    unsorted.append(sorted[i])
-                    del sorted[i]
-                    break
-        return unsorted
-
     # Dunder methods
     def __repr__(self):
         text = "ADFGVX Cipher (keyphrase: {}, grouping: {})"
@@ -0,0 +1,120 @@
+'''Alphabets for the substitution ciphers.
+
+By default Caesar, Keyword and OneTimePad work on the 26 letters of
+Cipher.VALID_CHARACTERS, and anything else in the text is dropped. Giving
+them an Alphabet instead lets them keep (and encrypt) digits, punctuation
+or any of the 256 byte values:
+
+    cipher = Caesar(offset=7, grouping=0, alphabet=PRINTABLE)
+
+An Alphabet works out each symbol's position, and the translation tables
+built from it, once. So every symbol costs a single dictionary lookup
+however large the alphabet is.
+
+If an alphabet has no symbols that differ only by case, text is matched
+to it case-insensitively (as with the default letters); otherwise case
+matters. An alphabet that includes the space cannot be used with
+grouping, since decrypting could not tell grouping spaces from encrypted
+ones.
+'''
+import string
+
+from ciphers import TranslationTable
+
+
+class Alphabet:
+    def __init__(self, symbols, name=None):
+        self.symbols = "".join(symbols)
+        self.name = name
+        self.positions = {}
+        for position, symbol in enumerate(self.symbols):
+            if symbol in self.positions:
+                raise ValueError("{!r} appears in the alphabet more than "
+                                 "once".format(symbol))
+            self.positions[symbol] = position
+        if not self.symbols:
+            raise ValueError("An alphabet needs at least one symbol")
+        self.case_sensitive = any(symbol.swapcase() != symbol and
+                                  symbol.swapcase() in self.positions
+                                  for symbol in self.symbols)
+        self._reduce_tables = {}
+
+    def fold(self, character):
+        '''returns the character in the form the alphabet holds it in'''
+        if self.case_sensitive:
+            return character
+        return character.lower()
+
+    def shifted(self, offset):
+        '''returns the symbols rotated left by offset, i.e., the symbol
+        offset places after each one
+        '''
+        offset %= len(self.symbols)
+        return self.symbols[offset:] + self.symbols[:offset]
+
+    def substitution_table(self, substitutes, passthrough=(),
+                           keep_unknown=False):
+        '''returns a table for str.translate that turns each symbol into
+        the substitute at the same position. Characters in passthrough are
+        kept as they are; any others are dropped (or kept, if keep_unknown
+        is True)
+        '''
+        if keep_unknown:
+            table = TranslationTable(lambda character: character)
+        else:
+            table = TranslationTable(
+                lambda character: character if character in passthrough
+                else '')
+        for symbol, substitute in zip(self.symbols, substitutes):
+            table[ord(symbol)] = substitute
+            upper = symbol.upper()
+            if (not self.case_sensitive and len(upper) == 1 and
+                    upper not in self.positions):
+                table[ord(upper)] = substitute
+        return table
+
+    def reduce(self, text, passthrough=()):
+        '''returns the text with only the characters that are in the
+        alphabet (in either case, if it is not case-sensitive) or in
+        passthrough, as Cipher._reduce_characters does
+        '''
+        key = tuple(passthrough)
+        if key not in self._reduce_tables:
+            def keep(character):
+                if (self.fold(character) in self.positions or
+                        character.lower() in passthrough):
+                    return character
+                return ''
+            self._reduce_tables[key] = TranslationTable(keep)
+        return text.translate(self._reduce_tables[key])
+
+    def check_grouping(self, grouping):
+        if grouping != 0 and ' ' in self.positions:
+            raise ValueError("The {} alphabet includes the space, so it "
+                             "cannot be used with grouping (choose "
+                             "grouping=0)".format(self))
+
+    # Dunder methods
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, character):
+        return self.fold(character) in self.positions
+
+    def __str__(self):
+        return self.name or repr(self.symbols)
+
+    def __repr__(self):
+        if self.name is not None:
+            return "Alphabet ({})".format(self.name)
+        return "Alphabet ({!r})".format(self.symbols)
+
+
+LETTERS = Alphabet(string.ascii_lowercase, 'letters')
+ALPHANUMERIC = Alphabet(string.ascii_lowercase + string.digits,
+                        'alphanumeric')
+PRINTABLE = Alphabet([chr(code) for code in range(32, 127)], 'printable')
+BYTES = Alphabet([chr(code) for code in range(256)], 'bytes')
+
+ALPHABETS = {alphabet.name: alphabet
+             for alphabet in [LETTERS, ALPHANUMERIC, PRINTABLE, BYTES]}
@@ -0,0 +1,122 @@
+'''Encryption of asyncio streams, for services built on an event loop.
+
+Calling encrypt on a large message blocks the event loop until it is
+done. encrypt_stream instead reads the plaintext from an
+asyncio.StreamReader a chunk at a time, encrypts each chunk with a
+StreamEncryptor (see streaming.py), and writes the ciphertext to an
+asyncio.StreamWriter:
+
+    async def handle(reader, writer):
+        await encrypt_stream(reader, writer, Keyword('SECRET'))
+        writer.close()
+
+- Chunks of at least offload_size bytes are encrypted in an executor
+  (by default the loop's thread pool), so the loop can keep serving
+  other connections while they are worked on. Smaller chunks are
+  encrypted in the loop itself, where they cost less than the hand-off
+- After each write it waits for the writer to drain, so a slow reader at
+  the other end holds back the reading rather than filling memory
+
+As with streaming.py, only Caesar, Keyword and PolybiusSquare can be
+streamed, and the output is the same as cipher.encrypt on the whole text.
+
+Running this file starts a server on localhost, sends it a few messages
+at once and checks the replies:
+    python async_streams.py
+'''
+import asyncio
+import functools
+
+from streaming import StreamEncryptor
+
+
+CHUNK_SIZE = 64 * 1024
+
+# chunks of this many bytes or more are encrypted outside the event loop
+OFFLOAD_SIZE = 16 * 1024
+
+
+async def encrypt_stream(reader, writer, cipher, pad=None,
+                         chunk_size=CHUNK_SIZE, executor=None,
+                         offload_size=OFFLOAD_SIZE):
+    '''Reads UTF-8 plaintext from reader until the end of the stream,
+    encrypting it with cipher (and the one-time pad, if given), and writes
+    the ciphertext to writer. The writer is not closed.
+    - chunk_size: the most bytes to read at a time
+    - executor: where to encrypt large chunks (default: the loop's)
+    - offload_size: the smallest chunk to encrypt in the executor
+    Returns the encryptor's final state (see streaming.py)
+    '''
+    encryptor = StreamEncryptor(cipher, pad)
+    loop = asyncio.get_running_loop()
+    finished = False
+    while not finished:
+        data = await reader.read(chunk_size)
+        finished = not data
+        if len(data) >= offload_size:
+            output = await loop.run_in_executor(
+                executor, functools.partial(encryptor.update, data,
+                                            final=finished))
+        else:
+            output = encryptor.update(data, final=finished)
+        if output:
+            writer.write(output)
+            await writer.drain()
+    return encryptor.state
+
+
+async def serve(cipher_factory, host='127.0.0.1', port=0, **options):
+    '''starts a server that encrypts whatever each connection sends it and
+    sends back the ciphertext, closing the connection when the client has
+    finished sending. cipher_factory is called (with no arguments) for a
+    new cipher for each connection; options are passed to encrypt_stream.
+    Returns the asyncio.Server
+    '''
+    async def handle(reader, writer):
+        try:
+            await encrypt_stream(reader, writer, cipher_factory(), **options)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    return await asyncio.start_server(handle, host, port)
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    import random
+    import time
+
+    from keyword_cipher import Keyword
+
+    async def send(host, port, message):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(message.encode('utf-8'))
+        await writer.drain()
+        writer.write_eof()
+        reply = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return reply.decode('utf-8')
+
+    async def demo():
+        generator = random.Random(0)
+        letters = 'abcdefghijklmnopqrstuvwxyz .,é'
+        messages = ["".join(generator.choice(letters)
+                            for _ in range(generator.randint(0, 300000)))
+                    for _ in range(8)]
+        server = await serve(lambda: Keyword('SECRET'), chunk_size=8192,
+                             offload_size=4096)
+        host, port = server.sockets[0].getsockname()[:2]
+        start = time.perf_counter()
+        async with server:
+            replies = await asyncio.gather(*[send(host, port, message)
+                                             for message in messages])
+        elapsed = time.perf_counter() - start
+        for message, reply in zip(messages, replies):
+            assert reply == Keyword('SECRET').encrypt(message)
+        print("{} connections, {} characters in {:.3f}s".format(
+            len(messages), sum(map(len, messages)), elapsed))
+
+    asyncio.run(demo())
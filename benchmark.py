@@ -0,0 +1,424 @@
+'''Throughput and latency benchmarks for the ciphers.
+
+Runs encrypt and decrypt for each cipher over a range of input sizes and
+key parameters, and writes the results as JSON. A previous run can be
+given as a baseline, in which case any case whose throughput has dropped
+by more than the threshold is reported as a regression (and the exit
+status is 1).
+
+With --memory, each case is instead run once under tracemalloc to record
+its peak allocation, and any case whose peak per input byte is above the
+ceiling for that cipher (MEMORY_CEILINGS, or --peak-ratio / --ceiling)
+fails the run. A fixed allowance (--overhead) is added to every ceiling
+so that small inputs are not failed by the ciphers' fixed-size tables.
+The ciphers in KNOWN_MEMORY_FAILURES are known to go over their ceiling;
+their cases are reported but do not fail the run unless --strict is
+given.
+
+Examples:
+    python benchmark.py --output baseline.json
+    python benchmark.py --max-size 1MB --compare baseline.json
+    python benchmark.py --cipher Transposition --sizes 1KB 1MB
+    python benchmark.py --memory --sizes 1MB --ceiling Transposition=4
+'''
+import argparse
+import datetime
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from caesar import Caesar
+from keyword_cipher import Keyword
+from transposition import Transposition
+from polybius_square import PolybiusSquare
+from adfgvx import Adfgvx
+from one_time_pad import OneTimePad
+
+
+SIZES = ['100B', '1KB', '10KB', '100KB', '1MB', '10MB', '100MB']
+
+UNITS = {'B': 1, 'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3}
+
+# (cipher name, cipher class, parameters)
+CASES = [
+    ('Caesar', Caesar, {'offset': 3, 'grouping': 5}),
+    ('Caesar', Caesar, {'offset': 3, 'grouping': 0}),
+    ('Keyword', Keyword, {'keyphrase': 'KEY', 'grouping': 5}),
+    ('Keyword', Keyword, {'keyphrase': 'PRIVACY', 'grouping': 5}),
+    ('Keyword', Keyword, {'keyphrase': 'THEQUICKBROWNFOXJUMPSOVERTHELAZYDOG',
+                          'grouping': 5}),
+    ('Keyword', Keyword, {'keyphrase': 'PRIVACY', 'grouping': 0}),
+    ('Transposition', Transposition, {'num_rails': 2, 'grouping': 5}),
+    ('Transposition', Transposition, {'num_rails': 3, 'grouping': 5}),
+    ('Transposition', Transposition, {'num_rails': 10, 'grouping': 5}),
+    ('Transposition', Transposition, {'num_rails': 3, 'grouping': 0}),
+    ('PolybiusSquare', PolybiusSquare, {'size': 5, 'shared_character': 'i',
+                                        'grouping': 0}),
+    ('PolybiusSquare', PolybiusSquare, {'size': 6, 'grouping': 0}),
+    ('PolybiusSquare', PolybiusSquare, {'size': 6, 'grouping': 5}),
+    ('Adfgvx', Adfgvx, {'keyphrase': 'KEY', 'grouping': 5}),
+    ('Adfgvx', Adfgvx, {'keyphrase': 'PRIVACY', 'grouping': 5}),
+    ('Adfgvx', Adfgvx, {'keyphrase': 'THEQUICKBROWNFOXJUMPSOVERTHELAZYDOG',
+                        'grouping': 5}),
+    ('Adfgvx', Adfgvx, {'keyphrase': 'PRIVACY', 'grouping': 0}),
+    ('OneTimePad', Caesar, {'offset': 3, 'grouping': 5}),
+]
+
+DIRECTIONS = ['encrypt', 'decrypt']
+
+# highest acceptable peak allocation per input byte in --memory mode
+MEMORY_CEILINGS = {
+    'Caesar': 4,
+    'Keyword': 4,
+    'Transposition': 4,
+    'PolybiusSquare': 4,
+    'Adfgvx': 4,
+    'OneTimePad': 4,
+}
+
+# the ciphers known to go over their ceiling, and why (with what they
+# used at 1MB); remove a cipher once it fits
+KNOWN_MEMORY_FAILURES = {
+    'Transposition': "builds a rails x length grid "
+                     "(41x to encrypt, 63x to decrypt)",
+    'Adfgvx': "holds the Polybius text, twice the length of the input, "
+              "and two 4-byte indices for each of its characters (23x)",
+}
+
+# bytes allowed on top of the per-input-byte ceiling: enough for the
+# largest fixed-size table, PolybiusSquare's 512KB pair lookup table
+MEMORY_OVERHEAD = 640 * 1000
+
+
+def parse_size(text):
+    '''converts a size such as '100B', '10KB' or '1MB' to a number of
+    bytes
+    '''
+    text = text.strip().upper()
+    for unit in sorted(UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * UNITS[unit])
+    return int(text)
+
+
+def generate_text(size, seed=0):
+    '''returns `size` characters of lowercase letters, spaces and the odd
+    digit or punctuation mark, roughly in the shape of English words
+    '''
+    generator = random.Random(seed)
+    letters = 'etaoinshrdlcumwfgypbvkjxqz'
+    weights = [12, 9, 8, 8, 7, 7, 6, 6, 6, 4, 4, 3, 3, 2, 2, 2, 2, 2, 2, 1,
+               1, 1, 1, 1, 1, 1]
+    # build a pool of words and draw from it, which is much quicker than
+    # drawing every character
+    words = []
+    for _ in range(1000):
+        length = generator.randint(1, 9)
+        word = "".join(generator.choices(letters, weights, k=length))
+        if generator.random() < 0.05:
+            word += generator.choice('0123456789.,!?')
+        words.append(word)
+    chunks = []
+    length = 0
+    while length < size:
+        chunk = " ".join(generator.choices(words, k=1000)) + " "
+        chunks.append(chunk)
+        length += len(chunk)
+    return "".join(chunks)[:size]
+
+
+def make_call(name, cipher_class, parameters, size, direction):
+    '''prepares the cipher and its input for one case and returns a
+    function that takes no arguments and runs the encrypt or decrypt call
+    being measured
+    '''
+    plaintext = generate_text(size)
+    cipher = cipher_class(**parameters)
+
+    if name == 'OneTimePad':
+        pad_numbers = ",".join([str(i % 26) for i in range(size)])
+        pad = OneTimePad(pad_numbers, plaintext, {'name': 'Caesar'}, 'e')
+        padded = pad.apply_one_time_pad(plaintext, cipher)
+        if direction == 'encrypt':
+            def call():
+                return pad.apply_one_time_pad(plaintext, cipher)
+        else:
+            def call():
+                return pad.apply_one_time_pad(padded, cipher,
+                                              encrypt_mode=False)
+    elif direction == 'encrypt':
+        def call():
+            return cipher.encrypt(plaintext)
+    else:
+        ciphertext = cipher.encrypt(plaintext)
+
+        def call():
+            return cipher.decrypt(ciphertext)
+    return call
+
+
+def run_case(name, cipher_class, parameters, size, direction, min_time):
+    '''times one cipher/parameters/size/direction combination, repeating
+    the call until at least `min_time` seconds have been spent.
+    Returns a result dictionary
+    '''
+    call = make_call(name, cipher_class, parameters, size, direction)
+    calls = 0
+    latencies = []
+    start = time.perf_counter()
+    while True:
+        call_start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - call_start)
+        calls += 1
+        if time.perf_counter() - start >= min_time:
+            break
+    seconds = sum(latencies)
+    latencies.sort()
+    return {
+        'cipher': name,
+        'parameters': parameters,
+        'size': size,
+        'direction': direction,
+        'calls': calls,
+        'seconds': seconds,
+        'latency_mean_s': seconds / calls,
+        'latency_min_s': latencies[0],
+        'latency_median_s': latencies[len(latencies) // 2],
+        'mb_per_s': size * calls / seconds / UNITS['MB'],
+    }
+
+
+def run_suite(sizes, ciphers=None, min_time=0.2, verbose=True):
+    '''runs every case (optionally only those for the named ciphers) at each
+    size in both directions. Returns the list of results
+    '''
+    results = []
+    for size in sizes:
+        for name, cipher_class, parameters in CASES:
+            if ciphers and name not in ciphers:
+                continue
+            for direction in DIRECTIONS:
+                result = run_case(name, cipher_class, parameters, size,
+                                  direction, min_time)
+                results.append(result)
+                if verbose:
+                    print(format_result(result), flush=True)
+    return results
+
+
+def measure_memory(name, cipher_class, parameters, size, direction):
+    '''runs one case once under tracemalloc and returns a result dictionary
+    with the peak allocation during the call. The input text (and, for
+    decrypt, the ciphertext) is created before tracing starts so only the
+    memory used by the call itself is counted
+    '''
+    call = make_call(name, cipher_class, parameters, size, direction)
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'cipher': name,
+        'parameters': parameters,
+        'size': size,
+        'direction': direction,
+        'peak_bytes': peak,
+        'peak_per_input_byte': peak / size,
+    }
+
+
+def run_memory_suite(sizes, ciphers=None, ceilings=None,
+                     overhead=MEMORY_OVERHEAD, verbose=True,
+                     known_failures=None):
+    '''measures the peak memory for every case (optionally only those for
+    the named ciphers) at each size in both directions.
+    Returns a tuple of (results, failures) where failures are the results
+    whose peak is above `ceiling * size + overhead` for that cipher,
+    apart from those of the ciphers in known_failures (by default,
+    KNOWN_MEMORY_FAILURES), which are marked 'known_failure' instead
+    '''
+    if ceilings is None:
+        ceilings = MEMORY_CEILINGS
+    if known_failures is None:
+        known_failures = KNOWN_MEMORY_FAILURES
+    results = []
+    failures = []
+    for size in sizes:
+        for name, cipher_class, parameters in CASES:
+            if ciphers and name not in ciphers:
+                continue
+            for direction in DIRECTIONS:
+                result = measure_memory(name, cipher_class, parameters, size,
+                                        direction)
+                result['ceiling'] = ceilings.get(name)
+                results.append(result)
+                if result['ceiling'] is None:
+                    failed = False
+                else:
+                    limit = result['ceiling'] * size + overhead
+                    failed = result['peak_bytes'] > limit
+                if failed and name in known_failures:
+                    result['known_failure'] = True
+                elif failed:
+                    failures.append(result)
+                if verbose:
+                    print(format_memory_result(result, failed), flush=True)
+    return results, failures
+
+
+def format_memory_result(result, failed=False):
+    text = "{:<14} {:<8} {:>10} B  {:>14} B peak  {:>8.2f} x input  {}{}"
+    return text.format(result['cipher'],
+                       result['direction'],
+                       result['size'],
+                       result['peak_bytes'],
+                       result['peak_per_input_byte'],
+                       json.dumps(result['parameters'], sort_keys=True),
+                       "  {} (ceiling {})".format(
+                           "KNOWN FAILURE" if result.get('known_failure')
+                           else "FAILED", result['ceiling'])
+                       if failed else "")
+
+
+def format_result(result):
+    text = "{:<14} {:<8} {:>10} B  {:>10.3f} MB/s  {:>12.6f} s/call  {}"
+    return text.format(result['cipher'],
+                       result['direction'],
+                       result['size'],
+                       result['mb_per_s'],
+                       result['latency_mean_s'],
+                       json.dumps(result['parameters'], sort_keys=True))
+
+
+def result_key(result):
+    return (result['cipher'],
+            json.dumps(result['parameters'], sort_keys=True),
+            result['size'],
+            result['direction'])
+
+
+def compare(baseline, results, threshold):
+    '''returns a list of (baseline result, new result, change) for every
+    case whose throughput has dropped by more than `threshold` (a
+    fraction, e.g., 0.1 for 10%) compared to the baseline
+    '''
+    previous = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        change = result['mb_per_s'] / old['mb_per_s'] - 1
+        if change < -threshold:
+            regressions.append((old, result, change))
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark cipher throughput and latency")
+    parser.add_argument('--sizes', nargs='+', default=None,
+                        help="input sizes, e.g. 100B 10KB 1MB "
+                             "(default: 100B to 100MB)")
+    parser.add_argument('--max-size', default=None,
+                        help="skip the default sizes above this")
+    parser.add_argument('--cipher', nargs='+', default=None,
+                        help="only benchmark these ciphers")
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="minimum seconds to spend on each case")
+    parser.add_argument('--output', default=None,
+                        help="write the results to this JSON file")
+    parser.add_argument('--compare', default=None,
+                        help="baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="throughput drop (as a fraction) that counts "
+                             "as a regression (default: 0.1)")
+    parser.add_argument('--memory', action='store_true',
+                        help="measure peak memory instead of throughput")
+    parser.add_argument('--peak-ratio', type=float, default=None,
+                        help="in --memory mode, use this ceiling on peak "
+                             "bytes per input byte for every cipher")
+    parser.add_argument('--ceiling', nargs='+', default=[],
+                        metavar='CIPHER=RATIO',
+                        help="in --memory mode, override the ceiling for "
+                             "particular ciphers")
+    parser.add_argument('--overhead', type=parse_size,
+                        default=MEMORY_OVERHEAD,
+                        help="in --memory mode, fixed allowance added to "
+                             "every ceiling, e.g. 64KB (default: 640KB)")
+    parser.add_argument('--strict', action='store_true',
+                        help="in --memory mode, fail on the known failures "
+                             "(KNOWN_MEMORY_FAILURES) too")
+    options = parser.parse_args(arguments)
+
+    sizes = [parse_size(size) for size in (options.sizes or SIZES)]
+    if options.max_size is not None:
+        max_size = parse_size(options.max_size)
+        sizes = [size for size in sizes if size <= max_size]
+
+    if options.memory:
+        ceilings = dict(MEMORY_CEILINGS)
+        if options.peak_ratio is not None:
+            ceilings = {name: options.peak_ratio for name in ceilings}
+        for setting in options.ceiling:
+            name, ratio = setting.split('=')
+            ceilings[name] = float(ratio)
+        known_failures = {} if options.strict else KNOWN_MEMORY_FAILURES
+        results, failures = run_memory_suite(sizes, options.cipher, ceilings,
+                                             options.overhead,
+                                             known_failures=known_failures)
+    else:
+        results = run_suite(sizes, options.cipher, options.min_time)
+
+    if options.output is not None:
+        document = {
+            'created': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'mode': 'memory' if options.memory else 'throughput',
+            'results': results,
+        }
+        with open(options.output, 'w') as file:
+            json.dump(document, file, indent=2)
+
+    if options.memory:
+        known = sorted(set(result['cipher'] for result in results
+                           if result.get('known_failure')))
+        if known:
+            print()
+            for name in known:
+                print("Known failure: {} {}".format(
+                    name, KNOWN_MEMORY_FAILURES[name]))
+        if failures:
+            print("\n{} case(s) over their memory ceiling".format(
+                len(failures)))
+            return 1
+        if known:
+            print("\nAll other cases within their memory ceilings")
+        else:
+            print("\nAll cases within their memory ceilings")
+        return 0
+
+    if options.compare is not None:
+        with open(options.compare) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(baseline, results, options.threshold)
+        if regressions:
+            print("\n{} regression(s):".format(len(regressions)))
+            for old, new, change in regressions:
+                print("{:+.1%}  {} (was {:.3f} MB/s)".format(
+                    change, format_result(new), old['mb_per_s']))
+            return 1
+        print("\nNo regressions")
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
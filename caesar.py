@@ -1,13 +1,14 @@
 import string
 
-from ciphers import Cipher
+import engines
+from ciphers import Cipher, TranslationTable
 
 
 class Caesar(Cipher):
     UPPERCASE = string.ascii_uppercase
     FORWARD = UPPERCASE * 3
 
-    def __init__(self, offset=3, grouping=5):
+    def __init__(self, offset=3, grouping=5, alphabet=None):
         self.offset = offset
 
         self.FORWARD = self.UPPERCASE + self.UPPERCASE[:self.offset+1]
@@ -18,7 +19,22 @@ class Caesar(Cipher):
         else:
             self.PASSTHROUGH_CHARACTERS = [' ']
 
+        # with an alphabet (see alphabets.py), each symbol is shifted along
+        # the alphabet by looking it up in a table
+        self.alphabet = alphabet
+        if alphabet is not None:
+            alphabet.check_grouping(grouping)
+            self.VALID_CHARACTERS = list(alphabet.symbols)
+            self._encrypt_table = alphabet.substitution_table(
+                alphabet.shifted(offset), self.PASSTHROUGH_CHARACTERS)
+            self._decrypt_table = alphabet.substitution_table(
+                alphabet.shifted(-offset), keep_unknown=True)
+
+    @engines.dispatch('encrypt_many')
     def encrypt(self, text):
+        if self.alphabet is not None:
+            return self._group_text(text.translate(self._encrypt_table))
+
         # reduce plaintext to valid characters
         text = self._reduce_characters(text)
 
@@ -35,10 +51,13 @@ class Caesar(Cipher):
         grouped = self._group_text(enciphered)
         return grouped
 
+    @engines.dispatch('decrypt_many')
     def decrypt(self, text):
         output = []
         if self.grouping != 0:
             text = self._ungroup_text(text)
+        if self.alphabet is not None:
+            return text.translate(self._decrypt_table)
 
         text = text.upper()
         for char in text:
@@ -50,6 +69,78 @@ class Caesar(Cipher):
                 output.append(self.BACKWARD[index-self.offset])
         return ''.join(output)
 
+    def encrypt_many(self, messages):
+        '''Takes a sequence of strings and returns a list of the encrypted
+        strings, sharing one translation table across the batch
+        '''
+        if self.alphabet is not None:
+            # encrypt already uses the alphabet's table
+            return super().encrypt_many(messages)
+        table = TranslationTable(self._encrypt_character)
+        return [self._group_text(message.translate(table))
+                for message in messages]
+
+    def decrypt_many(self, messages):
+        '''Takes a sequence of encrypted strings and returns a list of the
+        decrypted strings, sharing one translation table across the batch
+        '''
+        if self.alphabet is not None:
+            return super().decrypt_many(messages)
+        table = TranslationTable(self._decrypt_character)
+        return [message.translate(table) for message in messages]
+
+    # Helper methods
+    def _encrypt_character(self, char):
+        '''returns what encrypt (before grouping) turns a single character
+        into
+        '''
+        if self.alphabet is not None:
+            return self._encrypt_table[ord(char)]
+        if char.lower() not in (self.VALID_CHARACTERS +
+                                self.PASSTHROUGH_CHARACTERS):
+            return ''
+        char = char.upper()
+        try:
+            index = self.FORWARD.index(char)
+        except ValueError:
+            return char
+        return self.FORWARD[index+self.offset]
+
+    def _decrypt_character(self, char):
+        '''returns what decrypt turns a single character into'''
+        if self.alphabet is not None:
+            if self.grouping != 0 and char == " ":
+                return ''
+            return self._decrypt_table[ord(char)]
+        if self.grouping != 0 and char == " ":
+            return ''
+        char = char.upper()
+        try:
+            index = self.BACKWARD.index(char)
+        except ValueError:
+            return char
+        return self.BACKWARD[index-self.offset]
+
+    def _translation(self, encrypt_mode=True):
+        '''returns a dictionary mapping each of the VALID_CHARACTERS to the
+        character that encrypt (or decrypt, if encrypt_mode is False) would
+        produce for it
+        '''
+        if self.alphabet is not None:
+            substitutes = self.alphabet.shifted(
+                self.offset if encrypt_mode else -self.offset)
+            return dict(zip(self.alphabet.symbols, substitutes))
+        translation = {}
+        for character in self.VALID_CHARACTERS:
+            char = character.upper()
+            if encrypt_mode:
+                index = self.FORWARD.index(char)
+                translation[character] = self.FORWARD[index+self.offset]
+            else:
+                index = self.BACKWARD.index(char)
+                translation[character] = self.BACKWARD[index-self.offset]
+        return translation
+
 # -------------------------------------------------------------
 
 if __name__ == "__main__":
@@ -1,3 +1,32 @@
+class TranslationTable(dict):
+    '''A table for str.translate that works out the translation of each
+    character the first time it is seen (by calling translate_character
+    with the character) and remembers it for next time.
+    translate_character should return the string that the character
+    becomes, which can be '' to drop the character.
+    '''
+    def __init__(self, translate_character):
+        super().__init__()
+        self.translate_character = translate_character
+
+    def __missing__(self, key):
+        try:
+            value = self.translate_character(chr(key))
+        except LookupError as error:
+            # str.translate would treat a LookupError as 'leave this
+            # character alone', so report it as invalid input instead
+            raise ValueError(
+                "Cannot translate {!r}".format(chr(key))) from error
+        self[key] = value
+        return value
+
+
+# functions called with each subclass of Cipher as it is defined
+# (instrumentation.py uses this to wrap the stages of cipher classes that
+# are imported after it has been turned on)
+SUBCLASS_HOOKS = []
+
+
 class Cipher:
 
     VALID_CHARACTERS = [
@@ -8,16 +37,39 @@ class Cipher:
         ' ',
     ]
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for hook in SUBCLASS_HOOKS:
+            hook(cls)
+
     def encrypt(self):
         raise NotImplementedError()
 
     def decrypt(self):
         raise NotImplementedError()
 
+    def encrypt_many(self, messages):
+        '''Takes a sequence of strings and returns a list of the encrypted
+        strings, in the same order.
+        Ciphers can override this to set up their per-key state once for
+        the whole batch
+        '''
+        return [self.encrypt(message) for message in messages]
+
+    def decrypt_many(self, messages):
+        '''Takes a sequence of encrypted strings and returns a list of the
+        decrypted strings, in the same order
+        '''
+        return [self.decrypt(message) for message in messages]
+
     def _reduce_characters(self, text):
         '''takes a string and returns a string comprising only the characters
-        in the VALID_CHARACTERS or PASSTHROUGH_CHARACTERS lists
+        in the VALID_CHARACTERS or PASSTHROUGH_CHARACTERS lists (or, for
+        a cipher with an alphabet, in the alphabet)
         '''
+        alphabet = getattr(self, 'alphabet', None)
+        if alphabet is not None:
+            return alphabet.reduce(text, self.PASSTHROUGH_CHARACTERS)
         reduced_text = ""
         for character in text:
             lower = character.lower()
@@ -48,6 +100,12 @@ class Cipher:
                 output += character
         return output
 
+    def _gather(self, text, indices):
+        '''returns a string made of the characters of text at each of the
+        given indices (in order)
+        '''
+        return "".join(map(text.__getitem__, indices))
+
     def _uniquify_keyphrase(self, keyphrase):
         '''for the column sorting to work, the characters in the keyphrase
         must be individually unique (and preserve order)
@@ -0,0 +1,149 @@
+'''Keyed columnar transposition, worked out once for each keyphrase and
+length.
+
+A columnar transposition writes the text out row by row under the
+characters of a keyphrase (each distinct character heading one column,
+in the order they first appear), then reads the columns out in the
+alphabetical order of their headings. With the keyphrase 'ZEBRA' and the
+text 'attackatdawn':
+
+    Z E B R A
+    a t t a c
+    k a t d a
+    w n
+
+is read out from columns A, B, E, R and Z as 'ca' 'tt' 'tan' 'ad' 'akw',
+giving 'catttanadakw'.
+
+Where each character ends up depends only on the keyphrase and the
+length of the text, so permutations works the positions out once (as
+arrays of 4-byte indices rather than lists of ints), caches them by
+(keyphrases, length) for texts up to CACHE_LENGTH long, and transpose
+and restore are then a single gather over the text. Transposing under
+several keyphrases in turn (a double columnar transposition, say)
+composes their permutations into one, so it costs one gather however
+many keyphrases there are:
+
+    ciphertext = transpose(text, 'ZEBRA', 'STRIPE')
+    text = restore(ciphertext, 'ZEBRA', 'STRIPE')
+
+A keyphrase can be any sequence of headings that sort, not only a
+string: Adfgvx, for instance, heads its columns with (upper cased
+character, position) pairs, so that 'p' and 'P' are two columns read out
+in keyphrase order.
+'''
+import array
+import functools
+
+
+# how many (keyphrases, length) permutations to keep
+CACHE_SIZE = 256
+
+# the longest text whose permutations are cached; longer ones are worked
+# out each time, which costs little more than the gather itself, so a few
+# long messages cannot fill the cache with megabytes of indices
+CACHE_LENGTH = 4096
+
+# the number of characters gathered at a time
+GATHER_SIZE = 4096
+
+
+def transpose(text, *keyphrases):
+    '''returns text transposed under each of the keyphrases in turn'''
+    permutation, _ = permutations(keyphrases, len(text))
+    return _gather(text, permutation)
+
+
+def restore(text, *keyphrases):
+    '''returns the text that transpose turned into text'''
+    _, inverse = permutations(keyphrases, len(text))
+    return _gather(text, inverse)
+
+
+def permutations(keyphrases, length):
+    '''Returns (permutation, inverse) for a text of the given length
+    transposed under each of keyphrases (a tuple) in turn. permutation
+    gives, for each position in the transposed text, the position in the
+    text that the character came from (transposed[k] ==
+    text[permutation[k]]), and inverse the other way round. Both are
+    arrays of unsigned ints, and must not be changed, as they may be
+    cached
+    '''
+    if length <= CACHE_LENGTH:
+        return _cached_permutations(keyphrases, length)
+    return _permutations(keyphrases, length)
+
+
+def column_order(keyphrase):
+    '''returns the columns (numbered from 0, in keyphrase order) in the
+    order they are read out: alphabetical order of their headings
+    '''
+    headings = _headings(keyphrase)
+    return sorted(range(len(headings)), key=headings.__getitem__)
+
+
+# Helper functions
+def _headings(keyphrase):
+    '''returns the distinct characters of keyphrase, in the order they
+    first appear (e.g., 'PEOPLE' becomes ('P', 'E', 'O', 'L'))
+    '''
+    headings = tuple(dict.fromkeys(keyphrase))
+    if not headings:
+        raise ValueError("The keyphrase must have at least one character")
+    return headings
+
+
+def _permutations(keyphrases, length):
+    '''transposing the positions 0 to length - 1 themselves gives the
+    position each character comes from, and restoring them the position
+    each one goes to
+    '''
+    if not keyphrases:
+        raise ValueError("At least one keyphrase is needed")
+    permutation = array.array('I', range(length))
+    for keyphrase in keyphrases:
+        permutation = _write_columns(permutation, keyphrase)
+    inverse = array.array('I', range(length))
+    for keyphrase in reversed(keyphrases):
+        inverse = _read_columns(inverse, keyphrase)
+    return permutation, inverse
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _cached_permutations(keyphrases, length):
+    return _permutations(keyphrases, length)
+
+
+def _write_columns(positions, keyphrase):
+    '''the positions are dealt into the columns in turn, so column c
+    holds every columns-th one from c, and the columns are read out one
+    after another (as slices, so no Python code runs for each position)
+    '''
+    number_of_columns = len(_headings(keyphrase))
+    written = array.array('I')
+    for column in column_order(keyphrase):
+        written.extend(positions[column::number_of_columns])
+    return written
+
+
+def _read_columns(positions, keyphrase):
+    '''undoes _write_columns: each column is cut from positions in turn
+    and put back as every columns-th position from c
+    '''
+    number_of_columns = len(_headings(keyphrase))
+    read = array.array('I', positions)
+    start = 0
+    for column in column_order(keyphrase):
+        stop = start + len(range(column, len(positions), number_of_columns))
+        read[column::number_of_columns] = positions[start:stop]
+        start = stop
+    return read
+
+
+def _gather(text, indices):
+    '''joins the characters a few thousand at a time, as one list of
+    them all would take eight bytes for every character
+    '''
+    get = text.__getitem__
+    return "".join(["".join(map(get, indices[start:start + GATHER_SIZE]))
+                    for start in range(0, len(indices), GATHER_SIZE)])
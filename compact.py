@@ -0,0 +1,130 @@
+'''Compact binary form for the ciphertext of the fractionating ciphers.
+
+PolybiusSquare and Adfgvx write two symbols per plaintext character, and
+every symbol comes from a small alphabet ('01234', '012345' or 'ADFGVX'),
+yet each is stored as a whole character. Here the symbols are packed
+three to a byte (any alphabet of up to 6 symbols fits, since 6 ** 3 is
+216), with a small header so that the textual form, including its
+grouping, can be restored exactly.
+
+Layout (all integers big-endian):
+    4 bytes   MAGIC
+    1 byte    VERSION
+    1 byte    number of symbols in the alphabet (the base)
+    2 bytes   grouping
+    n bytes   the alphabet, as ASCII
+    8 bytes   number of symbols in the ciphertext
+    ...       the packed symbols, three per byte, with the first symbol of
+              each three as the most significant base-n digit
+
+Packing and unpacking work on whole byte strings at a time (with
+bytes.translate, slicing and big-integer arithmetic) rather than symbol
+by symbol.
+'''
+import struct
+
+
+MAGIC = b'CPAK'
+VERSION = 1
+HEADER = struct.Struct('>4sBBH')
+COUNT = struct.Struct('>Q')
+
+SYMBOLS_PER_BYTE = 3
+MAX_BASE = 6
+INVALID = 255
+
+
+def pack(ciphertext, symbols, grouping=0):
+    '''Packs ciphertext (made of characters from `symbols`, grouped with
+    spaces every `grouping` characters, or not grouped if grouping is 0)
+    into bytes
+    '''
+    base = len(symbols)
+    if not 2 <= base <= MAX_BASE:
+        raise ValueError("Can only pack alphabets of 2 to {} symbols".format(
+            MAX_BASE))
+    if len(set(symbols)) != base or ' ' in symbols:
+        raise ValueError("Symbols must be unique and must not include ' '")
+
+    ungrouped = ciphertext.replace(' ', '')
+    if _group(ungrouped, grouping) != ciphertext:
+        raise ValueError("Ciphertext is not grouped by {}".format(grouping))
+    try:
+        data = ungrouped.encode('ascii')
+        symbol_bytes = symbols.encode('ascii')
+    except UnicodeEncodeError:
+        raise ValueError("Ciphertext contains symbols not in {!r}".format(
+            symbols))
+
+    # symbols -> digits (0 to base - 1), anything else -> INVALID
+    to_digits = bytearray([INVALID] * 256)
+    for digit, symbol in enumerate(symbol_bytes):
+        to_digits[symbol] = digit
+    digits = data.translate(to_digits)
+    position = digits.find(bytes([INVALID]))
+    if position != -1:
+        raise ValueError("Symbol {!r} at position {} is not in {!r}".format(
+            ungrouped[position], position, symbols))
+
+    # pad to a whole number of bytes, then combine each run of three
+    # digits d0, d1, d2 into d0 * base ** 2 + d1 * base + d2. Each of the
+    # three scaled 'planes' is added as one big integer; no byte can
+    # carry into its neighbour because the sum is always below 256
+    remainder = len(digits) % SYMBOLS_PER_BYTE
+    if remainder:
+        digits += bytes(SYMBOLS_PER_BYTE - remainder)
+    length = len(digits) // SYMBOLS_PER_BYTE
+    total = 0
+    for place in range(SYMBOLS_PER_BYTE):
+        scale = base ** (SYMBOLS_PER_BYTE - 1 - place)
+        plane = digits[place::SYMBOLS_PER_BYTE].translate(
+            bytes([(value * scale) % 256 for value in range(256)]))
+        total += int.from_bytes(plane, 'big')
+    packed = total.to_bytes(length, 'big')
+
+    header = HEADER.pack(MAGIC, VERSION, base, grouping)
+    return header + symbol_bytes + COUNT.pack(len(ungrouped)) + packed
+
+
+def unpack(data):
+    '''Restores the textual ciphertext from bytes created by pack'''
+    magic, version, base, grouping = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not compact ciphertext")
+    if version != VERSION:
+        raise ValueError("Unsupported version {}".format(version))
+    offset = HEADER.size
+    symbol_bytes = bytes(data[offset:offset + base])
+    offset += base
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    packed = bytes(data[offset:])
+    if len(packed) * SYMBOLS_PER_BYTE < count:
+        raise ValueError("Compact ciphertext is truncated")
+
+    # split each byte back into its three digits, one plane at a time, and
+    # interleave the planes
+    digits = bytearray(len(packed) * SYMBOLS_PER_BYTE)
+    largest = base ** SYMBOLS_PER_BYTE
+    for place in range(SYMBOLS_PER_BYTE):
+        scale = base ** (SYMBOLS_PER_BYTE - 1 - place)
+        to_digit = bytes([(value // scale) % base if value < largest
+                          else INVALID for value in range(256)])
+        digits[place::SYMBOLS_PER_BYTE] = packed.translate(to_digit)
+    del digits[count:]
+    if INVALID in digits:
+        raise ValueError("Compact ciphertext is corrupt")
+
+    to_symbols = bytearray(256)
+    for digit, symbol in enumerate(symbol_bytes):
+        to_symbols[digit] = symbol
+    ungrouped = bytes(digits).translate(to_symbols).decode('ascii')
+    return _group(ungrouped, grouping)
+
+
+def _group(text, grouping):
+    '''the same grouping as Cipher._group_text'''
+    if grouping > 0:
+        return " ".join([text[index:index + grouping]
+                         for index in range(0, len(text), grouping)])
+    return text
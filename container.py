@@ -0,0 +1,193 @@
+'''Seekable container files for position-independent ciphers.
+
+Caesar, Keyword and PolybiusSquare (with no grouping) encrypt each
+character on its own, and a one-time pad only needs to know each
+character's position. So a long text can be encrypted in chunks, and any
+part of it decrypted later by reading just the chunks that hold it.
+
+Layout (all integers big-endian):
+    4 bytes   MAGIC
+    1 byte    VERSION
+    4 bytes   length of the header
+    ...       header: JSON with the cipher id (a key of
+              secret_messages.VALID_CIPHERS), its parameters, the chunk
+              size, the plaintext length and whether a pad was used
+    ...       the encrypted chunks, one after another (UTF-8)
+    ...       the chunk index: for each chunk, the position of its first
+              plaintext character, and the offset and length of its bytes
+    8 bytes   offset of the chunk index
+    8 bytes   number of chunks
+    4 bytes   MAGIC
+
+Plaintext positions count the characters of the text after it has been
+reduced to the cipher's valid characters (and spaces, which pass
+through), i.e. the text that decrypting the whole file gives back.
+
+Example:
+    write_container('archive.cpk', text, 'k', {'keyphrase': 'PRIVACY'})
+    with ContainerReader('archive.cpk') as reader:
+        print(reader.read(1000000, 1000100))
+'''
+import bisect
+import json
+import mmap
+import struct
+
+from secret_messages import VALID_CIPHERS, create_cipher
+
+
+MAGIC = b'CCHK'
+VERSION = 1
+PREAMBLE = struct.Struct('>4sBI')
+INDEX_ENTRY = struct.Struct('>QQQ')
+FOOTER = struct.Struct('>QQ4s')
+
+# ciphers whose output for each character does not depend on the others
+POSITION_INDEPENDENT = ['c', 'k', 'p']
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _container_cipher(cipher_id, parameters):
+    '''creates the cipher (see secret_messages.create_cipher), making sure
+    it is one a container can hold and that it is not grouping its output
+    '''
+    if cipher_id not in POSITION_INDEPENDENT:
+        raise ValueError("Cipher {!r} cannot be used in a container; choose "
+                         "one of {}".format(cipher_id, POSITION_INDEPENDENT))
+    if int(parameters.get('grouping', 0)) != 0:
+        raise ValueError("Containers cannot use grouping")
+    parameters = dict(parameters)
+    if 'grouping' in dict(VALID_CIPHERS[cipher_id]['parameters']):
+        parameters['grouping'] = 0
+    return create_cipher(cipher_id, parameters)
+
+
+def write_container(path, plaintext, cipher_id, parameters=None, pad=None,
+                    chunk_size=CHUNK_SIZE):
+    '''Encrypts plaintext in chunks of chunk_size characters and writes it
+    to a container file at path.
+    - cipher_id: 'c', 'k' or 'p' (see secret_messages.VALID_CIPHERS)
+    - parameters: a dictionary of arguments for the cipher (any that are
+      left out use the defaults)
+    - pad: an optional OneTimePad, at least as long as the reduced
+      plaintext
+    '''
+    parameters = dict(parameters or {})
+    cipher = _container_cipher(cipher_id, parameters)
+    plaintext = cipher._reduce_characters(plaintext)
+    if pad is not None:
+        if pad.error is not None or pad.pad_numbers is None:
+            raise ValueError("Invalid pad: {}".format(pad.error))
+        if len(pad.pad_numbers) < len(plaintext):
+            raise ValueError("Pad must be at least as long as the text")
+
+    header = json.dumps({
+        'cipher': cipher_id,
+        'parameters': parameters,
+        'chunk_size': chunk_size,
+        'length': len(plaintext),
+        'padded': pad is not None,
+    }).encode('utf-8')
+
+    index = []
+    with open(path, 'wb') as file:
+        file.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        file.write(header)
+        for start in range(0, len(plaintext), chunk_size):
+            chunk = plaintext[start:start + chunk_size]
+            if pad is not None:
+                chunk = pad.apply_one_time_pad(chunk, cipher,
+                                               pad_offset=start)
+            data = cipher.encrypt(chunk).encode('utf-8')
+            index.append((start, file.tell(), len(data)))
+            file.write(data)
+        index_offset = file.tell()
+        for entry in index:
+            file.write(INDEX_ENTRY.pack(*entry))
+        file.write(FOOTER.pack(index_offset, len(index), MAGIC))
+
+
+class ContainerReader:
+    '''Decrypts parts of a container file without reading the rest of it.
+    The file is memory-mapped, so only the pages holding the chunk index
+    and the chunks that are asked for are read from disk
+    '''
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError("Not a container file")
+
+        magic, version, header_length = PREAMBLE.unpack_from(self.map, 0)
+        footer_offset = len(self.map) - FOOTER.size
+        index_offset, chunk_count, end_magic = FOOTER.unpack_from(
+            self.map, footer_offset)
+        if magic != MAGIC or end_magic != MAGIC:
+            self.close()
+            raise ValueError("Not a container file")
+        if version != VERSION:
+            self.close()
+            raise ValueError("Unsupported version {}".format(version))
+
+        header = self.map[PREAMBLE.size:PREAMBLE.size + header_length]
+        self.header = json.loads(header.decode('utf-8'))
+        self.length = self.header['length']
+        self.cipher = _container_cipher(self.header['cipher'],
+                                        self.header['parameters'])
+
+        self.index = [INDEX_ENTRY.unpack_from(self.map,
+                                              index_offset +
+                                              i * INDEX_ENTRY.size)
+                      for i in range(chunk_count)]
+        self.starts = [entry[0] for entry in self.index]
+
+    def read(self, start=0, stop=None, pad=None):
+        '''returns the decrypted plaintext from position start up to (but
+        not including) stop. If the container was written with a pad, the
+        same pad must be given
+        '''
+        if self.header['padded'] and pad is None:
+            raise ValueError("This container needs its one-time pad")
+        if stop is None or stop > self.length:
+            stop = self.length
+        start = max(start, 0)
+        if start >= stop:
+            return ""
+
+        first = bisect.bisect_right(self.starts, start) - 1
+        last = bisect.bisect_left(self.starts, stop)
+        pieces = []
+        for chunk_start, offset, length in self.index[first:last]:
+            data = self.map[offset:offset + length].decode('utf-8')
+            text = self.cipher.decrypt(data)
+            if pad is not None:
+                text = pad.apply_one_time_pad(text, self.cipher,
+                                              encrypt_mode=False,
+                                              pad_offset=chunk_start)
+            pieces.append(text)
+        text = "".join(pieces)
+        offset = self.starts[first]
+        return text[start - offset:stop - offset]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    # Dunder methods
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        text = "ContainerReader (cipher: {}, parameters: {}, length: {})"
+        return text.format(self.header['cipher'], self.header['parameters'],
+                           self.length)
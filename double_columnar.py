@@ -0,0 +1,111 @@
+import columnar
+from ciphers import Cipher, TranslationTable
+
+
+class DoubleColumnar(Cipher):
+    '''This is a double columnar transposition cipher: the plaintext is
+    written in rows under a keyphrase and read out column by column in
+    alphabetical order of the keyphrase, and the result is put through
+    the same again under a second keyphrase.
+    For a detailed explanation of the algorithm, together with a worked
+    example, see this wikipedia page:
+    <https://en.wikipedia.org/wiki/Transposition_cipher#Double_transposition>
+
+    This implementation has the following options:
+    - keyphrase (default='PRIVACY'): the keyphrase for the first
+      transposition
+    - second_keyphrase (default='SECRETS'): the keyphrase for the second
+      transposition
+    - grouping (default=5): the number of characters in a group (choose 0 to
+                            not implement grouping)
+    '''
+    def __init__(self, keyphrase='PRIVACY', second_keyphrase='SECRETS',
+                 grouping=5):
+        if not keyphrase or not second_keyphrase:
+            raise ValueError("Both keyphrases need at least one character")
+        self.keyphrase = keyphrase
+        self.second_keyphrase = second_keyphrase
+        self.grouping = grouping
+        self.PASSTHROUGH_CHARACTERS = []
+
+    def encrypt(self, plaintext):
+        '''Takes a string and returns an encrypted string. Both
+        transpositions are composed into one permutation for the length of
+        the text (see columnar.py), so the text is gathered only once
+        '''
+        text = self._reduce_characters(plaintext).lower()
+        return self._group_text(columnar.transpose(text, *self._keyphrases()))
+
+    def decrypt(self, ciphertext):
+        '''Takes an encrypted string and returns an decrypted string
+        '''
+        text = self._ungroup_text(ciphertext)
+        return columnar.restore(text, *self._keyphrases())
+
+    def encrypt_many(self, plaintexts):
+        '''Takes a sequence of strings and returns a list of the encrypted
+        strings, reducing the characters of every message with one
+        translation table
+        '''
+        def reduce_character(character):
+            if character.lower() in self.VALID_CHARACTERS:
+                return character.lower()
+            return ''
+
+        table = TranslationTable(reduce_character)
+        keyphrases = self._keyphrases()
+        return [self._group_text(columnar.transpose(
+                    plaintext.translate(table), *keyphrases))
+                for plaintext in plaintexts]
+
+    # Helper methods
+    def _keyphrases(self):
+        '''the keyphrases are upper cased, so 'Zebra' and 'ZEBRA' give
+        the same columns
+        '''
+        return (self.keyphrase.upper(), self.second_keyphrase.upper())
+
+    # Dunder methods
+    def __repr__(self):
+        text = ("Double Columnar Transposition Cipher (keyphrases: {}, {}, "
+                "grouping: {})")
+        return text.format(self.keyphrase, self.second_keyphrase,
+                           self.grouping)
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    def run_tests(cipher_class, plaintext, tests):
+        for key, value in tests.items():
+            print('\ntest {}'.format(key))
+            kwargs = value
+            cipher = cipher_class(**kwargs)
+            print("encrypting {}:".format(plaintext))
+            encrypted = cipher.encrypt(plaintext)
+            print(encrypted)
+            print("decrypting {}:".format(encrypted))
+            decrypted = cipher.decrypt(encrypted)
+            print(decrypted)
+
+    print("Run Test Suite")
+    print("==============")
+    tests = {
+        'a: defaults': {},
+        'b: keyphrases only ("People", "Zebra")': {
+            'keyphrase': 'PEOPLE', 'second_keyphrase': 'ZEBRA'},
+        'c: grouping only (none)': {'grouping': 0},
+        'd: grouping only (3)': {'grouping': 3},
+    }
+
+    test_sets = [
+        'the quick brown fox jumps over the lazy dog',
+        'numb3r5 and punctuat!0n',
+        'Hello Peers'
+    ]
+
+    for i in range(len(test_sets)):
+        print("\nTest set {}:".format(i + 1))
+        print("-----------")
+        plaintext = test_sets[i]
+        run_tests(DoubleColumnar, plaintext, tests)
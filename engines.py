@@ -0,0 +1,338 @@
+'''Picks the fastest way to run encrypt and decrypt for each message.
+
+Each cipher has two engines:
+- 'python': the original character-by-character loops in encrypt and
+  decrypt. These are the reference implementation, and have the least
+  set-up cost, so they win on short messages
+- 'table': the batch methods (encrypt_many, decrypt_many), which build a
+  translation table or permutation first and then do the work in C. These
+  win once the message is long enough to pay for the set-up
+
+encrypt and decrypt are decorated with dispatch, which runs the table
+engine for messages at or above a crossover length and the python engine
+below it. The crossover for each cipher class and operation is taken from
+DEFAULT_THRESHOLDS (measured on a typical machine), unless it has been
+calibrated for this machine, which is an explicit step:
+    python engines.py --calibrate
+times both engines for every cipher and saves the crossovers to a cache
+on disk (CACHE_PATH, or wherever the CIPHER_ENGINE_CACHE environment
+variable points), which every later run reads. Nothing is timed or
+written as a side effect of encrypting. A class with no crossover at all
+uses the python engine.
+
+To always use one engine, call force('python') or force('table'), or set
+the CIPHER_ENGINE environment variable to the engine's name. force(None)
+goes back to choosing automatically.
+
+Running this file without --calibrate prints the crossovers in use:
+    python engines.py
+'''
+import argparse
+import contextlib
+import copy
+import functools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+
+ENGINES = ['python', 'table']
+
+ENVIRONMENT_VARIABLE = 'CIPHER_ENGINE'
+CACHE_VARIABLE = 'CIPHER_ENGINE_CACHE'
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache',
+                          'secret_messages', 'engines.json')
+CACHE_VERSION = 1
+
+# the crossovers used until the machine is calibrated: the shortest
+# message for which the table engine is used (None for never). These are
+# the longest of three calibration runs, as the two engines take much the
+# same time near the crossover
+DEFAULT_THRESHOLDS = {
+    'Caesar.encrypt': 64,
+    'Caesar.decrypt': 256,
+    'Keyword.encrypt': 1024,
+    'Keyword.decrypt': 1024,
+    'PolybiusSquare.encrypt': 64,
+    'PolybiusSquare.decrypt': 16,
+    'Transposition.encrypt': 256,
+    'Transposition.decrypt': 64,
+}
+
+# the message lengths that calibration tries, and how long to spend timing
+# each engine at each length
+CALIBRATION_SIZES = [1, 4, 16, 64, 256, 1024, 4096]
+CALIBRATION_SECONDS = 0.002
+
+_forced = None
+_thresholds = None
+_running_batch = threading.local()
+
+
+def force(engine):
+    '''makes every cipher use the given engine (or choose automatically
+    again, if engine is None)
+    '''
+    global _forced
+    if engine is not None and engine not in ENGINES:
+        raise ValueError("Unknown engine {!r}; choose one of {}".format(
+            engine, ENGINES))
+    _forced = engine
+
+
+def forced_engine():
+    '''returns the engine set by force or the environment, or None'''
+    if _forced is not None:
+        return _forced
+    engine = os.environ.get(ENVIRONMENT_VARIABLE, '')
+    if engine in ENGINES:
+        return engine
+    return None
+
+
+def choose(cipher, operation, length):
+    '''returns the name of the engine to use for running operation
+    ('encrypt' or 'decrypt') on a message of the given length
+    '''
+    engine = forced_engine()
+    if engine is not None:
+        return engine
+    threshold = _load_thresholds().get(_key(type(cipher), operation))
+    if threshold is not None and length >= threshold:
+        return 'table'
+    return 'python'
+
+
+def dispatch(batch_method):
+    '''decorates a cipher's encrypt or decrypt method (the python engine)
+    so that long messages are passed to batch_method (the table engine)
+    instead
+    '''
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, text, *args, **kwargs):
+            if (not getattr(_running_batch, 'active', False) and
+                    choose(self, method.__name__, len(text)) == 'table'):
+                with _batch_running():
+                    batch = getattr(self, batch_method)
+                    return batch([text], *args, **kwargs)[0]
+            return method(self, text, *args, **kwargs)
+        wrapper.reference = method
+        return wrapper
+    return decorator
+
+
+def calibrate(cipher):
+    '''times both engines on messages of increasing length for the class
+    of cipher, and returns a dictionary of crossover lengths:
+    {'Class.operation': length}, where length is the shortest message for
+    which the table engine was faster at that length and every longer one
+    (or None if it never was). Returns None if the engines could not be
+    timed.
+    The crossovers are shared by the whole class, so they are measured
+    with the class's default settings rather than with cipher's own
+    (which may not be able to encrypt the calibration text)
+    '''
+    # imported here, as instrumentation imports the cipher classes
+    import instrumentation
+
+    cls = type(cipher)
+    try:
+        cipher = cls()
+    except (TypeError, ValueError):
+        # the class has no defaults; work on a copy, as some ciphers
+        # change their own settings as they run
+        cipher = copy.copy(cipher)
+    generator = random.Random(0)
+    letters = 'abcdefghijklmnopqrstuvwxyz '
+    crossovers = {}
+    timings = {'encrypt': [], 'decrypt': []}
+    for size in CALIBRATION_SIZES:
+        plaintext = "".join(generator.choice(letters) for _ in range(size))
+        try:
+            with _batch_running(), instrumentation.paused():
+                ciphertext = cls.encrypt.reference(cipher, plaintext)
+                timings['encrypt'].append(_compare(
+                    lambda: cls.encrypt.reference(cipher, plaintext),
+                    lambda: cipher.encrypt_many([plaintext])))
+                timings['decrypt'].append(_compare(
+                    lambda: cls.decrypt.reference(cipher, ciphertext),
+                    lambda: cipher.decrypt_many([ciphertext])))
+        except Exception:
+            return None
+
+    for operation, table_faster in timings.items():
+        crossover = None
+        for size, faster in zip(CALIBRATION_SIZES[::-1], table_faster[::-1]):
+            if not faster:
+                break
+            crossover = size
+        crossovers[_key(cls, operation)] = crossover
+    return crossovers
+
+
+def python_only():
+    '''returns a context manager within which every encrypt and decrypt
+    call (in this thread) uses the python engine, as they do inside a
+    batch method
+    '''
+    return _batch_running()
+
+
+def calibrate_all():
+    '''calibrates every cipher class in VALID_CIPHERS that has both
+    engines, saves the crossovers to the cache and returns them all
+    (DEFAULT_THRESHOLDS included, for the classes that could not be timed)
+    '''
+    from secret_messages import VALID_CIPHERS
+
+    reset()
+    thresholds = _load_thresholds()
+    for entry in VALID_CIPHERS.values():
+        cipher = entry['class'](**dict(entry['parameters']))
+        crossovers = calibrate(cipher)
+        if crossovers is not None:
+            thresholds.update(crossovers)
+    _save_thresholds(thresholds)
+    return thresholds
+
+
+def reset():
+    '''forgets the calibrated crossovers (in memory and on disk), going
+    back to DEFAULT_THRESHOLDS
+    '''
+    global _thresholds
+    _thresholds = None
+    try:
+        os.remove(_cache_path())
+    except OSError:
+        pass
+
+
+# Helper functions
+def _key(cls, operation):
+    return "{}.{}".format(cls.__name__, operation)
+
+
+@contextlib.contextmanager
+def _batch_running():
+    '''while a batch method is running, any encrypt or decrypt calls it
+    makes (e.g. when it falls back to the per-message methods) use the
+    python engine
+    '''
+    active = getattr(_running_batch, 'active', False)
+    _running_batch.active = True
+    try:
+        yield
+    finally:
+        _running_batch.active = active
+
+
+def _compare(python_engine, table_engine):
+    '''returns True if table_engine runs faster than python_engine'''
+    return _time(table_engine) < _time(python_engine)
+
+
+def _time(function):
+    '''returns the best time for one call to function, out of a few runs
+    of at least CALIBRATION_SECONDS each
+    '''
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= CALIBRATION_SECONDS:
+            break
+        loops *= 2
+    best = elapsed
+    for _ in range(2):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / loops
+
+
+def _cache_path():
+    return os.environ.get(CACHE_VARIABLE) or CACHE_PATH
+
+
+def _load_thresholds():
+    '''returns the crossovers: DEFAULT_THRESHOLDS, updated from the cache
+    the first time. Crossovers measured by a different Python are ignored
+    '''
+    global _thresholds
+    if _thresholds is None:
+        _thresholds = dict(DEFAULT_THRESHOLDS)
+        try:
+            with open(_cache_path()) as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            cached = {}
+        if (cached.get('version') == CACHE_VERSION and
+                cached.get('python') == platform.python_version()):
+            _thresholds.update(cached.get('thresholds', {}))
+    return _thresholds
+
+
+def _save_thresholds(thresholds):
+    '''writes the crossovers to the cache (if it can be written). Each
+    writer has a temporary file of its own in the same directory, which
+    replaces the cache in one step, so processes calibrating at the same
+    time cannot mix their writes or leave a partly written cache
+    '''
+    path = _cache_path()
+    document = {
+        'version': CACHE_VERSION,
+        'python': platform.python_version(),
+        'thresholds': thresholds,
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=directory, prefix='.engines-', suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(document, file, indent=2, sort_keys=True)
+        os.replace(temporary_path, path)
+    except OSError:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Show or calibrate the engine crossover lengths")
+    parser.add_argument('--calibrate', action='store_true',
+                        help="time both engines for every cipher and save "
+                             "the crossovers for this machine")
+    options = parser.parse_args(arguments)
+
+    if options.calibrate:
+        thresholds = calibrate_all()
+    else:
+        thresholds = _load_thresholds()
+
+    print("Crossover lengths (table engine at or above):")
+    for key, threshold in sorted(thresholds.items()):
+        print("{:30} {}".format(key, threshold))
+    if options.calibrate:
+        print("\nSaved to {}".format(_cache_path()))
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+'''Guesses which cipher produced a ciphertext, from a sample of it.
+
+Only the first sample_size characters are looked at (with the length of
+the whole text, and its last few characters to see if it ends in a
+newline), so the guess takes the same time however long the
+ciphertext is. The sample is measured for:
+- its symbols: ADFGVX writes only the letters A, D, F, G, V and X, a
+  Polybius square only digits, and Caesar (unlike Keyword and
+  Transposition) upper case letters
+- its spaces: grouping puts one after every few characters, while Caesar
+  and Keyword without grouping keep the spaces between words
+- the letter frequencies: Transposition keeps those of English, Caesar
+  shifts them along the alphabet and Keyword shuffles them. Each is
+  compared with the best fit any shuffle could give (the frequencies
+  sorted against English's), since even English text is some way off
+  the average. The index of coincidence stays that of English for all
+  three, and if it does not the frequencies are not counted
+- the length without grouping spaces: ADFGVX and Polybius ciphertexts
+  always have an even number of symbols
+
+Each cipher gets a score from these, and identify returns the cipher
+names with the probability of each, most likely first:
+
+    identify(ciphertext)
+    [('Keyword', 0.93), ('Caesar', 0.04), ...]
+
+or from the command line:
+    python identify.py message.txt
+'''
+import argparse
+import math
+import os
+import string
+import sys
+
+from scoring import ENGLISH_FREQUENCIES
+
+
+CIPHER_NAMES = ['Caesar', 'Keyword', 'Transposition', 'PolybiusSquare',
+                'Adfgvx']
+
+SAMPLE_SIZE = 4096
+
+# bytes read from the end of a file to find any trailing spaces
+TAIL_SIZE = 64
+
+ADFGVX_SYMBOLS = set('ADFGVXadfgvx')
+
+# the index of coincidence of English text, and of random letters
+ENGLISH_COINCIDENCE = 0.066
+RANDOM_COINCIDENCE = 1 / 26
+# the letters needed before the index of coincidence can be relied on
+COINCIDENCE_LETTERS = 100
+
+# how much further from English (in chi-squared per letter) the letter
+# frequencies of a Keyword ciphertext are expected to be than the closest
+# they could be rearranged to, at the least
+KEYWORD_MARGIN = 0.5
+
+# how much the case of the letters counts towards (or against) Caesar
+CASE_WEIGHT = 10
+
+_LETTERS = string.ascii_lowercase
+_EXPECTED = [ENGLISH_FREQUENCIES[letter] / 100 for letter in _LETTERS]
+_SORTED_EXPECTED = sorted(_EXPECTED)
+
+
+def identify(ciphertext, sample_size=SAMPLE_SIZE):
+    '''returns a list of (cipher name, probability), most likely first'''
+    sample, length = _trim(ciphertext[:sample_size],
+                           ciphertext[-TAIL_SIZE:], len(ciphertext))
+    return _rank(measure(sample, length))
+
+
+def identify_file(path, sample_size=SAMPLE_SIZE):
+    '''as identify, reading only the start (and the last few bytes) of the
+    file at path
+    '''
+    length = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        head = file.read(sample_size)
+        file.seek(max(length - TAIL_SIZE, 0))
+        tail = file.read()
+    sample, length = _trim(head, tail, length)
+    return _rank(measure(sample.decode('utf-8', errors='ignore'), length))
+
+
+def measure(sample, length):
+    '''returns a dictionary of the statistics of the sample that the
+    scores are worked out from (see the module docstring)
+    '''
+    symbols = [character for character in sample if not character.isspace()]
+    letters = [character.lower() for character in symbols
+               if character.lower() in _LETTERS]
+    counts = [0] * len(_LETTERS)
+    for letter in letters:
+        counts[ord(letter) - ord('a')] += 1
+
+    grouping = _grouping(sample)
+    return {
+        'symbols': len(symbols),
+        'letters': len(letters),
+        'digits_only': bool(symbols) and all(character.isdigit()
+                                             for character in symbols),
+        'adfgvx_only': bool(symbols) and all(character in ADFGVX_SYMBOLS
+                                             for character in symbols),
+        'upper_case': _fraction(sum(character.isupper()
+                                    for character in symbols),
+                                len(letters)),
+        'grouping': grouping,
+        'word_spaces': grouping is None and ' ' in sample.strip(),
+        'coincidence': _coincidence(counts),
+        'chi_squared': _chi_squared(counts),
+        'shifted_chi_squared': min(_chi_squared(counts[shift:] +
+                                                counts[:shift])
+                                   for shift in range(1, len(_LETTERS))),
+        'sorted_chi_squared': _chi_squared(sorted(counts), _SORTED_EXPECTED),
+        'even_length': _ungrouped_length(sample, length, grouping) % 2 == 0,
+    }
+
+
+# Helper functions
+def _trim(head, tail, length):
+    '''takes the start and end of a text (str or bytes) and its length,
+    and returns the start and the length without any spaces (e.g. a
+    final newline) at either end
+    '''
+    leading = len(head) - len(head.lstrip())
+    trailing = len(tail) - len(tail.rstrip())
+    length = max(length - leading - trailing, 0)
+    return head[leading:leading + length], length
+
+
+def _rank(features):
+    scores = _scores(features)
+    highest = max(scores.values())
+    weights = {name: math.exp(score - highest)
+               for name, score in scores.items()}
+    total = sum(weights.values())
+    return sorted(((name, weight / total) for name, weight in
+                   weights.items()), key=lambda item: -item[1])
+
+
+def _scores(features):
+    '''returns a score for each cipher name, where each point is a factor
+    of e in how likely it is
+    '''
+    scores = dict.fromkeys(CIPHER_NAMES, 0.0)
+    letter_ciphers = ['Caesar', 'Keyword', 'Transposition']
+
+    if features['symbols'] == 0:
+        return scores
+    if features['digits_only']:
+        for name in CIPHER_NAMES:
+            scores[name] -= 10
+        scores['PolybiusSquare'] += 10
+    else:
+        scores['PolybiusSquare'] -= 10
+    if features['adfgvx_only']:
+        # at random, the odds of every letter being one of the six
+        # fall fast with the number of letters
+        scores['Adfgvx'] += min(features['letters'], 40) * 0.5
+    else:
+        scores['Adfgvx'] -= 10
+    if not features['even_length']:
+        scores['PolybiusSquare'] -= 5
+        scores['Adfgvx'] -= 5
+    if features['word_spaces']:
+        for name in ['Transposition', 'PolybiusSquare', 'Adfgvx']:
+            scores[name] -= 5
+
+    if features['letters'] and not features['adfgvx_only']:
+        # Keyword can turn any letter into any other, so the letter
+        # frequencies fit English as well as they can be made to (sorted
+        # against each other). Transposition must fit about as well
+        # with the letters left as they are, and Caesar with them shifted
+        margin = KEYWORD_MARGIN + 20 / features['letters']
+        if (features['letters'] >= COINCIDENCE_LETTERS and
+                features['coincidence'] < (ENGLISH_COINCIDENCE +
+                                           RANDOM_COINCIDENCE) / 2):
+            # the letters are not from a single English alphabet
+            weight = 0
+        else:
+            # how much the letter statistics can be trusted
+            weight = min(features['letters'], 200) / 20
+        best = features['sorted_chi_squared']
+        scores['Transposition'] -= weight * (features['chi_squared'] - best)
+        scores['Caesar'] -= weight * (features['shifted_chi_squared'] - best)
+        scores['Keyword'] -= weight * margin
+        # Caesar writes upper case letters and the others lower case
+        upper = features['upper_case']
+        scores['Caesar'] += CASE_WEIGHT * (upper - 0.5)
+        for name in ['Keyword', 'Transposition']:
+            scores[name] -= CASE_WEIGHT * (upper - 0.5)
+    for name in letter_ciphers:
+        if features['digits_only'] or features['adfgvx_only']:
+            scores[name] -= 5
+    return scores
+
+
+def _grouping(sample):
+    '''returns the group size if the sample is grouped (every word but the
+    last the same length), otherwise None
+    '''
+    words = sample.split(' ')
+    if len(words) < 3:
+        return None
+    # the last word may be cut short, by grouping or by the sample
+    sizes = set(len(word) for word in words[:-1])
+    if len(sizes) == 1 and len(words[-1]) <= len(words[0]):
+        return sizes.pop()
+    return None
+
+
+def _ungrouped_length(sample, length, grouping):
+    '''returns the length of the whole text without grouping spaces,
+    worked out from its grouped length
+    '''
+    if grouping is None:
+        return length - sample.count(' ') if len(sample) == length else length
+    # length = symbols + spaces, where there is one space less than the
+    # number of groups
+    groups = -(-(length + 1) // (grouping + 1))
+    return length - (groups - 1)
+
+
+def _coincidence(counts):
+    total = sum(counts)
+    if total < 2:
+        return 0.0
+    return sum(count * (count - 1) for count in counts) / (total *
+                                                           (total - 1))
+
+
+def _chi_squared(counts, expected_fractions=_EXPECTED):
+    '''returns the chi-squared statistic of the letter counts against
+    English, divided by the number of letters
+    '''
+    total = sum(counts)
+    if not total:
+        return math.inf
+    return sum((count - expected * total) ** 2 / (expected * total)
+               for count, expected in zip(counts,
+                                          expected_fractions)) / total
+
+
+def _fraction(part, whole):
+    if not whole:
+        return 0.0
+    return part / whole
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Guess which cipher produced a ciphertext")
+    parser.add_argument('input', help="file holding the ciphertext")
+    parser.add_argument('--sample-size', type=int, default=SAMPLE_SIZE,
+                        help="characters to read from the start of the "
+                             "file")
+    options = parser.parse_args(arguments)
+
+    for name, probability in identify_file(options.input,
+                                           options.sample_size):
+        print("{:15} {:6.1%}".format(name, probability))
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+'''Opt-in hooks around the stages of the cipher classes.
+
+Nothing in here runs unless an observer has been added. Adding the first
+observer wraps the stage methods of Cipher (and every subclass that has
+been imported, or is imported later on) and OneTimePad; removing the last
+observer puts the original methods back, so there is no cost at all when
+disabled. An
+observer can ask for just some of the stages, in which case only the
+stages some observer wants are wrapped.
+
+An observer is any callable that takes:
+- cipher_name: the name of the class of the object that was called
+- stage: the name of the method, e.g. '_reduce_characters'
+- seconds: the wall time spent in the call
+- size_in: the length of the text passed in
+- size_out: the length of the text returned (0 if the call failed)
+- error: the exception raised by the call, or None
+'''
+import contextlib
+import functools
+import time
+
+import ciphers
+from ciphers import Cipher
+from one_time_pad import OneTimePad
+
+
+CIPHER_STAGES = [
+    '_reduce_characters',
+    'encrypt',
+    'decrypt',
+    '_group_text',
+    '_ungroup_text',
+]
+
+PAD_STAGES = [
+    'apply_one_time_pad',
+    # the pad and the cipher together (fused into one pass for Caesar and
+    # Keyword, so the cipher's own stages are not called)
+    'encrypt',
+    'decrypt',
+]
+
+_observers = []
+_originals = {}
+# the stages that are wrapped at the moment
+_installed = set()
+_paused = 0
+
+
+def add_observer(observer, stages=None):
+    '''starts sending stage timings to observer (installing the hooks if
+    this is the first observer). If stages is given, only those stages are
+    sent to it, and the others are left unwrapped unless another observer
+    needs them
+    '''
+    _observers.append((observer, stages))
+    _reinstall()
+
+
+def remove_observer(observer):
+    '''stops sending stage timings to observer (removing the hooks if this
+    was the last observer)
+    '''
+    for i, (existing, _) in enumerate(_observers):
+        if existing == observer:
+            del _observers[i]
+            break
+    else:
+        raise ValueError("{!r} is not an observer".format(observer))
+    _reinstall()
+
+
+def is_enabled():
+    return bool(_observers)
+
+
+@contextlib.contextmanager
+def paused():
+    '''stops sending stage timings to the observers inside the with block
+    (e.g. while engines.calibrate is timing the ciphers)
+    '''
+    global _paused
+    _paused += 1
+    try:
+        yield
+    finally:
+        _paused -= 1
+
+
+def _cipher_classes():
+    '''returns Cipher and all of its (imported) subclasses'''
+    classes = [Cipher]
+    for cls in classes:
+        for subclass in cls.__subclasses__():
+            if subclass not in classes:
+                classes.append(subclass)
+    return classes
+
+
+def _wanted_stages():
+    '''returns the stages that at least one observer wants'''
+    wanted = set()
+    for _, stages in _observers:
+        wanted.update(CIPHER_STAGES + PAD_STAGES if stages is None
+                      else stages)
+    return wanted
+
+
+def _reinstall():
+    '''wraps just the stages the current observers want'''
+    _uninstall()
+    if _observers:
+        _install(_wanted_stages())
+
+
+def _install(wanted):
+    _installed.update(wanted)
+    for cls in _cipher_classes():
+        _install_class(cls, CIPHER_STAGES)
+    _install_class(OneTimePad, PAD_STAGES)
+
+
+def _install_class(cls, stages):
+    for stage in stages:
+        if stage not in _installed:
+            continue
+        # only wrap methods defined on the class itself; inherited ones
+        # are wrapped on the class that defines them
+        if stage in cls.__dict__:
+            original = cls.__dict__[stage]
+            _originals[(cls, stage)] = original
+            setattr(cls, stage, _wrap(original, stage))
+
+
+def _uninstall():
+    for (cls, stage), original in _originals.items():
+        setattr(cls, stage, original)
+    _originals.clear()
+    _installed.clear()
+
+
+def _new_cipher_class(cls):
+    '''wraps the stages of a cipher class defined while the hooks are
+    installed
+    '''
+    if _installed:
+        _install_class(cls, CIPHER_STAGES)
+
+
+ciphers.SUBCLASS_HOOKS.append(_new_cipher_class)
+
+
+def _size(value):
+    if isinstance(value, str):
+        return len(value)
+    return 0
+
+
+def _wrap(method, stage):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        size_in = _size(args[0]) if args else 0
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception as error:
+            seconds = time.perf_counter() - start
+            _notify(type(self).__name__, stage, seconds, size_in, 0, error)
+            raise
+        seconds = time.perf_counter() - start
+        _notify(type(self).__name__, stage, seconds, size_in, _size(result),
+                None)
+        return result
+    return wrapper
+
+
+def _notify(cipher_name, stage, seconds, size_in, size_out, error):
+    if _paused:
+        return
+    for observer, stages in _observers:
+        if stages is None or stage in stages:
+            observer(cipher_name, stage, seconds, size_in, size_out, error)
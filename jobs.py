@@ -0,0 +1,206 @@
+'''Runs batches of encryption jobs without the interactive menu.
+
+Jobs are read as JSON lines, one object per line:
+    {"cipher": "k", "parameters": {"keyphrase": "SECRET"},
+     "process": "e", "pad": "3,4,17", "text": "Hello"}
+- cipher: one of the keys of secret_messages.VALID_CIPHERS
+- parameters (optional): the cipher's arguments; any that are left out
+  use the same defaults as the menu
+- process: 'e' to encrypt or 'd' to decrypt
+- pad (optional): a one-time pad, as the menu would accept it
+- pad_seed (optional): instead of pad, a seed to work the pad numbers
+  out from (see one_time_pad.SeededPad)
+- text: the message
+- id (optional): copied into the result, to help match results to jobs
+
+Parameters are checked the same way the menu checks its answers (by
+secret_messages.create_cipher), and the job is run the same way the menu
+runs it (including the one-time pad).
+
+Results are written as JSON lines in the same order as the jobs. Each is
+either {"line": 1, "id": ..., "text": "..."} or, if the job could not be
+run, {"line": 1, "id": ..., "error": "..."}; a bad job never stops the
+rest of the batch.
+
+The jobs are spread over a pool of processes, with at most max_in_flight
+of them submitted at once, so a large file is never read into memory in
+one go. Repeated messages can be served from a ResultCache (see
+result_cache.py) with --cache-bytes, shared between the workers through
+an SQLite file with --cache-db.
+
+Example:
+    python jobs.py jobs.jsonl results.jsonl --workers 4
+(use - for standard input or output)
+'''
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+
+from one_time_pad import OneTimePad, SeededPad
+from result_cache import ResultCache
+from secret_messages import VALID_CIPHERS, create_cipher
+
+
+VALID_PROCESSES = ['e', 'd']
+
+# each worker process's result cache (see start_cache)
+_cache = None
+
+
+def run_job(job):
+    '''runs a single job (a dictionary, as described above) and returns
+    the processed text
+    '''
+    cipher_id = job.get('cipher')
+    if cipher_id not in VALID_CIPHERS:
+        raise ValueError("Unknown cipher {!r}; choose one of {}".format(
+            cipher_id, list(VALID_CIPHERS)))
+    process = job.get('process')
+    if process not in VALID_PROCESSES:
+        raise ValueError("Unknown process {!r}; choose one of {}".format(
+            process, VALID_PROCESSES))
+    text = job.get('text')
+    if not isinstance(text, str):
+        raise ValueError("Job has no text")
+    parameters = job.get('parameters') or {}
+    if not isinstance(parameters, dict):
+        raise ValueError("Parameters should be an object")
+    cipher_entry = VALID_CIPHERS[cipher_id]
+
+    pad = None
+    if job.get('pad') and job.get('pad_seed'):
+        raise ValueError("Give either a pad or a pad_seed, not both")
+    if job.get('pad'):
+        pad = OneTimePad(job['pad'], text, cipher_entry, process)
+    elif job.get('pad_seed'):
+        pad = SeededPad(job['pad_seed'], text, cipher_entry, process)
+    if pad is not None:
+        if pad.error is not None:
+            raise ValueError("Invalid pad: {}".format(pad.error))
+
+    cipher = create_cipher(cipher_id, parameters, process, pad)
+
+    if _cache is not None:
+        if process == 'e':
+            return _cache.encrypt(cipher, text, pad)
+        return _cache.decrypt(cipher, text, pad)
+
+    if process == 'e':
+        if pad is not None:
+            return pad.encrypt(text, cipher)
+        return cipher.encrypt(text)
+    else:  # process == 'd'
+        if pad is not None:
+            return pad.decrypt(text, cipher)
+        return cipher.decrypt(text)
+
+
+def start_cache(max_bytes, path=None):
+    '''gives this process a ResultCache for run_job to use (jobs with a
+    one-time pad always bypass it)
+    '''
+    global _cache
+    _cache = ResultCache(max_bytes, path)
+
+
+def run_jobs(lines, workers=None, max_in_flight=None, cache_bytes=None,
+             cache_path=None):
+    '''Takes an iterable of JSON lines and yields a result dictionary for
+    each one, in the same order
+    - workers: the number of processes (default: one per CPU)
+    - max_in_flight: the most jobs to have submitted but not yet written
+      out (default: four per worker)
+    - cache_bytes: if given, each worker keeps a cache of results of up to
+      this many bytes
+    - cache_path: if given (with cache_bytes), an SQLite file that the
+      workers share as a second tier of the cache
+    '''
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 4 * workers
+    initializer, initargs = None, ()
+    if cache_bytes:
+        initializer, initargs = start_cache, (cache_bytes, cache_path)
+    pending = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=initializer, initargs=initargs) as executor:
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            pending.append(_submit(executor, line_number, line))
+            while len(pending) >= max_in_flight:
+                yield _result(*pending.popleft())
+        while pending:
+            yield _result(*pending.popleft())
+
+
+# Helper functions
+def _submit(executor, line_number, line):
+    '''parses the line and submits it to the pool. Returns the line
+    number, the job's id and either the future or the parsing error
+    '''
+    try:
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise ValueError("Each line should be a JSON object")
+    except ValueError as error:
+        return line_number, None, error
+    return line_number, job.get('id'), executor.submit(run_job, job)
+
+
+def _result(line_number, job_id, outcome):
+    result = {'line': line_number, 'id': job_id}
+    try:
+        if isinstance(outcome, Exception):
+            raise outcome
+        result['text'] = outcome.result()
+    except Exception as error:
+        result['error'] = "{}: {}".format(type(error).__name__, error)
+    return result
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Run a file of JSON-lines cipher jobs")
+    parser.add_argument('input', help="the jobs file (- for stdin)")
+    parser.add_argument('output', help="the results file (- for stdout)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of processes (default: CPU count)")
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help="most jobs queued at once "
+                             "(default: 4 per worker)")
+    parser.add_argument('--cache-bytes', type=int, default=None,
+                        help="cache results for repeated messages, up to "
+                             "this many bytes per worker")
+    parser.add_argument('--cache-db', default=None,
+                        help="SQLite file to share cached results between "
+                             "workers and runs")
+    options = parser.parse_args(arguments)
+
+    source = sys.stdin if options.input == '-' else open(options.input)
+    target = sys.stdout if options.output == '-' else open(options.output,
+                                                           'w')
+    failures = 0
+    try:
+        for result in run_jobs(source, options.workers,
+                               options.max_in_flight, options.cache_bytes,
+                               options.cache_db):
+            if 'error' in result:
+                failures += 1
+            target.write(json.dumps(result) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    if failures:
+        print("{} job(s) failed".format(failures), file=sys.stderr)
+        return 1
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
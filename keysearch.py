@@ -0,0 +1,443 @@
+'''Searches for the key of a Keyword, Adfgvx or Transposition ciphertext,
+spread over worker processes on one machine or many.
+
+The coordinator splits the key space into work units and hands them out
+over a socket. Each worker decrypts the ciphertext with every key in its
+unit, scores the results (see scoring.py) and sends back only the best
+top_k. The coordinator keeps the best top_k over all the units as the
+results come in.
+
+The key space is one of:
+- rails: every number of rails from low to high (Transposition)
+- words: the keyphrases in a word list (Keyword, Adfgvx)
+- letters: every keyphrase of up to max_length letters (Keyword, Adfgvx)
+
+The protocol is one JSON object per line, in both directions. A worker
+sends {"type": "request"} and gets back one of:
+- {"type": "unit", "unit": 7, "cipher": ..., "ciphertext": ...,
+   "top_k": ..., "keys": {...}}: a unit to search, whose keys are
+   described by "keys" (see expand_keys). The worker replies with
+   {"type": "result", "unit": 7, "candidates": [[score, key, text], ...]}
+   and then asks for another
+- {"type": "wait", "seconds": ...}: every unit is out; ask again later
+- {"type": "done"}: the search is finished
+
+A unit is handed out again if the worker it was given to disconnects, or
+has not replied within lease_seconds; whichever result arrives first is
+used. So workers can be stopped, killed or added at any time.
+
+Example, with four worker processes on this machine:
+    python keysearch.py coordinator message.txt --cipher t \\
+        --rails 2 500 --local-workers 4
+or with workers elsewhere:
+    python keysearch.py coordinator message.txt --cipher k \\
+        --words words.txt --host 0.0.0.0 --port 7000
+    python keysearch.py worker --host coordinator.example --port 7000
+'''
+import argparse
+import collections
+import heapq
+import itertools
+import json
+import multiprocessing
+import socket
+import socketserver
+import string
+import sys
+import threading
+import time
+
+from adfgvx import Adfgvx
+from keyword_cipher import Keyword
+from scoring import score
+from transposition import Transposition
+
+
+# the ciphers that can be searched, by the ids used in VALID_CIPHERS, with
+# the parameter that is the key
+SEARCHABLE = {
+    'k': (Keyword, 'keyphrase'),
+    'a': (Adfgvx, 'keyphrase'),
+    't': (Transposition, 'num_rails'),
+}
+
+UNIT_SIZE = 2000
+TOP_K = 10
+LEASE_SECONDS = 60.0
+WAIT_SECONDS = 0.5
+
+# how much of each candidate plaintext is kept
+PREVIEW_LENGTH = 80
+
+LETTERS = string.ascii_uppercase
+
+
+def rail_units(low, high, unit_size=UNIT_SIZE):
+    '''yields the key descriptions for every number of rails from low to
+    high (inclusive)
+    '''
+    for start in range(low, high + 1, unit_size):
+        yield {'kind': 'rails', 'start': start,
+               'stop': min(start + unit_size, high + 1)}
+
+
+def word_units(words, unit_size=UNIT_SIZE):
+    '''yields the key descriptions for the keyphrases in words'''
+    words = iter(words)
+    while True:
+        chunk = list(itertools.islice(words, unit_size))
+        if not chunk:
+            break
+        yield {'kind': 'words', 'words': chunk}
+
+
+def letter_units(max_length, unit_size=UNIT_SIZE, min_length=1):
+    '''yields the key descriptions for every keyphrase of min_length to
+    max_length letters (the keyphrases of each length are numbered in
+    order, 'A...A' to 'Z...Z')
+    '''
+    for length in range(min_length, max_length + 1):
+        total = len(LETTERS) ** length
+        for start in range(0, total, unit_size):
+            yield {'kind': 'letters', 'length': length, 'start': start,
+                   'stop': min(start + unit_size, total)}
+
+
+def expand_keys(keys):
+    '''yields the keys in a key description'''
+    if keys['kind'] == 'rails':
+        yield from range(keys['start'], keys['stop'])
+    elif keys['kind'] == 'words':
+        yield from keys['words']
+    elif keys['kind'] == 'letters':
+        for number in range(keys['start'], keys['stop']):
+            characters = []
+            for _ in range(keys['length']):
+                number, index = divmod(number, len(LETTERS))
+                characters.append(LETTERS[index])
+            yield "".join(reversed(characters))
+    else:
+        raise ValueError("Unknown kind of keys: {!r}".format(keys['kind']))
+
+
+def search(cipher_id, ciphertext, keys, top_k=TOP_K):
+    '''decrypts ciphertext with each of the keys and returns the top_k best
+    scoring as a list of [score, key, plaintext], best first. Keys the
+    cipher rejects are skipped
+    '''
+    cipher_class, parameter = SEARCHABLE[cipher_id]
+    if cipher_class is not Keyword:
+        # the spaces can only be grouping spaces
+        ciphertext = "".join(ciphertext.split())
+    candidates = []
+    for key in keys:
+        try:
+            cipher = cipher_class(**{parameter: key, 'grouping': 0})
+            plaintext = cipher.decrypt(ciphertext)
+        except Exception:
+            continue
+        candidate = (score(plaintext), key, plaintext[:PREVIEW_LENGTH])
+        if len(candidates) < top_k:
+            heapq.heappush(candidates, candidate)
+        elif candidate > candidates[0]:
+            heapq.heapreplace(candidates, candidate)
+    return [list(candidate) for candidate in sorted(candidates,
+                                                    reverse=True)]
+
+
+class Coordinator:
+    '''hands out the units (key descriptions from one of the *_units
+    functions) to workers and gathers the best candidates.
+    on_result, if given, is called with (unit number, candidates) as each
+    result arrives
+    '''
+    def __init__(self, cipher_id, ciphertext, units, top_k=TOP_K,
+                 lease_seconds=LEASE_SECONDS, on_result=None):
+        if cipher_id not in SEARCHABLE:
+            raise ValueError("Cannot search {!r}; choose one of {}".format(
+                cipher_id, list(SEARCHABLE)))
+        self.cipher_id = cipher_id
+        self.ciphertext = ciphertext
+        self.top_k = top_k
+        self.lease_seconds = lease_seconds
+        self.on_result = on_result
+        self.units = list(units)
+        self.pending = collections.deque(range(len(self.units)))
+        # unit number: (connection id, lease deadline)
+        self.leases = {}
+        self.completed = set()
+        self.reissued = 0
+        self.best = []
+        self.best_keys = set()
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.server = None
+        if not self.units:
+            self.finished.set()
+
+    def serve(self, host='127.0.0.1', port=0):
+        '''starts serving workers from a background thread and returns the
+        (host, port) address
+        '''
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._handle(self.rfile, self.wfile, id(self))
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  daemon=True)
+        thread.start()
+        return self.server.server_address
+
+    def wait(self, timeout=None):
+        '''waits until every unit has a result. Returns True if it has'''
+        return self.finished.wait(timeout)
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def results(self):
+        '''returns the best candidates so far, as [score, key, text], best
+        first
+        '''
+        with self.lock:
+            return [list(candidate) for candidate in sorted(self.best,
+                                                            reverse=True)]
+
+    def progress(self):
+        '''returns a dictionary of the numbers of units done, out with a
+        worker, waiting, and handed out more than once
+        '''
+        with self.lock:
+            return {'units': len(self.units),
+                    'completed': len(self.completed),
+                    'leased': len(self.leases),
+                    'pending': len(self.pending),
+                    'reissued': self.reissued}
+
+    # Helper methods
+    def _handle(self, rfile, wfile, connection):
+        '''talks to one worker until it disconnects, then hands back any
+        unit it still had
+        '''
+        try:
+            for line in rfile:
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    # valid JSON, but not a message from a worker
+                    break
+                if message.get('type') == 'result':
+                    self._record(message['unit'], message['candidates'])
+                    continue
+                reply = self._next_unit(connection)
+                wfile.write((json.dumps(reply) + "\n").encode('utf-8'))
+                wfile.flush()
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        finally:
+            self._release(connection)
+
+    def _next_unit(self, connection):
+        with self.lock:
+            self._expire_leases()
+            if self.finished.is_set():
+                return {'type': 'done'}
+            if not self.pending:
+                return {'type': 'wait', 'seconds': WAIT_SECONDS}
+            unit = self.pending.popleft()
+            self.leases[unit] = (connection,
+                                 time.monotonic() + self.lease_seconds)
+        return {'type': 'unit',
+                'unit': unit,
+                'cipher': self.cipher_id,
+                'ciphertext': self.ciphertext,
+                'top_k': self.top_k,
+                'keys': self.units[unit]}
+
+    def _record(self, unit, candidates):
+        with self.lock:
+            if unit in self.completed:
+                # a unit that was handed out again has been done twice
+                return
+            self.completed.add(unit)
+            self.leases.pop(unit, None)
+            if unit in self.pending:
+                self.pending.remove(unit)
+            for candidate in candidates:
+                candidate = tuple(candidate)
+                if candidate[1] in self.best_keys:
+                    # the same key can be in more than one unit
+                    continue
+                if len(self.best) < self.top_k:
+                    heapq.heappush(self.best, candidate)
+                elif candidate > self.best[0]:
+                    dropped = heapq.heapreplace(self.best, candidate)
+                    self.best_keys.discard(dropped[1])
+                else:
+                    continue
+                self.best_keys.add(candidate[1])
+            if len(self.completed) == len(self.units):
+                self.finished.set()
+        if self.on_result is not None:
+            self.on_result(unit, candidates)
+
+    def _release(self, connection):
+        '''puts back the units leased to a worker that has gone'''
+        with self.lock:
+            for unit, (holder, _) in list(self.leases.items()):
+                if holder == connection:
+                    del self.leases[unit]
+                    self.pending.appendleft(unit)
+                    self.reissued += 1
+
+    def _expire_leases(self):
+        '''puts back the units whose workers have taken too long (any
+        result they send later is still accepted, if it comes first)
+        '''
+        now = time.monotonic()
+        for unit, (_, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[unit]
+                self.pending.append(unit)
+                self.reissued += 1
+
+
+def run_worker(host, port, max_units=None):
+    '''asks the coordinator at (host, port) for units and searches them
+    until it says the search is done (or, if max_units is given, until
+    that many have been searched). Returns the number of units searched
+    '''
+    searched = 0
+    with socket.create_connection((host, port)) as connection:
+        reader = connection.makefile('r', encoding='utf-8')
+        writer = connection.makefile('w', encoding='utf-8')
+        while max_units is None or searched < max_units:
+            _send(writer, {'type': 'request'})
+            line = reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message['type'] == 'done':
+                break
+            if message['type'] == 'wait':
+                time.sleep(message['seconds'])
+                continue
+            candidates = search(message['cipher'], message['ciphertext'],
+                                expand_keys(message['keys']),
+                                message['top_k'])
+            _send(writer, {'type': 'result', 'unit': message['unit'],
+                           'candidates': candidates})
+            searched += 1
+    return searched
+
+
+def start_local_workers(address, count):
+    '''starts count worker processes for the coordinator at address and
+    returns them
+    '''
+    workers = [multiprocessing.Process(target=run_worker, args=address,
+                                       daemon=True)
+               for _ in range(count)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+# Helper functions
+def _send(writer, message):
+    writer.write(json.dumps(message) + "\n")
+    writer.flush()
+
+
+def _print_progress(coordinator):
+    def on_result(unit, candidates):
+        progress = coordinator.progress()
+        best = coordinator.results()[:1]
+        print("{completed}/{units} units".format(**progress), end='',
+              file=sys.stderr)
+        if best:
+            print(", best so far: {!r} ({:.3f})".format(best[0][1],
+                                                       best[0][0]),
+                  end='', file=sys.stderr)
+        print(file=sys.stderr)
+    return on_result
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Search for the key of a ciphertext")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    coordinator_parser = commands.add_parser(
+        'coordinator', help="hand out the key space to workers")
+    coordinator_parser.add_argument('input',
+                                    help="file holding the ciphertext")
+    coordinator_parser.add_argument('--cipher', choices=list(SEARCHABLE),
+                                    required=True)
+    keys = coordinator_parser.add_mutually_exclusive_group(required=True)
+    keys.add_argument('--rails', type=int, nargs=2, metavar=('LOW', 'HIGH'),
+                      help="try every number of rails from LOW to HIGH")
+    keys.add_argument('--words', help="file of keyphrases, one per line")
+    keys.add_argument('--letters', type=int, metavar='LENGTH',
+                      help="try every keyphrase of up to LENGTH letters")
+    coordinator_parser.add_argument('--unit-size', type=int,
+                                    default=UNIT_SIZE)
+    coordinator_parser.add_argument('--top-k', type=int, default=TOP_K)
+    coordinator_parser.add_argument('--lease', type=float,
+                                    default=LEASE_SECONDS,
+                                    help="seconds before a unit is handed "
+                                         "out again")
+    coordinator_parser.add_argument('--host', default='127.0.0.1')
+    coordinator_parser.add_argument('--port', type=int, default=0)
+    coordinator_parser.add_argument('--local-workers', type=int, default=0,
+                                    help="worker processes to start here")
+
+    worker_parser = commands.add_parser('worker',
+                                        help="search units for a "
+                                             "coordinator")
+    worker_parser.add_argument('--host', default='127.0.0.1')
+    worker_parser.add_argument('--port', type=int, required=True)
+    options = parser.parse_args(arguments)
+
+    if options.command == 'worker':
+        run_worker(options.host, options.port)
+        return 0
+
+    with open(options.input) as file:
+        ciphertext = file.read().strip()
+    if options.rails is not None:
+        units = rail_units(*options.rails, unit_size=options.unit_size)
+    elif options.words is not None:
+        with open(options.words) as file:
+            words = [line.strip() for line in file if line.strip()]
+        units = word_units(words, options.unit_size)
+    else:
+        units = letter_units(options.letters, options.unit_size)
+
+    coordinator = Coordinator(options.cipher, ciphertext, units,
+                              options.top_k, options.lease)
+    coordinator.on_result = _print_progress(coordinator)
+    host, port = coordinator.serve(options.host, options.port)
+    print("Coordinator listening on {}:{}".format(host, port),
+          file=sys.stderr)
+    workers = start_local_workers((host, port), options.local_workers)
+    try:
+        coordinator.wait()
+    finally:
+        coordinator.stop()
+        for worker in workers:
+            worker.join(timeout=1)
+    for candidate_score, key, text in coordinator.results():
+        print("{:8.3f}  {!r:20}  {}".format(candidate_score, key, text))
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
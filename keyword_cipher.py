@@ -1,4 +1,6 @@
-from ciphers import Cipher
+import engines
+from alphabets import Alphabet
+from ciphers import Cipher, TranslationTable
 
 
 class Keyword(Cipher):
@@ -13,14 +15,49 @@ class Keyword(Cipher):
       transposition
     - grouping (default=5): the number of characters in a group (choose 0 to
                             not implement grouping)
+    - alphabet (default=None): an Alphabet (see alphabets.py) to substitute
+      within, instead of the 26 letters
     '''
-    def __init__(self, keyphrase='PRIVACY', grouping=5):
-        self.keyphrase = self._valid_keyphrase(keyphrase)
+    def __init__(self, keyphrase='PRIVACY', grouping=5, alphabet=None):
         self.grouping = grouping
+        self.alphabet = alphabet
+        if alphabet is None:
+            self.keyphrase = self._valid_keyphrase(keyphrase)
+            if self.grouping != 0:
+                # do not allow spaces as a valid character (set here as
+                # well as in encrypt, so that a one-time pad applied
+                # before the first encrypt skips them too).
+                # Ciphertext padded before this was set here gave each
+                # space a pad number that encrypt then dropped, so it
+                # never decrypted past the first space (and still cannot
+                # without knowing where the spaces were); text with no
+                # spaces encrypts as it did
+                self.PASSTHROUGH_CHARACTERS = []
+        else:
+            alphabet.check_grouping(grouping)
+            self.VALID_CHARACTERS = list(alphabet.symbols)
+            if self.grouping != 0:
+                self.PASSTHROUGH_CHARACTERS = []
+            self.keyphrase = self._uniquify_keyphrase(
+                [alphabet.fold(character) for character in keyphrase
+                 if character in alphabet])
+            substitution_list = self.keyphrase + [
+                symbol for symbol in alphabet.symbols
+                if symbol not in self.keyphrase]
+            self._encrypt_table = alphabet.substitution_table(
+                substitution_list, self.PASSTHROUGH_CHARACTERS)
+            inverse = Alphabet(substitution_list)
+            self._decrypt_table = inverse.substitution_table(
+                alphabet.symbols, keep_unknown=True)
 
+    @engines.dispatch('encrypt_many')
     def encrypt(self, plaintext):
         '''Takes a string and returns an encrypted string
         '''
+        if self.alphabet is not None:
+            ciphertext = plaintext.translate(self._encrypt_table)
+            return self._group_text(ciphertext)
+
         substitution_list = self._alphabet_from_keyphrase(self.keyphrase)
         # create a mapping from plaintext to ciphertext
         character_map = self._map_characters(self.keyphrase, substitution_list)
@@ -43,11 +80,18 @@ class Keyword(Cipher):
             ciphertext = self._group_text(ciphertext)
         return ciphertext
 
+    @engines.dispatch('decrypt_many')
     def decrypt(self, ciphertext):
         '''Takes an encrypted string and returns an decrypted string
         '''
-        # ungroup text
-        ungrouped_text = self._ungroup_text(ciphertext)
+        # ungroup text (without grouping, any spaces are word boundaries
+        # that encrypt passed through, so they are kept)
+        if self.grouping != 0:
+            ungrouped_text = self._ungroup_text(ciphertext)
+        else:
+            ungrouped_text = ciphertext
+        if self.alphabet is not None:
+            return ungrouped_text.translate(self._decrypt_table)
 
         substitution_list = self._alphabet_from_keyphrase(self.keyphrase)
         character_map = self._map_characters(self.keyphrase, substitution_list)
@@ -55,11 +99,46 @@ class Keyword(Cipher):
 
         plaintext = ""
         for character in ungrouped_text:
-            plaintext += character_map[character]
+            if character == " ":
+                plaintext += character
+            else:
+                plaintext += character_map[character]
 
         # return decoded_text
         return plaintext
 
+    def encrypt_many(self, plaintexts):
+        '''Takes a sequence of strings and returns a list of the encrypted
+        strings, building the character map once for the whole batch
+        '''
+        if self.alphabet is not None:
+            # encrypt already uses the alphabet's table
+            return super().encrypt_many(plaintexts)
+        table = TranslationTable(self._encrypt_character)
+        ciphertexts = []
+        for plaintext in plaintexts:
+            ciphertext = plaintext.translate(table)
+            if self.grouping != 0:
+                ciphertext = self._group_text(ciphertext)
+            ciphertexts.append(ciphertext)
+        return ciphertexts
+
+    def decrypt_many(self, ciphertexts):
+        '''Takes a sequence of encrypted strings and returns a list of the
+        decrypted strings, building the character map once for the whole
+        batch
+        '''
+        if self.alphabet is not None:
+            return super().decrypt_many(ciphertexts)
+        character_map = self._translation(encrypt_mode=False)
+        # spaces are removed by ungrouping, or kept if there is no grouping
+        if self.grouping != 0:
+            character_map[' '] = ''
+        else:
+            character_map[' '] = ' '
+        table = TranslationTable(character_map.__getitem__)
+        return [ciphertext.translate(table) for ciphertext in ciphertexts]
+
     # Helper methods
     def _non_keyphrase_characters(self, keyphrase):
         '''creates an ordered list of all the VALID_CHARACTERS that aren't
@@ -106,10 +185,40 @@ class Keyword(Cipher):
         '''
         return {value: key for key, value in dictionary.items()}
 
+    def _encrypt_character(self, character):
+        '''returns what encrypt (before grouping) turns a single character
+        into
+        '''
+        if self.alphabet is not None:
+            return self._encrypt_table[ord(character)]
+        character = character.lower()
+        if character in self.VALID_CHARACTERS:
+            return self._translation()[character]
+        elif self.grouping == 0 and character in self.PASSTHROUGH_CHARACTERS:
+            return character
+        return ''
+
+    def _translation(self, encrypt_mode=True):
+        '''returns a dictionary mapping each of the VALID_CHARACTERS to the
+        character that encrypt (or decrypt, if encrypt_mode is False) would
+        produce for it
+        '''
+        if self.alphabet is not None:
+            table = self._encrypt_table
+            if not encrypt_mode:
+                table = self._decrypt_table
+            return {symbol: table[ord(symbol)]
+                    for symbol in self.alphabet.symbols}
+        substitution_list = self._alphabet_from_keyphrase(self.keyphrase)
+        character_map = self._map_characters(self.keyphrase, substitution_list)
+        if not encrypt_mode:
+            character_map = self._invert_dict(character_map)
+        return character_map
+
     # Dunder methods
     def __repr__(self):
         text = "Keyword Cipher (keyphrase: {}, grouping: {})"
-        print(text.format(self.keyphrase, self.grouping))
+        return text.format(self.keyphrase, self.grouping)
 
 # ----------------------------------------------------------------------
 
@@ -0,0 +1,262 @@
+'''Encrypts log files line by line, keeping the lines.
+
+Calling encrypt on each line of a log in turn builds the cipher's
+character map, filters the text and groups it for every line, and
+encrypting the whole file in one go would lose the line breaks (and run
+the groups across them). A LineEncryptor instead takes a batch of whole
+lines at a time and encrypts all of it in one translate, in which the
+line endings map to themselves, then groups each line. Each line comes
+out as cipher.encrypt would encrypt it on its own, with its line ending
+('\\n', '\\r\\n' or '\\r') as it was.
+
+When a batch is all ASCII and the cipher turns each ASCII character into
+at most one character (as Caesar and Keyword do), the translate is done
+on the encoded bytes with bytes.translate, which is many times quicker
+than str.translate with a dictionary.
+
+A one-time pad carries on from line to line, as if the lines were one
+long message, so no pad numbers are reused. For Caesar and Keyword the
+pad is applied together with the cipher to the whole batch (see
+OneTimePad._fused), with the line endings kept and taking no pad numbers.
+
+Caesar, Keyword and PolybiusSquare can be used (the ciphers that encrypt
+each character on its own, as in streaming.py):
+
+    encrypt_log('app.log', 'app.log.enc', Keyword('SECRET', grouping=0))
+
+or from the command line:
+    python log_encryption.py app.log app.log.enc --cipher k \\
+        --set keyphrase=SECRET grouping=0 --pad-seed 'shared secret'
+'''
+import argparse
+import re
+import sys
+
+from ciphers import TranslationTable
+from one_time_pad import OneTimePad, SeededPad
+from secret_messages import VALID_CIPHERS, create_cipher
+from streaming import STREAMABLE
+
+
+LINE_ENDINGS = '\r\n'
+
+# a line and its ending, split as open(..., newline='') splits them
+LINE_PATTERN = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)?")
+ENDING_PATTERN = re.compile(r"(\r\n|\r|\n)")
+
+# roughly how many bytes of lines to read at a time
+BATCH_SIZE = 1024 * 1024
+
+
+class LineEncryptor:
+    def __init__(self, cipher, pad=None, pad_offset=0):
+        if not isinstance(cipher, STREAMABLE):
+            raise TypeError("{} cannot encrypt line by line; use one of "
+                            "{}".format(type(cipher).__name__,
+                                        ", ".join(cls.__name__
+                                                  for cls in STREAMABLE)))
+        alphabet = getattr(cipher, 'alphabet', None)
+        if alphabet is not None and any(ending in alphabet
+                                        for ending in LINE_ENDINGS):
+            raise ValueError("The {} alphabet includes line endings, so "
+                             "lines cannot be kept".format(alphabet))
+        if pad is not None and pad.pad_numbers is None:
+            raise ValueError("Invalid pad: {}".format(pad.error))
+        self.cipher = cipher
+        self.pad = pad
+        self.pad_offset = pad_offset
+        self.table = TranslationTable(cipher._encrypt_character)
+        for ending in LINE_ENDINGS:
+            self.table[ord(ending)] = ending
+        self.byte_table, self.byte_deletions = _byte_table(self.table)
+        if pad is not None:
+            self.encrypt_outputs = pad._fused_outputs(cipher, True)
+            self.decrypt_outputs = pad._fused_outputs(cipher, False)
+        else:
+            self.encrypt_outputs = self.decrypt_outputs = None
+
+    def encrypt(self, text):
+        '''takes a batch of whole lines (the last may have no line ending)
+        and returns each of them encrypted
+        '''
+        if self.encrypt_outputs is not None:
+            ciphertext = self._fused(text, True, self.encrypt_outputs)
+            if self.cipher.grouping > 0:
+                ciphertext = _group_lines(ciphertext, self.cipher.grouping)
+            return ciphertext
+        if self.pad is not None:
+            text = "".join(self._apply_pad(line)
+                           for line in _lines(text))
+        if self.byte_table is not None and text.isascii():
+            ciphertext = text.encode('ascii').translate(
+                self.byte_table, self.byte_deletions).decode('ascii')
+        else:
+            ciphertext = text.translate(self.table)
+        if self.cipher.grouping > 0:
+            ciphertext = _group_lines(ciphertext, self.cipher.grouping)
+        return ciphertext
+
+    def decrypt(self, text):
+        '''takes a batch of whole lines encrypted by encrypt and returns
+        each of them decrypted
+        '''
+        if self.decrypt_outputs is not None:
+            return self._fused(text, False, self.decrypt_outputs)
+        lines = _lines(text)
+        contents = [line.rstrip(LINE_ENDINGS) for line in lines]
+        plaintexts = self.cipher.decrypt_many(contents)
+        decrypted = []
+        for line, content, plaintext in zip(lines, contents, plaintexts):
+            if self.pad is not None:
+                plaintext = self.pad.apply_one_time_pad(
+                    plaintext, self.cipher, encrypt_mode=False,
+                    pad_offset=self.pad_offset)
+                self.pad_offset += len(plaintext)
+            decrypted.append(plaintext + line[len(content):])
+        return "".join(decrypted)
+
+    # Helper methods
+    def _fused(self, text, encrypt_mode, outputs):
+        '''applies the pad and the cipher to the whole batch at once.
+        Caesar and Keyword give one character for each pad number, so the
+        numbers used are the characters that are not line endings
+        '''
+        result = self.pad._fused(text, self.cipher, encrypt_mode,
+                                 self.pad_offset, outputs,
+                                 kept=LINE_ENDINGS)
+        self.pad_offset += len(result) - sum(
+            result.count(ending) for ending in LINE_ENDINGS)
+        return result
+
+    def _apply_pad(self, line):
+        content = line.rstrip(LINE_ENDINGS)
+        padded = self.pad.apply_one_time_pad(content, self.cipher,
+                                             pad_offset=self.pad_offset)
+        self.pad_offset += len(padded)
+        return padded + line[len(content):]
+
+
+# Helper functions
+def _lines(text):
+    return [line for line in LINE_PATTERN.findall(text) if line]
+
+
+def _byte_table(table):
+    '''returns a table and the characters to delete for bytes.translate
+    that do the same as table for ASCII text, or (None, None) if table
+    turns an ASCII character into anything other than one or no ASCII
+    characters
+    '''
+    translated = bytearray(range(256))
+    deletions = bytearray()
+    for code in range(128):
+        try:
+            character = table[code]
+        except ValueError:
+            return None, None
+        if character == '':
+            deletions.append(code)
+        elif len(character) == 1 and character.isascii():
+            translated[code] = ord(character)
+        else:
+            return None, None
+    return bytes(translated), bytes(deletions)
+
+
+def _group_lines(text, grouping):
+    '''groups each line of text as Cipher._group_text would group it on
+    its own
+    '''
+    if '\r' not in text:
+        return "\n".join([_group_line(line, grouping)
+                          for line in text.split("\n")])
+    pieces = ENDING_PATTERN.split(text)
+    # the lines are at the even positions, and their endings between them
+    pieces[::2] = [_group_line(line, grouping) for line in pieces[::2]]
+    return "".join(pieces)
+
+
+def _group_line(line, grouping):
+    return " ".join([line[start:start + grouping]
+                     for start in range(0, len(line), grouping)])
+
+
+def encrypt_log(input_path, output_path, cipher, pad=None,
+                encrypt_mode=True, batch_size=BATCH_SIZE):
+    '''Encrypts (or, if encrypt_mode is False, decrypts) the UTF-8 text
+    file at input_path line by line and writes it to output_path.
+    Returns the number of lines
+    '''
+    encryptor = LineEncryptor(cipher, pad)
+    process = encryptor.encrypt if encrypt_mode else encryptor.decrypt
+    count = 0
+    # newline='' keeps the line endings as they are
+    with open(input_path, encoding='utf-8', newline='') as source, \
+            open(output_path, 'w', encoding='utf-8', newline='') as target:
+        while True:
+            lines = source.readlines(batch_size)
+            if not lines:
+                break
+            target.write(process("".join(lines)))
+            count += len(lines)
+    return count
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Encrypt a log file line by line")
+    parser.add_argument('input', help="the UTF-8 log file")
+    parser.add_argument('output', help="where to write the result")
+    line_ciphers = [key for key, entry in VALID_CIPHERS.items()
+                    if issubclass(entry['class'], STREAMABLE)]
+    parser.add_argument('--cipher', choices=line_ciphers, default='k',
+                        help="the cipher to use (default: k)")
+    parser.add_argument('--set', nargs='+', default=[],
+                        metavar='NAME=VALUE',
+                        help="cipher parameters, e.g. keyphrase=SECRET")
+    parser.add_argument('--decrypt', action='store_true',
+                        help="decrypt a log encrypted by this program")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="roughly how many bytes of lines to read at a "
+                             "time")
+    parser.add_argument('--pad', default='',
+                        help="a one-time pad of comma-separated numbers, "
+                             "at least one for each character of the log")
+    parser.add_argument('--pad-seed', default='',
+                        help="instead of --pad, a seed to work the pad "
+                             "numbers out from")
+    options = parser.parse_args(arguments)
+    if options.pad and options.pad_seed:
+        parser.error("give either --pad or --pad-seed, not both")
+
+    process = 'd' if options.decrypt else 'e'
+    pad = None
+    if options.pad:
+        # the length of the log is not known until it has been read, so
+        # a pad that is too short is only found on reaching its end
+        pad = OneTimePad(options.pad, '', VALID_CIPHERS[options.cipher],
+                         process)
+    elif options.pad_seed:
+        pad = SeededPad(options.pad_seed)
+    if pad is not None and pad.error is not None:
+        parser.error("invalid pad: {}".format(pad.error))
+    settings = dict(setting.split('=', 1) for setting in options.set)
+    try:
+        cipher = create_cipher(options.cipher, settings, process, pad)
+    except ValueError as error:
+        parser.error(str(error))
+    try:
+        count = encrypt_log(options.input, options.output, cipher, pad,
+                            encrypt_mode=not options.decrypt,
+                            batch_size=options.batch_size)
+    except IndexError:
+        print("The pad is shorter than the log", file=sys.stderr)
+        return 1
+    print("{} {} lines".format("Decrypted" if options.decrypt
+                               else "Encrypted", count))
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
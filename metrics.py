@@ -0,0 +1,201 @@
+'''Throughput and latency metrics for the ciphers, in Prometheus format.
+
+For each cipher class and operation (encrypt, decrypt, or
+apply_one_time_pad) this keeps the following (a message encrypted or
+decrypted with a one-time pad is counted under the pad's class, e.g.
+cipher="OneTimePad"):
+- cipher_messages_total: the number of calls
+- cipher_errors_total: the number of calls that raised an exception
+- cipher_input_characters_total / cipher_output_characters_total: the
+  length of the text passed in and returned (the same as bytes for the
+  ASCII text the ciphers produce)
+- cipher_latency_seconds: a histogram of how long each call took
+
+The metrics are gathered with an instrumentation observer, so nothing
+is recorded (and nothing costs anything) until they are started. Only
+the stages above are wrapped, and each call then costs two clock reads
+and a few additions, so they can be left on.
+
+    metrics = Metrics().start()
+    metrics.serve(9464)                    # http://127.0.0.1:9464/metrics
+    metrics.write_file('ciphers.prom')     # or for a textfile collector
+
+Setting the CIPHER_METRICS environment variable before running
+secret_messages.py turns them on: a number is taken as a port to serve
+them on, anything else as a file to write them to when the program ends.
+'''
+import atexit
+import bisect
+import http.server
+import os
+import threading
+
+import instrumentation
+
+
+ENVIRONMENT_VARIABLE = 'CIPHER_METRICS'
+
+STAGES = ['encrypt', 'decrypt', 'apply_one_time_pad']
+
+# upper bounds (in seconds) of the latency histogram buckets
+BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+COUNTERS = [
+    ('messages', 'cipher_messages_total',
+     'Number of messages processed'),
+    ('errors', 'cipher_errors_total',
+     'Number of messages that raised an error'),
+    ('size_in', 'cipher_input_characters_total',
+     'Characters of text passed in'),
+    ('size_out', 'cipher_output_characters_total',
+     'Characters of text returned'),
+]
+
+
+class Metrics:
+    def __init__(self):
+        self.series = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def start(self):
+        instrumentation.add_observer(self._record, STAGES)
+        return self
+
+    def stop(self):
+        instrumentation.remove_observer(self._record)
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def render(self):
+        '''returns the metrics in the Prometheus text exposition format'''
+        with self.lock:
+            series = sorted((key, dict(values,
+                                       buckets=list(values['buckets'])))
+                            for key, values in self.series.items())
+        lines = []
+        for field, name, description in COUNTERS:
+            lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} counter".format(name))
+            for (cipher_name, operation), values in series:
+                lines.append("{}{{{}}} {}".format(
+                    name, _labels(cipher_name, operation), values[field]))
+
+        name = 'cipher_latency_seconds'
+        lines.append("# HELP {} Time taken by each message".format(name))
+        lines.append("# TYPE {} histogram".format(name))
+        for (cipher_name, operation), values in series:
+            labels = _labels(cipher_name, operation)
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ['+Inf'], values['buckets']):
+                cumulative += count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                    name, labels, bound, cumulative))
+            lines.append("{}_sum{{{}}} {!r}".format(name, labels,
+                                                     values['seconds']))
+            lines.append("{}_count{{{}}} {}".format(name, labels,
+                                                     values['messages']))
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        '''writes the metrics to path, replacing it in one step so a
+        collector never reads half a file
+        '''
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as file:
+            file.write(self.render())
+        os.replace(temporary_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        '''serves the metrics at http://host:port/metrics from a
+        background thread (until stop is called)
+        '''
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ['/', '/metrics']:
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type',
+                                 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  daemon=True)
+        thread.start()
+        return self.server.server_address
+
+    def _record(self, cipher_name, stage, seconds, size_in, size_out, error):
+        key = (cipher_name, stage)
+        bucket = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            values = self.series.get(key)
+            if values is None:
+                values = self.series[key] = {
+                    'messages': 0,
+                    'errors': 0,
+                    'size_in': 0,
+                    'size_out': 0,
+                    'seconds': 0.0,
+                    'buckets': [0] * (len(BUCKETS) + 1),
+                }
+            values['messages'] += 1
+            values['size_in'] += size_in
+            values['size_out'] += size_out
+            values['seconds'] += seconds
+            values['buckets'][bucket] += 1
+            if error is not None:
+                values['errors'] += 1
+
+    # Dunder methods
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def _labels(cipher_name, operation):
+    return 'cipher="{}",operation="{}"'.format(cipher_name, operation)
+
+
+def metrics_from_environment():
+    '''returns started Metrics if the CIPHER_METRICS environment variable
+    is set (serving them, or writing them out at exit), otherwise None
+    '''
+    value = os.environ.get(ENVIRONMENT_VARIABLE, '')
+    if value.lower() in ['', '0', 'no']:
+        return None
+    metrics = Metrics().start()
+    if value.isdigit():
+        metrics.serve(int(value))
+    else:
+        atexit.register(metrics.write_file, value)
+    return metrics
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from caesar import Caesar
+    from keyword_cipher import Keyword
+    from transposition import Transposition
+
+    plaintext = 'the quick brown fox jumps over the lazy dog' * 100
+    with Metrics() as metrics:
+        for cipher_class in [Caesar, Keyword, Transposition]:
+            cipher = cipher_class()
+            cipher.decrypt(cipher.encrypt(plaintext))
+    print(metrics.render())
@@ -1,3 +1,22 @@
+import array
+import hashlib
+import itertools
+import operator
+import struct
+import sys
+
+from caesar import Caesar
+from ciphers import TranslationTable
+from keyword_cipher import Keyword
+
+
+# the ciphers that the pad can be fused with (see OneTimePad._fused)
+FUSABLE = (Caesar, Keyword)
+
+# the number of characters apply_one_time_pad joins at a time
+JOIN_SIZE = 4096
+
+
 class OneTimePad():
 
     def __init__(self, pad_numbers, plaintext, cipher_id, process):
@@ -50,36 +69,191 @@ class OneTimePad():
         return {'error': error,
                 'pad_numbers': pad_numbers}
 
-    def apply_one_time_pad(self, plaintext, cipher, encrypt_mode=True):
+    def apply_one_time_pad(self, plaintext, cipher, encrypt_mode=True,
+                           pad_offset=0):
         '''reads the object's valid one-time pad (array of ints, at least as
         long as the plaintext) and takes:
         - plaintext (the text that will have the pad applied);
         - cipher (the cipher object - needed to use the cipher functionality);
         - encrypt_mode (True if encrypting, False if decrypting)
+        - pad_offset (the position in the pad of the first character, for
+          when plaintext is part of a longer text)
         and then returns a new 'plaintext' with the
         pad applied (forward if encrypting, backward if decrypting)
         '''
         valid_characters_and_spaces = cipher._reduce_characters(plaintext)
 
-        altered_plaintext = ""
+        symbols, positions, fold = self._lookup(cipher)
+        numvalid = len(symbols)
+        # pad values are added when encrypting and taken off when decrypting
+        sign = 1 if encrypt_mode else -1
 
-        numchars = len(valid_characters_and_spaces)
-        numvalid = len(cipher.VALID_CHARACTERS)
+        length = len(valid_characters_and_spaces)
+        pad = self._pad_numbers(pad_offset, length)
+        # the characters are joined a chunk at a time, as a list of all of
+        # them would take several times the memory of the text itself
+        pieces = []
+        for start in range(0, length, JOIN_SIZE):
+            altered_characters = []
+            for character, pad_index in zip(
+                    valid_characters_and_spaces[start:start + JOIN_SIZE],
+                    pad):
+                character = fold(character)
+                lookup_index = positions.get(character)
+                if lookup_index is not None:
+                    offset_index = ((lookup_index + sign * pad_index) %
+                                    numvalid)
+                    altered_characters.append(symbols[offset_index])
+                elif character in cipher.PASSTHROUGH_CHARACTERS:
+                    altered_characters.append(character)
+            pieces.append("".join(altered_characters))
 
-        for character_index in range(numchars):
-            pad_index = self.pad_numbers[character_index]
-            character = valid_characters_and_spaces[character_index].lower()
-            if character in cipher.VALID_CHARACTERS:
-                lookup_index = cipher.VALID_CHARACTERS.index(character)
-                if encrypt_mode:
-                    offset_index = (lookup_index + pad_index) % numvalid
-                else:
-                    offset_index = (lookup_index - pad_index) % numvalid
-                altered_plaintext += cipher.VALID_CHARACTERS[offset_index]
-            elif character in cipher.PASSTHROUGH_CHARACTERS:
-                altered_plaintext += character
+        return "".join(pieces)
 
-        return altered_plaintext
+    def encrypt(self, plaintext, cipher, pad_offset=0):
+        '''Takes a string and returns it with the pad applied and then
+        encrypted by cipher, the same as
+            cipher.encrypt(self.apply_one_time_pad(plaintext, cipher))
+        For Caesar and Keyword this is done in a single pass (see _fused)
+        '''
+        outputs = self._fused_outputs(cipher, True)
+        if outputs is None:
+            return cipher.encrypt(self.apply_one_time_pad(
+                plaintext, cipher, pad_offset=pad_offset))
+        return cipher._group_text(self._fused(plaintext, cipher, True,
+                                              pad_offset, outputs))
+
+    def decrypt(self, ciphertext, cipher, pad_offset=0):
+        '''Takes an encrypted string and returns it decrypted by cipher
+        and then with the pad taken off, the same as
+            self.apply_one_time_pad(cipher.decrypt(ciphertext), cipher,
+                                    encrypt_mode=False)
+        For Caesar and Keyword this is done in a single pass (see _fused)
+        '''
+        outputs = self._fused_outputs(cipher, False)
+        if outputs is None:
+            return self.apply_one_time_pad(cipher.decrypt(ciphertext), cipher,
+                                           encrypt_mode=False,
+                                           pad_offset=pad_offset)
+        return self._fused(ciphertext, cipher, False, pad_offset, outputs)
+
+    # Helper methods
+    def _fused(self, text, cipher, encrypt_mode, pad_offset, outputs,
+               kept=''):
+        '''Applies the pad and the substitution together. Each character
+        of the text is first translated to an index (with one translate):
+        - a symbol to its position in the alphabet, 0 to n - 1
+        - each passthrough character to the start of a block of n indices
+          of its own, and anything else the pad would drop (but count) to
+          one more such block
+        - anything the pad would skip altogether to nothing
+        Adding the pad number (modulo n) to an index then moves a symbol
+        along the alphabet but keeps any other character in its block, so
+        the output is outputs[index + pad % n] (see _fused_outputs). The
+        additions and look-ups are made with map, so no Python code runs
+        for each character.
+        Any kept characters (such as line endings) are left as they are
+        and take no pad number, so the pad carries on across them
+        '''
+        symbols, positions, fold = self._lookup(cipher)
+        numvalid = len(symbols)
+        passthrough = list(cipher.PASSTHROUGH_CHARACTERS)
+        dropped = len(outputs) - numvalid
+        # a block of its own for each kept character, after the others
+        first_kept = len(outputs)
+        outputs = outputs + [character for character in kept
+                             for _ in range(numvalid)]
+
+        def index(character):
+            if character in kept:
+                return chr(first_kept + kept.index(character) * numvalid)
+            if not encrypt_mode:
+                character = cipher.decrypt_many([character])[0]
+            character = fold(cipher._reduce_characters(character))
+            if not character:
+                return ''
+            if character in positions:
+                return chr(positions[character])
+            if character in passthrough:
+                return chr((2 + passthrough.index(character)) * numvalid)
+            return chr(dropped)
+
+        indices = text.translate(TranslationTable(index))
+        if kept:
+            pad = self._kept_pad_numbers(indices, pad_offset, first_kept)
+        else:
+            pad = self._pad_numbers(pad_offset, len(indices))
+        if not encrypt_mode:
+            pad = map(operator.neg, pad)
+        shifted = map(operator.add, map(ord, indices),
+                      map(numvalid.__rmod__, pad))
+        characters = map(outputs.__getitem__, shifted)
+        # joined a chunk at a time, as apply_one_time_pad does
+        return "".join(["".join(itertools.islice(characters, JOIN_SIZE))
+                        for _ in range(0, len(indices), JOIN_SIZE)])
+
+    def _fused_outputs(self, cipher, encrypt_mode):
+        '''returns the output for each index _fused can produce: the
+        substitution of each symbol twice over (so the index plus the pad
+        never has to wrap around), then a block for each passthrough
+        character and one for the characters the pad drops. Returns None
+        if the cipher cannot be fused, or cannot encrypt every symbol
+        (e.g. Caesar with an offset past the end of the alphabet), which
+        is left to fail only if the text has such a symbol
+        '''
+        if not isinstance(cipher, FUSABLE):
+            return None
+        symbols, _, _ = self._lookup(cipher)
+        if encrypt_mode:
+            substitute = cipher._encrypt_character
+        else:
+            # the cipher has already been undone when the pad comes off
+            substitute = str
+        try:
+            outputs = [substitute(symbol) for symbol in symbols] * 2
+            for character in cipher.PASSTHROUGH_CHARACTERS:
+                outputs.extend([substitute(character)] * len(symbols))
+        except LookupError:
+            return None
+        outputs.extend([''] * len(symbols))
+        return outputs
+
+    def _lookup(self, cipher):
+        '''returns the symbols the pad shifts characters along, a
+        dictionary of their positions (rather than searching the list for
+        each character) and the function that folds a character into the
+        form the symbols are held in
+        '''
+        alphabet = getattr(cipher, 'alphabet', None)
+        if alphabet is not None:
+            return alphabet.symbols, alphabet.positions, alphabet.fold
+        symbols = cipher.VALID_CHARACTERS
+        positions = {character: index
+                     for index, character in enumerate(symbols)}
+        return symbols, positions, str.lower
+
+    def _pad_numbers(self, pad_offset, length):
+        '''returns an iterator over the pad numbers for a text of the given
+        length. They are looked up one at a time rather than sliced, so no
+        copy of the pad is made, and a pad shorter than the text raises
+        IndexError when it runs out
+        '''
+        return map(self.pad_numbers.__getitem__,
+                   range(pad_offset, pad_offset + length))
+
+    def _kept_pad_numbers(self, indices, pad_offset, first_kept):
+        '''returns an iterator over the pad numbers for the indices _fused
+        has made, where those from first_kept on are kept characters that
+        take no pad number. The numbers are read in order (as
+        _pad_numbers reads them) and each kept character is given 0
+        instead, with next taking from one iterator or the other
+        '''
+        flags = indices.translate(TranslationTable(
+            lambda character: '\0' if ord(character) >= first_kept
+            else '\1'))
+        sources = (itertools.repeat(0),
+                   self._pad_numbers(pad_offset, flags.count('\1')))
+        return map(next, map(sources.__getitem__, map(ord, flags)))
 
     def _required_pad_length(self, text, cipher_id, encrypt_mode=True):
         '''Determines the minimum required pad length for an algorithm'''
@@ -96,3 +270,100 @@ class OneTimePad():
             return "Pad with Error: {}".format(self.error)
         else:
             return "Pad: {}".format(self.pad_numbers)
+
+
+class Keystream:
+    '''An endless, read-only sequence of pad numbers worked out from a
+    seed, to use in place of a list of pad numbers.
+    The numbers come in blocks of BLOCK_SIZE, each block being the
+    SHAKE-256 output for the seed and the block number read as unsigned
+    32-bit integers, so any position can be found without working out
+    the ones before it, and the same seed always gives the same numbers.
+    (At 32 bits, reducing a number modulo the size of an alphabet leaves
+    no bias worth speaking of.)
+    '''
+    BLOCK_SIZE = 4096
+
+    def __init__(self, seed):
+        self.key = hashlib.sha256(seed.encode('utf-8')).digest()
+        self._unpack = struct.Struct('<{}I'.format(self.BLOCK_SIZE)).unpack
+        # the last block used, as the next slice usually starts in it
+        self._last_block = (None, None)
+
+    def block(self, number):
+        '''returns the numbers in the given block, as a tuple'''
+        cached_number, numbers = self._last_block
+        if cached_number != number:
+            generator = hashlib.shake_256(self.key +
+                                          number.to_bytes(8, 'big'))
+            numbers = self._unpack(generator.digest(4 * self.BLOCK_SIZE))
+            self._last_block = (number, numbers)
+        return numbers
+
+    def numbers(self, start, stop):
+        '''returns an iterator over the numbers from position start up to
+        stop, working out each block only as it is reached
+        '''
+        if start < 0 or stop < 0:
+            raise IndexError("Keystream positions cannot be negative")
+        first_block, offset = divmod(start, self.BLOCK_SIZE)
+        blocks = map(self.block, itertools.count(first_block))
+        return itertools.islice(itertools.chain.from_iterable(blocks),
+                                offset, offset + max(stop - start, 0))
+
+    # Dunder methods
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.stop is None or index.step not in (None, 1):
+                raise ValueError("A keystream can only be sliced up to a "
+                                 "given position, one number at a time")
+            start = index.start or 0
+            stop = index.stop
+            # unsigned 32-bit numbers, so four bytes each rather than a
+            # list's eight (and an int object for each)
+            return array.array('I', self.numbers(start, stop))
+        if index < 0:
+            raise IndexError("Keystream positions cannot be negative")
+        block_number, offset = divmod(index, self.BLOCK_SIZE)
+        return self.block(block_number)[offset]
+
+    def __len__(self):
+        # there is no end, so the keystream is as long as any text
+        return sys.maxsize
+
+
+class SeededPad(OneTimePad):
+    '''A one-time pad whose numbers are worked out from a seed (see
+    Keystream) as they are needed, instead of being given as a list.
+    Only the seed has to be kept and sent, checking it takes the same
+    time however long the text, and it never runs short.
+
+    It can be used wherever a OneTimePad can: the text, cipher_id and
+    process are accepted for the same calls, but as the keystream has no
+    end there is nothing to check them against. A blank seed means no
+    pad, as a blank pad does
+    '''
+    def __init__(self, seed, plaintext='', cipher_id=None, process='e'):
+        if not isinstance(seed, str):
+            self.error = 'Invalid seed, should be a string'
+            self.pad_numbers = None
+        elif seed == '':
+            self.error = None
+            self.pad_numbers = None
+        else:
+            self.error = None
+            self.pad_numbers = Keystream(seed)
+
+    # Helper methods
+    def _pad_numbers(self, pad_offset, length):
+        '''reads the keystream a block at a time, rather than looking up
+        each number on its own
+        '''
+        return self.pad_numbers.numbers(pad_offset, pad_offset + length)
+
+    # Dunder methods
+    def __repr__(self):
+        if self.pad_numbers is None:
+            return super().__repr__()
+        # the numbers never end, and the seed is the secret
+        return "Pad: seeded keystream"
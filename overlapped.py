@@ -0,0 +1,259 @@
+'''Encrypts files with the reading, encrypting and writing overlapped.
+
+encrypt_file in streaming.py reads a chunk, encrypts it, writes it and
+only then reads the next, so the disk waits while the cipher works and
+the cipher waits while the disk does. process_file runs the three as
+threads instead:
+- the reader reads each chunk into a buffer from a fixed pool, so no
+  new buffer is made for each chunk
+- the cipher stage passes the chunk to the processor and gives the
+  buffer back to the pool
+- the writer writes out what the processor returned
+joined by queues that hold at most depth chunks, so no stage gets more
+than depth chunks ahead of the next and memory stays bounded. File reads
+and writes release the GIL, so the disk is busy while the cipher runs.
+
+The processor can be anything with StreamEncryptor's chunked interface:
+update(data, final=False) returning the bytes to write for each piece of
+input, with final=True on the last call.
+
+The time each stage spends is split into:
+- busy: doing its own work
+- starved: waiting for the stage before it (or, for the reader, for a
+  free buffer)
+- blocked: waiting for room in the queue to the stage after it
+process_file returns these, and format_report shows them along with the
+stage that limited the run. If the cipher stage was the busiest, the job
+is CPU-bound; if the reader or writer was, it is I/O-bound.
+
+    stats = encrypt_file('huge.txt', 'huge.enc', Keyword('PRIVACY'))
+    print(format_report(stats))
+
+or from the command line:
+    python overlapped.py huge.txt huge.enc --cipher k --set grouping=0
+'''
+import argparse
+import queue
+import sys
+import threading
+import time
+
+from secret_messages import VALID_CIPHERS, create_cipher
+from streaming import STREAMABLE, StreamEncryptor
+
+
+STAGES = ['reader', 'cipher', 'writer']
+
+CHUNK_SIZE = 1024 * 1024
+
+# the most chunks waiting between one stage and the next
+DEPTH = 4
+
+# marks the end of the chunks in a queue
+_END = None
+
+
+def process_file(input_path, output_path, processor, chunk_size=CHUNK_SIZE,
+                 depth=DEPTH):
+    '''Reads the file at input_path a chunk at a time, passes each chunk
+    through processor.update and writes the results to output_path, with
+    the three running at the same time. Returns a dictionary of
+    statistics for each stage (see the module docstring), plus 'elapsed'
+    '''
+    stats = {stage: {'busy': 0.0, 'starved': 0.0, 'blocked': 0.0,
+                     'chunks': 0, 'bytes': 0} for stage in STAGES}
+    # one buffer more than the queue holds for each of the reader and
+    # the cipher stage to be working on
+    free = queue.Queue()
+    for _ in range(depth + 2):
+        free.put(bytearray(chunk_size))
+    chunks = queue.Queue(maxsize=depth)
+    results = queue.Queue(maxsize=depth)
+    errors = []
+
+    start = time.perf_counter()
+    with open(input_path, 'rb') as source, open(output_path, 'wb') as target:
+        threads = [
+            threading.Thread(target=_read, name='reader',
+                             args=(source, free, chunks, stats['reader'],
+                                   errors)),
+            threading.Thread(target=_encrypt, name='cipher',
+                             args=(processor, free, chunks, results,
+                                   stats['cipher'], errors)),
+            threading.Thread(target=_write, name='writer',
+                             args=(target, results, stats['writer'],
+                                   errors)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    stats['elapsed'] = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+    return stats
+
+
+def encrypt_file(input_path, output_path, cipher, pad=None,
+                 chunk_size=CHUNK_SIZE, depth=DEPTH):
+    '''Encrypts the UTF-8 text in the file at input_path with cipher (and
+    the one-time pad, if given) and writes the ciphertext to output_path,
+    with reading, encrypting and writing overlapped. The output is the
+    same as streaming.encrypt_file's. Returns the statistics from
+    process_file
+    '''
+    return process_file(input_path, output_path,
+                        StreamEncryptor(cipher, pad), chunk_size, depth)
+
+
+def bottleneck(stats):
+    '''returns the stage that was busy for longest, which is the one that
+    limits how fast the pipeline can go
+    '''
+    return max(STAGES, key=lambda stage: stats[stage]['busy'])
+
+
+def format_report(stats):
+    '''returns the statistics from process_file as a table'''
+    lines = ["{:8} {:>7} {:>9} {:>9} {:>9} {:>13}".format(
+        'stage', 'chunks', 'busy s', 'starved s', 'blocked s', 'MB/s busy')]
+    for stage in STAGES:
+        stage_stats = stats[stage]
+        rate = _fraction(stage_stats['bytes'], stage_stats['busy']) / 1e6
+        lines.append("{:8} {:7} {:9.3f} {:9.3f} {:9.3f} {:13.1f}".format(
+            stage, stage_stats['chunks'], stage_stats['busy'],
+            stage_stats['starved'], stage_stats['blocked'], rate))
+    slowest = bottleneck(stats)
+    kind = "CPU-bound" if slowest == 'cipher' else "I/O-bound"
+    lines.append("elapsed {:.3f}s; limited by the {} ({})".format(
+        stats['elapsed'], slowest, kind))
+    return "\n".join(lines)
+
+
+# Helper functions
+def _read(source, free, chunks, stats, errors):
+    try:
+        while True:
+            buffer = _timed(stats, 'starved', free.get)
+            started = time.perf_counter()
+            size = source.readinto(buffer)
+            stats['busy'] += time.perf_counter() - started
+            if not size or errors:
+                free.put(buffer)
+                break
+            stats['chunks'] += 1
+            stats['bytes'] += size
+            _timed(stats, 'blocked', chunks.put, (buffer, size))
+    except Exception as error:
+        errors.append(error)
+    finally:
+        chunks.put(_END)
+
+
+def _encrypt(processor, free, chunks, results, stats, errors):
+    try:
+        while True:
+            item = _timed(stats, 'starved', chunks.get)
+            if item is _END:
+                data = b'' if errors else processor.update(b'', final=True)
+            else:
+                buffer, size = item
+                started = time.perf_counter()
+                try:
+                    if not errors:
+                        with memoryview(buffer) as view:
+                            data = processor.update(view[:size])
+                finally:
+                    # the processor keeps no reference to the chunk, so
+                    # the buffer can be read into again straight away
+                    free.put(buffer)
+                stats['busy'] += time.perf_counter() - started
+                stats['chunks'] += 1
+                stats['bytes'] += size
+            if not errors:
+                _timed(stats, 'blocked', results.put, data)
+            if item is _END:
+                break
+    except Exception as error:
+        errors.append(error)
+        # keep taking chunks, so the reader is never left waiting for a
+        # buffer, until it stops
+        while item is not _END:
+            item = chunks.get()
+            if item is not _END:
+                free.put(item[0])
+    finally:
+        results.put(_END)
+
+
+def _write(target, results, stats, errors):
+    try:
+        while True:
+            data = _timed(stats, 'starved', results.get)
+            if data is _END:
+                break
+            if errors:
+                continue
+            started = time.perf_counter()
+            target.write(data)
+            stats['busy'] += time.perf_counter() - started
+            stats['chunks'] += 1
+            stats['bytes'] += len(data)
+        started = time.perf_counter()
+        target.flush()
+        stats['busy'] += time.perf_counter() - started
+    except Exception as error:
+        errors.append(error)
+        # keep taking results, so the cipher stage is never left waiting
+        while results.get() is not _END:
+            pass
+
+
+def _timed(stats, key, function, *args):
+    '''calls function, adding the time it took to stats[key]'''
+    started = time.perf_counter()
+    result = function(*args)
+    stats[key] += time.perf_counter() - started
+    return result
+
+
+def _fraction(part, whole):
+    if not whole:
+        return 0.0
+    return part / whole
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Encrypt a file with reading, encrypting and writing "
+                    "overlapped, and report where the time went")
+    parser.add_argument('input', help="the UTF-8 text file to encrypt")
+    parser.add_argument('output', help="where to write the ciphertext")
+    streamable = [key for key, entry in VALID_CIPHERS.items()
+                  if issubclass(entry['class'], STREAMABLE)]
+    parser.add_argument('--cipher', choices=streamable, default='k',
+                        help="the cipher to use (default: k)")
+    parser.add_argument('--set', nargs='+', default=[],
+                        metavar='NAME=VALUE',
+                        help="cipher parameters, e.g. keyphrase=SECRET")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="bytes to read at a time")
+    parser.add_argument('--depth', type=int, default=DEPTH,
+                        help="most chunks waiting between stages")
+    options = parser.parse_args(arguments)
+
+    settings = dict(setting.split('=', 1) for setting in options.set)
+    try:
+        cipher = create_cipher(options.cipher, settings)
+    except ValueError as error:
+        parser.error(str(error))
+    stats = encrypt_file(options.input, options.output, cipher,
+                         chunk_size=options.chunk_size, depth=options.depth)
+    print(format_report(stats))
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
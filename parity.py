@@ -0,0 +1,748 @@
+'''Checks that the fast ways of running the ciphers give exactly the same
+results as the original ones.
+
+The reference for each cipher is its python engine: the
+character-by-character encrypt and decrypt, which engines.dispatch keeps
+as encrypt.reference and decrypt.reference. Where those have themselves
+been rewritten since, the reference is a frozen copy of the original
+code kept below instead:
+- reference_one_time_pad: OneTimePad.apply_one_time_pad
+- reference_polybius_decrypt: PolybiusSquare.decrypt, which now decodes
+  with a pair lookup table for long texts
+- reference_write_columns and reference_read_columns: the column
+  transposition of the original Adfgvx.encrypt and decrypt, which both
+  Adfgvx and DoubleColumnar now leave to columnar.py. The references for
+  those two ciphers are put together from them (and, for Adfgvx, the
+  python engine of its Polybius square and the frozen decrypt above)
+- reference_keyword_decrypt: Keyword.decrypt, which has since been made
+  to keep the spaces encrypt passes through when there is no grouping
+
+Each of these is compared against the reference (with the one-time pad,
+if the case has one, applied the same way the menu does):
+- 'table': the batch methods, encrypt_many and decrypt_many
+- 'dispatch': encrypt and decrypt, choosing an engine by length as usual
+- 'streaming': StreamEncryptor (see streaming.py), fed the text in
+  randomly sized pieces (encrypt only, for the ciphers it supports)
+- 'range': Transposition.decrypt_range, reading the plaintext in randomly
+  sized ranges (decrypt only)
+- 'fused': OneTimePad.encrypt and decrypt, which apply the pad and the
+  cipher in one pass (for the cases with a pad, and Caesar and Keyword)
+
+Cases are generated at random (from a seed, so a run can be repeated):
+a cipher, its parameters (upper case keyphrases only for Adfgvx, as the
+original decrypt could not find lower case ones among its upper cased
+column headings), a plaintext drawn from letters of both cases,
+digits, punctuation, spaces and a few non-ASCII characters, and
+sometimes a one-time pad. Decrypt cases decrypt the reference's
+ciphertext for the plaintext.
+
+When an engine's result differs from the reference, the case is shrunk
+(shortening the text, simplifying its characters and the parameters, and
+dropping the pad) for as long as it still fails, and printed as a short
+reproducer.
+
+The time taken by each engine and by the reference is added up over the
+same cases, so the speed-ups reported are for the inputs that were
+checked. The 'dispatch' times are also added up by the engine
+engines.dispatch chose and the size of the input (in the steps
+engines.CALIBRATION_SIZES calibrates at), and a warning is printed
+wherever it chose the table engine for a size at which that ran slower
+than the reference (with --strict, this fails the run like a mismatch):
+    python parity.py --cases 2000 --max-length 5000
+    python parity.py --cipher Transposition --engine range
+'''
+import argparse
+import random
+import string
+import sys
+import time
+
+import engines
+from adfgvx import Adfgvx
+from caesar import Caesar
+from double_columnar import DoubleColumnar
+from keyword_cipher import Keyword
+from one_time_pad import FUSABLE, OneTimePad
+from polybius_square import PolybiusSquare
+from streaming import STREAMABLE, StreamEncryptor
+from transposition import Transposition
+
+
+OPERATIONS = ['encrypt', 'decrypt']
+
+CHARACTERS = (string.ascii_lowercase * 4 + string.ascii_uppercase +
+              ' ' * 20 + string.digits + string.punctuation + 'éß\n\t')
+
+# the chance that a case has a one-time pad
+PAD_CHANCE = 0.25
+
+# the share of the reference's speed below which the table engine counts
+# as slower at a size (a little under 1, as the timings are noisy), and
+# the least reference time a size needs before it is judged at all
+SLOWER_THAN = 0.9
+SLOWER_MIN_SECONDS = 0.05
+
+# values tried in place of each parameter when shrinking a case, the
+# simplest first
+SIMPLER = {
+    'offset': [0, 1],
+    'grouping': [0, 1],
+    'keyphrase': ['A', 'KEY'],
+    'second_keyphrase': ['A', 'KEY'],
+    'num_rails': [2],
+    'shared_character': ['i'],
+}
+
+
+def _keyphrase(generator):
+    length = generator.randint(1, 12)
+    return "".join(generator.choice(string.ascii_letters)
+                   for _ in range(length))
+
+
+def _grouping(generator):
+    return generator.choice([0, 0, 1, 3, 5])
+
+
+# each cipher's class and a function for each parameter that returns a
+# random value for it
+CIPHERS = {
+    'Caesar': (Caesar, {
+        'offset': lambda generator: generator.randint(0, 51),
+        'grouping': _grouping,
+    }),
+    'Keyword': (Keyword, {
+        'keyphrase': _keyphrase,
+        'grouping': _grouping,
+    }),
+    'Transposition': (Transposition, {
+        'num_rails': lambda generator: generator.randint(2, 8),
+        'grouping': _grouping,
+    }),
+    'PolybiusSquare': (PolybiusSquare, {
+        'size': lambda generator: generator.choice([5, 6]),
+        'shared_character': lambda generator: generator.choice('cijk'),
+        'grouping': _grouping,
+    }),
+    'Adfgvx': (Adfgvx, {
+        'keyphrase': lambda generator: _keyphrase(generator).upper(),
+        'grouping': _grouping,
+    }),
+    'DoubleColumnar': (DoubleColumnar, {
+        'keyphrase': _keyphrase,
+        'second_keyphrase': _keyphrase,
+        'grouping': _grouping,
+    }),
+}
+
+
+class Case:
+    def __init__(self, cipher_name, parameters, operation, text,
+                 pad_numbers=None, seed=0):
+        self.cipher_name = cipher_name
+        self.parameters = parameters
+        self.operation = operation
+        self.text = text
+        self.pad_numbers = pad_numbers
+        self.seed = seed
+
+    def cipher(self):
+        '''returns a new cipher for the case (so that settings one engine
+        leaves behind cannot affect another)
+        '''
+        cipher_class = CIPHERS[self.cipher_name][0]
+        return cipher_class(**self.parameters)
+
+    def pad(self):
+        if self.pad_numbers is None:
+            return None
+        return OneTimePad(",".join(map(str, self.pad_numbers)), '', None,
+                          'e')
+
+    def replace(self, **changes):
+        values = dict(vars(self))
+        values.update(changes)
+        return Case(**values)
+
+    # Dunder methods
+    def __str__(self):
+        arguments = ", ".join("{}={!r}".format(name, value)
+                              for name, value in self.parameters.items())
+        text = "{}({}).{}({!r})".format(self.cipher_name, arguments,
+                                        self.operation, self.text)
+        if self.pad_numbers is not None:
+            text += " with pad {}".format(self.pad_numbers)
+        if self.seed:
+            text += " (seed {})".format(self.seed)
+        return text
+
+
+def reference_one_time_pad(pad_numbers, plaintext, cipher,
+                           encrypt_mode=True):
+    '''the original OneTimePad.apply_one_time_pad, kept as it was'''
+    valid_characters_and_spaces = cipher._reduce_characters(plaintext)
+
+    altered_plaintext = ""
+
+    numchars = len(valid_characters_and_spaces)
+    numvalid = len(cipher.VALID_CHARACTERS)
+
+    for character_index in range(numchars):
+        pad_index = pad_numbers[character_index]
+        character = valid_characters_and_spaces[character_index].lower()
+        if character in cipher.VALID_CHARACTERS:
+            lookup_index = cipher.VALID_CHARACTERS.index(character)
+            if encrypt_mode:
+                offset_index = (lookup_index + pad_index) % numvalid
+            else:
+                offset_index = (lookup_index - pad_index) % numvalid
+            altered_plaintext += cipher.VALID_CHARACTERS[offset_index]
+        elif character in cipher.PASSTHROUGH_CHARACTERS:
+            altered_plaintext += character
+
+    return altered_plaintext
+
+
+def reference_polybius_decrypt(cipher, ciphertext, use_ids=False):
+    '''the original PolybiusSquare.decrypt, kept as it was'''
+    ungrouped = cipher._ungroup_text(ciphertext)
+    pairs = [(odd, even) for (odd, even) in zip(ungrouped[::2],
+                                                ungrouped[1::2])]
+    plaintext = ""
+    for (row, col) in pairs:
+        if use_ids:
+            row_index = cipher.row_ids.index(row)
+            col_index = cipher.column_ids.index(col)
+        else:
+            row_index = int(row)
+            col_index = int(col)
+        plaintext += cipher.square[row_index][col_index]
+    plaintext = cipher._replace_unknowns(plaintext)
+    return plaintext
+
+
+def reference_keyword_decrypt(cipher, ciphertext):
+    '''the original Keyword.decrypt, kept as it was apart from the one
+    fix made since: with no grouping, the spaces encrypt passed through
+    are passed back (the original raised KeyError on them)
+    '''
+    # ungroup text
+    if cipher.grouping != 0:
+        ungrouped_text = cipher._ungroup_text(ciphertext)
+    else:
+        ungrouped_text = ciphertext
+
+    substitution_list = cipher._alphabet_from_keyphrase(cipher.keyphrase)
+    character_map = cipher._map_characters(cipher.keyphrase,
+                                           substitution_list)
+    character_map = cipher._invert_dict(character_map)
+
+    plaintext = ""
+    for character in ungrouped_text:
+        if character == " " and cipher.grouping == 0:
+            plaintext += character
+        else:
+            plaintext += character_map[character]
+
+    # return decoded_text
+    return plaintext
+
+
+def reference_write_columns(text, keyphrase):
+    '''the column transposition of the original Adfgvx.encrypt, kept as
+    it was
+    '''
+    # create keyphrase columns and take each character from the text and
+    # put it into keyphrase_columns
+    unique = _uniquify(keyphrase)
+    keyphrase_columns = [[character.upper()] for character in unique]
+    i = 0
+    for character in text:
+        keyphrase_columns[i].append(character)
+        i = (i + 1) % len(unique)
+
+    # sort the columns alphabetically
+    keyphrase_columns.sort()
+
+    # take the letters from the columns and create a single long list
+    # of characters
+    ciphertext = ""
+    for column in keyphrase_columns:
+        for character in column[1:]:
+            ciphertext += character
+    return ciphertext
+
+
+def reference_read_columns(text, keyphrase):
+    '''the column transposition of the original Adfgvx.decrypt, kept as
+    it was
+    '''
+    unique_keyphrase = _uniquify(keyphrase)
+    columns = [[character.upper()] for character in unique_keyphrase]
+    sorted_columns = sorted(columns)
+
+    text_length = len(text)
+    number_of_columns = len(columns)
+    characters_in_short_column = text_length // number_of_columns
+    if text_length / number_of_columns == text_length // number_of_columns:
+        characters_in_full_column = characters_in_short_column
+    else:
+        characters_in_full_column = characters_in_short_column + 1
+    number_of_full_columns = ((text_length - 1) % number_of_columns) + 1
+
+    char_index = 0
+    for i in range(len(sorted_columns)):
+        letter = sorted_columns[i][0].upper()
+        letter_index_in_keyphrase = unique_keyphrase.index(letter)
+        if letter_index_in_keyphrase + 1 <= number_of_full_columns:
+            characters_to_append = characters_in_full_column
+        else:
+            characters_to_append = characters_in_short_column
+        for j in range(char_index, char_index + characters_to_append):
+            sorted_columns[i].append(text[j])
+        char_index = char_index + characters_to_append
+
+    # unsort the columns
+    unsorted_columns = []
+    for letter in keyphrase:
+        for i in range(len(sorted_columns)):
+            if sorted_columns[i][0].lower() == letter.lower():
+                unsorted_columns.append(sorted_columns[i])
+                del sorted_columns[i]
+                break
+
+    # create text string from values in columns
+    plaintext = ""
+    column_index = 0
+    row_index = 1
+    while len(plaintext) < len(text):
+        character = unsorted_columns[column_index][row_index]
+        plaintext += character
+        if column_index + 1 > len(unsorted_columns) - 1:
+            row_index += 1
+        column_index = (column_index + 1) % len(unsorted_columns)
+    return plaintext
+
+
+def reference_adfgvx_encrypt(cipher, plaintext):
+    polybius_text = cipher.polybius_cipher.encrypt(plaintext)
+    return cipher._group_text(reference_write_columns(polybius_text,
+                                                      cipher.keyphrase))
+
+
+def reference_adfgvx_decrypt(cipher, ciphertext):
+    text = reference_read_columns(cipher._ungroup_text(ciphertext),
+                                  cipher.keyphrase)
+    return reference_polybius_decrypt(cipher.polybius_cipher, text,
+                                      use_ids=True)
+
+
+def reference_double_columnar_encrypt(cipher, plaintext):
+    text = cipher._reduce_characters(plaintext).lower()
+    for keyphrase in (cipher.keyphrase, cipher.second_keyphrase):
+        text = reference_write_columns(text, keyphrase.upper())
+    return cipher._group_text(text)
+
+
+def reference_double_columnar_decrypt(cipher, ciphertext):
+    text = cipher._ungroup_text(ciphertext)
+    for keyphrase in (cipher.second_keyphrase, cipher.keyphrase):
+        text = reference_read_columns(text, keyphrase.upper())
+    return text
+
+
+def reference_encrypt(cipher, plaintext, pad_numbers=None):
+    with engines.python_only():
+        if pad_numbers is not None:
+            plaintext = reference_one_time_pad(pad_numbers, plaintext,
+                                               cipher)
+        if isinstance(cipher, Adfgvx):
+            return reference_adfgvx_encrypt(cipher, plaintext)
+        if isinstance(cipher, DoubleColumnar):
+            return reference_double_columnar_encrypt(cipher, plaintext)
+        return type(cipher).encrypt.reference(cipher, plaintext)
+
+
+def reference_decrypt(cipher, ciphertext, pad_numbers=None):
+    with engines.python_only():
+        if isinstance(cipher, PolybiusSquare):
+            plaintext = reference_polybius_decrypt(cipher, ciphertext)
+        elif isinstance(cipher, Keyword):
+            plaintext = reference_keyword_decrypt(cipher, ciphertext)
+        elif isinstance(cipher, Adfgvx):
+            plaintext = reference_adfgvx_decrypt(cipher, ciphertext)
+        elif isinstance(cipher, DoubleColumnar):
+            plaintext = reference_double_columnar_decrypt(cipher,
+                                                          ciphertext)
+        else:
+            plaintext = type(cipher).decrypt.reference(cipher, ciphertext)
+        if pad_numbers is not None:
+            plaintext = reference_one_time_pad(pad_numbers, plaintext,
+                                               cipher, encrypt_mode=False)
+        return plaintext
+
+
+def run_table(cipher, operation, text, pad, generator):
+    with engines.python_only():
+        if operation == 'encrypt':
+            if pad is not None:
+                text = pad.apply_one_time_pad(text, cipher)
+            return cipher.encrypt_many([text])[0]
+        text = cipher.decrypt_many([text])[0]
+    if pad is not None:
+        text = pad.apply_one_time_pad(text, cipher, encrypt_mode=False)
+    return text
+
+
+def run_dispatch(cipher, operation, text, pad, generator):
+    if operation == 'encrypt':
+        if pad is not None:
+            text = pad.apply_one_time_pad(text, cipher)
+        return cipher.encrypt(text)
+    text = cipher.decrypt(text)
+    if pad is not None:
+        text = pad.apply_one_time_pad(text, cipher, encrypt_mode=False)
+    return text
+
+
+def run_streaming(cipher, operation, text, pad, generator):
+    encryptor = StreamEncryptor(cipher, pad)
+    data = text.encode('utf-8')
+    output = []
+    for start, stop in _pieces(len(data), generator):
+        output.append(encryptor.update(data[start:stop]))
+    output.append(encryptor.finish())
+    return b"".join(output).decode('utf-8')
+
+
+def run_range(cipher, operation, text, pad, generator):
+    # the length of the plaintext is not known without decrypting, but it
+    # is never more than that of the ciphertext
+    pieces = [cipher.decrypt_range(text, start, stop)
+              for start, stop in _pieces(len(text), generator)]
+    text = "".join(pieces)
+    if pad is not None:
+        text = pad.apply_one_time_pad(text, cipher, encrypt_mode=False)
+    return text
+
+
+def run_fused(cipher, operation, text, pad, generator):
+    if pad is None:
+        # only when shrinking has dropped the pad
+        return run_dispatch(cipher, operation, text, pad, generator)
+    if operation == 'encrypt':
+        return pad.encrypt(text, cipher)
+    return pad.decrypt(text, cipher)
+
+
+# each engine's function and a test of whether it can run a case
+ENGINES = {
+    'table': (run_table, lambda case: True),
+    'dispatch': (run_dispatch, lambda case: True),
+    'streaming': (run_streaming,
+                  lambda case: (case.operation == 'encrypt' and
+                                issubclass(CIPHERS[case.cipher_name][0],
+                                           STREAMABLE))),
+    'range': (run_range,
+              lambda case: (case.operation == 'decrypt' and
+                            case.cipher_name == 'Transposition')),
+    'fused': (run_fused,
+              lambda case: (case.pad_numbers is not None and
+                            issubclass(CIPHERS[case.cipher_name][0],
+                                       FUSABLE))),
+}
+
+
+def generate_case(generator, cipher_names=None, max_length=1000):
+    '''returns a random Case'''
+    cipher_name = generator.choice(cipher_names or list(CIPHERS))
+    parameters = {name: choose(generator) for name, choose in
+                  CIPHERS[cipher_name][1].items()}
+    operation = generator.choice(OPERATIONS)
+    # mostly short texts, where the edge cases are, with some long ones
+    if generator.random() < 0.8:
+        length = generator.randint(0, min(40, max_length))
+    else:
+        length = generator.randint(0, max_length)
+    text = "".join(generator.choices(CHARACTERS, k=length))
+    pad_numbers = None
+    if generator.random() < PAD_CHANCE:
+        # longer than any text the pad can be applied to, as the menu
+        # checks
+        pad_numbers = [generator.randint(0, 99)
+                       for _ in range(2 * length + 2)]
+    return Case(cipher_name, parameters, operation, text, pad_numbers,
+                generator.randrange(1, 2 ** 32))
+
+
+def check(case, engine):
+    '''runs the case with the reference and with the engine. Returns a
+    tuple of (expected, actual, reference seconds, engine seconds, input
+    length), where expected and actual are the results, or the names of
+    the exceptions raised, as (outcome, value) tuples, and input length
+    is the length of the text the operation was given
+    '''
+    run, _ = ENGINES[engine]
+    text = case.text
+    if case.operation == 'decrypt':
+        text = _outcome(reference_encrypt, case.cipher(), case.text,
+                        case.pad_numbers)
+        if text[0] == 'error':
+            return text, text, 0.0, 0.0, 0
+        text = text[1]
+
+    if case.operation == 'encrypt':
+        reference = reference_encrypt
+    else:
+        reference = reference_decrypt
+    start = time.perf_counter()
+    expected = _outcome(reference, case.cipher(), text, case.pad_numbers)
+    reference_seconds = time.perf_counter() - start
+
+    generator = random.Random(case.seed)
+    start = time.perf_counter()
+    actual = _outcome(run, case.cipher(), case.operation, text, case.pad(),
+                      generator)
+    engine_seconds = time.perf_counter() - start
+    return expected, actual, reference_seconds, engine_seconds, len(text)
+
+
+def fails(case, engine):
+    expected, actual, _, _, _ = check(case, engine)
+    return not _matches(expected, actual)
+
+
+def shrink(case, engine):
+    '''returns the simplest case found (by shortening the text, simplifying
+    its characters and parameters, and dropping the pad) that still fails
+    '''
+    progress = True
+    while progress:
+        progress = False
+        for candidate in _simpler_cases(case):
+            if fails(candidate, engine):
+                case = candidate
+                progress = True
+                break
+    return case
+
+
+def run_parity(cases=1000, seed=0, cipher_names=None, engine_names=None,
+               max_length=1000, verbose=True):
+    '''generates and checks the given number of cases against every engine
+    that can run them. Returns a tuple of (timings, choices, mismatches):
+    - timings: {(cipher name, operation, engine): [characters, reference
+      seconds, engine seconds]}
+    - choices: the same for the 'dispatch' engine, by the engine it chose
+      and the size of the input: {(cipher name, operation, chosen engine,
+      size): [characters, reference seconds, dispatch seconds]}
+    - mismatches: a list of (engine, shrunk case, expected, actual)
+    '''
+    generator = random.Random(seed)
+    timings = {}
+    choices = {}
+    mismatches = []
+    for _ in range(cases):
+        case = generate_case(generator, cipher_names, max_length)
+        for engine in engine_names or list(ENGINES):
+            if not ENGINES[engine][1](case):
+                continue
+            (expected, actual, reference_seconds, engine_seconds,
+             length) = check(case, engine)
+            _add_timing(timings, (case.cipher_name, case.operation, engine),
+                        len(case.text), reference_seconds, engine_seconds)
+            if engine == 'dispatch':
+                chosen = engines.choose(case.cipher(), case.operation,
+                                        length)
+                _add_timing(choices, (case.cipher_name, case.operation,
+                                      chosen, _size(length)),
+                            len(case.text), reference_seconds,
+                            engine_seconds)
+            if not _matches(expected, actual):
+                shrunk = shrink(case, engine)
+                expected, actual, _, _, _ = check(shrunk, engine)
+                mismatches.append((engine, shrunk, expected, actual))
+                if verbose:
+                    print(format_mismatch(engine, shrunk, expected, actual),
+                          flush=True)
+    return timings, choices, mismatches
+
+
+def slower_choices(choices):
+    '''returns the keys of choices (see run_parity) for which dispatch
+    chose the table engine and ran at less than SLOWER_THAN of the
+    reference's speed, over at least SLOWER_MIN_SECONDS of reference time
+    '''
+    return [key for key, (_, reference_seconds, engine_seconds) in
+            sorted(choices.items())
+            if key[2] == 'table' and reference_seconds >= SLOWER_MIN_SECONDS
+            and reference_seconds < SLOWER_THAN * engine_seconds]
+
+
+def format_mismatch(engine, case, expected, actual):
+    return "MISMATCH {}: {}\n  reference: {}\n  {}: {}".format(
+        engine, case, _describe(expected), engine, _describe(actual))
+
+
+def format_slower(key, timing):
+    cipher_name, operation, chosen, size = key
+    _, reference_seconds, engine_seconds = timing
+    return ("SLOWER dispatch: {} {} chose the {} engine for inputs of {}+ "
+            "characters, which ran at {:.2f}x the reference's speed".format(
+                cipher_name, operation, chosen, size,
+                reference_seconds / engine_seconds))
+
+
+def format_timings(timings):
+    lines = ["{:<15} {:<8} {:<10} {:>10} {:>14} {:>14} {:>8}".format(
+        'cipher', 'process', 'engine', 'chars', 'reference c/s',
+        'engine c/s', 'speedup')]
+    for (cipher_name, operation, engine), (characters, reference_seconds,
+                                           engine_seconds) in sorted(
+                                               timings.items()):
+        lines.append("{:<15} {:<8} {:<10} {:>10} {:>14.0f} {:>14.0f} "
+                     "{:>7.2f}x".format(
+                         cipher_name, operation, engine, characters,
+                         characters / (reference_seconds or 1e-9),
+                         characters / (engine_seconds or 1e-9),
+                         reference_seconds / (engine_seconds or 1e-9)))
+    return "\n".join(lines)
+
+
+# Helper functions
+def _add_timing(totals, key, characters, reference_seconds,
+                engine_seconds):
+    timing = totals.setdefault(key, [0, 0.0, 0.0])
+    timing[0] += characters
+    timing[1] += reference_seconds
+    timing[2] += engine_seconds
+
+
+def _size(length):
+    '''returns the longest of engines.CALIBRATION_SIZES that is no longer
+    than length (or 0)
+    '''
+    sizes = [size for size in engines.CALIBRATION_SIZES if size <= length]
+    return sizes[-1] if sizes else 0
+
+
+def _uniquify(keyphrase):
+    unique = []
+    for character in keyphrase:
+        if character not in unique:
+            unique.append(character)
+    return unique
+
+
+def _outcome(function, *args):
+    try:
+        return ('result', function(*args))
+    except Exception as error:
+        return ('error', type(error).__name__)
+
+
+def _matches(expected, actual):
+    '''the results should be the same; if the reference raised an
+    exception the engine should too, though not necessarily of the same
+    type (the table engines report characters they cannot translate as a
+    ValueError, for instance)
+    '''
+    if expected[0] == 'error':
+        return actual[0] == 'error'
+    return expected == actual
+
+
+def _describe(outcome):
+    kind, value = outcome
+    if kind == 'error':
+        return "raised {}".format(value)
+    return repr(value)
+
+
+def _pieces(length, generator):
+    '''splits range(length) into consecutive (start, stop) pairs of random
+    sizes, some of them empty
+    '''
+    start = 0
+    while start < length:
+        stop = start + generator.choice([0, 1, 2, 3, 7, 64, 1000])
+        yield start, min(stop, length)
+        start = stop
+    yield length, length
+
+
+def _simpler_cases(case):
+    '''yields cases a step simpler than case, the biggest steps first'''
+    text = case.text
+    size = len(text) // 2
+    while size > 0:
+        for start in range(0, len(text), size):
+            yield case.replace(text=text[:start] + text[start + size:])
+        size //= 2
+    for index, character in enumerate(text):
+        if character != 'a':
+            yield case.replace(text=text[:index] + 'a' + text[index + 1:])
+    if case.pad_numbers is not None:
+        yield case.replace(pad_numbers=None)
+        if any(case.pad_numbers):
+            yield case.replace(pad_numbers=[0] * len(case.pad_numbers))
+    for name, value in case.parameters.items():
+        simpler_values = SIMPLER.get(name, [])
+        # only the ones simpler than value, so shrinking always ends
+        if value in simpler_values:
+            simpler_values = simpler_values[:simpler_values.index(value)]
+        if isinstance(value, str):
+            simpler_values = [simpler for simpler in simpler_values
+                              if len(simpler) < len(value)]
+        for simpler in simpler_values:
+            yield case.replace(parameters=dict(case.parameters,
+                                                   **{name: simpler}))
+        if isinstance(value, str) and len(value) > 1:
+            for index in range(len(value)):
+                yield case.replace(parameters=dict(
+                    case.parameters,
+                    **{name: value[:index] + value[index + 1:]}))
+    if case.seed:
+        yield case.replace(seed=0)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Check the fast cipher engines against the reference")
+    parser.add_argument('--cases', type=int, default=1000,
+                        help="number of random cases (default: 1000)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed for generating the cases")
+    parser.add_argument('--max-length', type=int, default=1000,
+                        help="longest plaintext to generate")
+    parser.add_argument('--cipher', nargs='+', default=None,
+                        choices=list(CIPHERS), help="only check these")
+    parser.add_argument('--engine', nargs='+', default=None,
+                        choices=list(ENGINES), help="only check these")
+    parser.add_argument('--strict', action='store_true',
+                        help="fail if dispatch chose an engine slower than "
+                             "the reference")
+    options = parser.parse_args(arguments)
+
+    timings, choices, mismatches = run_parity(
+        options.cases, options.seed, options.cipher, options.engine,
+        options.max_length)
+    print(format_timings(timings))
+    slower = slower_choices(choices)
+    if slower:
+        print()
+        for key in slower:
+            print(format_slower(key, choices[key]))
+    if mismatches:
+        print("\n{} mismatch(es)".format(len(mismatches)))
+        return 1
+    if slower and options.strict:
+        print("\n{} slower choice(s)".format(len(slower)))
+        return 1
+    print("\nAll engines match the reference")
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import collections
+
+from ciphers import Cipher
+from caesar import Caesar
+from keyword_cipher import Keyword
+from transposition import Transposition
+
+
+class Pipeline(Cipher):
+    '''Chains several cipher objects together so that the text is passed
+    through each of them in turn (and back through them in reverse order
+    when decrypting).
+
+    Calling the ciphers one after another means every stage filters,
+    groups, ungroups and copies the whole text again. A pipeline instead
+    reduces the text once, groups it once at the end, and fuses adjacent
+    stages where it can:
+    - consecutive substitutions (Caesar, Keyword) become a single
+      translation table
+    - consecutive transpositions (Transposition) become a single
+      permutation of the character positions
+    Any other cipher (e.g., PolybiusSquare, Adfgvx) is run as a stage of
+    its own.
+
+    The result is the same as encrypting with each stage in turn, with the
+    stages' own grouping switched off, and then grouping the final text.
+
+    This implementation has the following options:
+    - stages: a list of cipher objects, in the order they are applied when
+      encrypting
+    - grouping (default=5): the number of characters in a group (choose 0 to
+                            not implement grouping)
+    '''
+    SUBSTITUTIONS = (Caesar, Keyword)
+    TRANSPOSITIONS = (Transposition, )
+
+    # the number of (stages, length) permutations to keep
+    PERMUTATION_CACHE_SIZE = 8
+
+    def __init__(self, stages, grouping=5):
+        self.stages = list(stages)
+        if not self.stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.grouping = grouping
+        if self.grouping != 0:
+            self.PASSTHROUGH_CHARACTERS = []
+        else:
+            self.PASSTHROUGH_CHARACTERS = [' ']
+
+        self._encrypt_steps = self._fuse_stages(self.stages, True)
+        self._decrypt_steps = self._fuse_stages(self.stages[::-1], False)
+        self._permutations = collections.OrderedDict()
+
+    def encrypt(self, plaintext):
+        '''Takes a string and returns an encrypted string
+        '''
+        text = plaintext
+        for step in self._encrypt_steps:
+            text = self._run_step(step, text, True)
+        return self._group_text(text)
+
+    def decrypt(self, ciphertext):
+        '''Takes an encrypted string and returns an decrypted string
+        '''
+        text = ciphertext
+        if self.grouping != 0:
+            text = self._ungroup_text(text)
+        for step in self._decrypt_steps:
+            text = self._run_step(step, text, False)
+        return text
+
+    # Helper methods
+    def _fuse_stages(self, stages, encrypt_mode):
+        '''Collapses runs of adjacent substitution stages and adjacent
+        transposition stages into single steps. Returns a list of
+        (kind, value) tuples where kind is one of:
+        - 'substitute': value is a translation table for str.translate
+        - 'transpose': value is a tuple of Transposition stages (always in
+          encryption order, so that decrypting can reuse the permutation)
+        - 'cipher': value is a cipher object that is run as-is
+        - 'reduce': value is the list of valid characters for the fused
+          steps that follow (unfused ciphers reduce the text themselves)
+        '''
+        steps = []
+        for stage in stages:
+            # ciphers with their own alphabet (see alphabets.py) are run
+            # as they are
+            if (isinstance(stage, self.SUBSTITUTIONS) and
+                    getattr(stage, 'alphabet', None) is None):
+                kind = 'substitute'
+                value = self._translation_table(stage, encrypt_mode)
+            elif isinstance(stage, self.TRANSPOSITIONS):
+                kind = 'transpose'
+                value = (stage, )
+            else:
+                kind = 'cipher'
+                value = stage
+
+            # when encrypting, the text is reduced once at the start of each
+            # run of fused stages
+            previous_kind = steps[-1][0] if steps else None
+            needs_reducing = previous_kind in [None, 'cipher']
+            if encrypt_mode and needs_reducing and kind != 'cipher':
+                steps.append(('reduce', stage.VALID_CHARACTERS))
+                previous_kind = 'reduce'
+
+            if kind != 'cipher' and previous_kind == kind:
+                if kind == 'substitute':
+                    value = self._compose_tables(steps[-1][1], value)
+                elif encrypt_mode:
+                    value = steps[-1][1] + value
+                else:
+                    value = value + steps[-1][1]
+                steps[-1] = (kind, value)
+            else:
+                steps.append((kind, value))
+        return steps
+
+    def _translation_table(self, stage, encrypt_mode):
+        '''builds a str.translate table from the stage's character
+        translation, accepting either case of each character
+        '''
+        table = {}
+        for character, substitute in stage._translation(encrypt_mode).items():
+            table[ord(character.lower())] = substitute
+            table[ord(character.upper())] = substitute
+        return table
+
+    def _compose_tables(self, first, second):
+        '''returns a single translation table with the same effect as
+        translating with `first` and then with `second`
+        '''
+        composed = {}
+        for key, value in first.items():
+            composed[key] = second.get(ord(value.lower()), value)
+        return composed
+
+    def _run_step(self, step, text, encrypt_mode):
+        '''applies a single fused step to the text'''
+        kind, value = step
+        if kind == 'reduce':
+            valid = set(value + self.PASSTHROUGH_CHARACTERS)
+            return "".join([char for char in text if char.lower() in valid])
+        elif kind == 'substitute':
+            return text.translate(value)
+        elif kind == 'transpose':
+            # transposition does not allow spaces to pass through
+            text = text.replace(' ', '')
+            permutation, inverse = self._get_permutations(value, len(text))
+            if encrypt_mode:
+                text = text.lower()
+                return "".join([text[index] for index in permutation])
+            return "".join([text[index] for index in inverse])
+        else:
+            stage = value
+            if encrypt_mode:
+                output = stage.encrypt(text.lower())
+                if stage.grouping != 0:
+                    output = stage._ungroup_text(output)
+                return output
+            return stage.decrypt(text)
+
+    def _get_permutations(self, stages, length):
+        '''returns the permutation (and its inverse) that has the same effect
+        as applying each transposition stage in turn to a text of the given
+        length. The most recently used are cached by stage settings and
+        length
+        '''
+        # keyed by the stages' settings, so changing a stage's num_rails
+        # cannot pick up a stale permutation
+        key = (tuple(stage.num_rails for stage in stages), length)
+        if key in self._permutations:
+            self._permutations.move_to_end(key)
+            return self._permutations[key]
+        composed = stages[0]._permutation(length)
+        for stage in stages[1:]:
+            permutation = stage._permutation(length)
+            composed = [composed[index] for index in permutation]
+        inverse = [0] * length
+        for position, index in enumerate(composed):
+            inverse[index] = position
+        self._permutations[key] = (composed, inverse)
+        # only the most recently used few are kept, so a long-lived
+        # pipeline fed many message lengths does not grow without bound
+        while len(self._permutations) > self.PERMUTATION_CACHE_SIZE:
+            self._permutations.popitem(last=False)
+        return composed, inverse
+
+    # Dunder methods
+    def __repr__(self):
+        names = [type(stage).__name__ for stage in self.stages]
+        text = "Pipeline (stages: {}, grouping: {})"
+        return text.format(" -> ".join(names), self.grouping)
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    def run_tests(cipher_class, plaintext, tests):
+        for key, value in tests.items():
+            print('\ntest {}'.format(key))
+            kwargs = value
+            cipher = cipher_class(**kwargs)
+            print("encrypting {}:".format(plaintext))
+            encrypted = cipher.encrypt(plaintext)
+            print(encrypted)
+            print("decrypting {}:".format(encrypted))
+            decrypted = cipher.decrypt(encrypted)
+            print(decrypted)
+
+    from adfgvx import Adfgvx
+
+    print("Run Test Suite")
+    print("==============")
+    tests = {
+        'a: keyword then transposition': {
+            'stages': [Keyword(), Transposition()]},
+        'b: caesar, keyword, transposition (4), transposition': {
+            'stages': [Caesar(), Keyword('PEOPLE'), Transposition(4),
+                       Transposition()]},
+        'c: caesar then adfgvx': {
+            'stages': [Caesar(), Adfgvx()]},
+        'd: caesar then keyword, grouping only (none)': {
+            'stages': [Caesar(), Keyword()],
+            'grouping': 0},
+    }
+
+    test_sets = [
+        'the quick brown fox jumps over the lazy dog',
+        'numb3r5 and punctuat!0n',
+        'Hello Peers'
+    ]
+
+    for i in range(len(test_sets)):
+        print("\nTest set {}:".format(i + 1))
+        print("-----------")
+        plaintext = test_sets[i]
+        run_tests(Pipeline, plaintext, tests)
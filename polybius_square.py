@@ -1,4 +1,19 @@
-from ciphers import Cipher
+import array
+import functools
+
+import compact
+import engines
+from ciphers import Cipher, TranslationTable
+
+
+# how many squares' pair lookup tables to keep (see _pair_codes), each
+# of which takes about 512KB
+PAIR_TABLE_CACHE_SIZE = 16
+
+# the number of pairs decoded at a time, as a copy of the whole text as
+# bytes, or a list of every decoded character, would take two or eight
+# bytes for each of them
+DECODE_SIZE = 16384
 
 
 class PolybiusSquare(Cipher):
@@ -82,6 +97,7 @@ class PolybiusSquare(Cipher):
                 self.shared_character = None
             self.square = self._generate_square()
 
+    @engines.dispatch('encrypt_many')
     def encrypt(self, plaintext):
         '''Takes a string and returns an encrypted string
         '''
@@ -95,6 +111,7 @@ class PolybiusSquare(Cipher):
         grouped_text = self._group_text(ciphertext)
         return grouped_text
 
+    @engines.dispatch('decrypt_many')
     def decrypt(self, ciphertext, use_ids=False):
         '''Takes an encrypted string and returns an decrypted string
         '''
@@ -106,6 +123,37 @@ class PolybiusSquare(Cipher):
         plaintext = self._replace_unknowns(plaintext)
         return plaintext
 
+    def encrypt_many(self, plaintexts):
+        '''Takes a sequence of strings and returns a list of the encrypted
+        strings, looking up each distinct character in the square only once
+        for the whole batch
+        '''
+        table = TranslationTable(self._encrypt_character)
+        return [self._group_text(plaintext.translate(table))
+                for plaintext in plaintexts]
+
+    def decrypt_many(self, ciphertexts, use_ids=False):
+        '''Takes a sequence of encrypted strings and returns a list of the
+        decrypted strings, looking each pair up in a table that is shared
+        by every square with the same contents
+        '''
+        # the same as _ungroup_text, but ungrouped text is not copied
+        return [self._decode_pairs(ciphertext.replace(" ", ""), use_ids)
+                for ciphertext in ciphertexts]
+
+    def encrypt_compact(self, plaintext):
+        '''Takes a string and returns the encrypted text packed into bytes
+        (see compact.py)
+        '''
+        return compact.pack(self.encrypt(plaintext), self._symbols(),
+                            self.grouping)
+
+    def decrypt_compact(self, data, use_ids=False):
+        '''Takes bytes created by encrypt_compact and returns the decrypted
+        string
+        '''
+        return self.decrypt(compact.unpack(data), use_ids)
+
     # Helper methods
     def _generate_square(self):
         '''Creates the polybius_square based on the specified inputs
@@ -157,6 +205,19 @@ class PolybiusSquare(Cipher):
                                 self.column_ids[col_index])
         return None
 
+    def _encrypt_character(self, char):
+        '''returns what encrypt (before grouping) turns a single character
+        into: '' for characters that are filtered out, otherwise the row and
+        column references joined into a string
+        '''
+        if char.lower() not in (self.VALID_CHARACTERS +
+                                self.PASSTHROUGH_CHARACTERS):
+            return ''
+        pair = self._encode_character(self._combine_characters(char))
+        if pair is None:
+            raise TypeError("{!r} is not in the square".format(char))
+        return self._stringify(pair)
+
     def _decode_character(self, row, col, use_ids=False):
         '''Takes a reference to a row and col address and determines what
         character should be represented.
@@ -229,6 +290,96 @@ class PolybiusSquare(Cipher):
         '''takes a string and outputs a list of pairs'''
         return [(odd, even) for (odd, even) in zip(text[::2], text[1::2])]
 
+    def _symbols(self):
+        '''returns a string of every symbol that can appear in the
+        ciphertext (the row and column ids, or the row and column numbers)
+        '''
+        if self.row_ids is None or self.column_ids is None:
+            return "".join([str(index) for index in range(len(self.square))])
+        symbols = ""
+        for symbol in self.row_ids + self.column_ids:
+            if symbol not in symbols:
+                symbols += symbol
+        return symbols
+
+    def _pair_table(self, use_ids=False):
+        '''returns the lookup table for the pairs of this square (see
+        _pair_codes)
+        '''
+        if use_ids:
+            row_symbols = tuple(self.row_ids)
+            col_symbols = tuple(self.column_ids)
+        else:
+            row_symbols = tuple(str(index)
+                                for index in range(len(self.square)))
+            col_symbols = tuple(str(index)
+                                for index in range(len(self.square[0])))
+        if self.shared_character in ['i', 'j', 'c', 'k']:
+            substitute = self.shared_character
+        else:
+            substitute = None
+        square = tuple(tuple(row) for row in self.square)
+        return _pair_codes(row_symbols, col_symbols, square, substitute)
+
+    def _decode_pairs(self, text, use_ids=False):
+        '''Decodes an ungrouped ciphertext by viewing it as a buffer of
+        16-bit pair codes and looking every pair up in the pair table.
+        A trailing unpaired character is ignored.
+        Raises a ValueError listing the position (in the ungrouped text) of
+        every pair that is not valid for this square
+        '''
+        length = len(text) - len(text) % 2
+        if not text[:length].isascii():
+            positions = sorted(set([index - index % 2
+                                    for index in range(length)
+                                    if ord(text[index]) > 127]))
+            raise ValueError("Invalid pairs at positions {}".format(
+                positions))
+        get = self._pair_table(use_ids).__getitem__
+        pieces = []
+        positions = []
+        for start in range(0, length, 2 * DECODE_SIZE):
+            data = text[start:min(start + 2 * DECODE_SIZE, length)].encode(
+                'ascii')
+            characters = list(map(get, memoryview(data).cast('H')))
+            if None in characters:
+                positions.extend(start + index * 2
+                                 for index in range(len(characters))
+                                 if characters[index] is None)
+            elif not positions:
+                pieces.append("".join(characters))
+        if positions:
+            raise ValueError("Invalid pairs at positions {}".format(
+                positions))
+        return "".join(pieces)
+
+
+# Helper functions
+@functools.lru_cache(maxsize=PAIR_TABLE_CACHE_SIZE)
+def _pair_codes(row_symbols, col_symbols, square, substitute):
+    '''Returns a lookup table with an entry for every possible 16-bit
+    pair code: the decoded character for each valid (row, col) pair of
+    ASCII symbols ('?' being replaced by substitute, if there is one), or
+    None.
+    A pair's code is the two bytes of the pair read as one unsigned
+    16-bit value, the same as reading the ciphertext with array('H').
+    The tables are cached by the square's symbols and contents, so a new
+    cipher for every message does not build them again; they must not be
+    changed
+    '''
+    table = [None] * 65536
+    # in reverse, so that (as in _decode_character) the first of any
+    # repeated ids is the one used
+    for row_index in reversed(range(len(row_symbols))):
+        for col_index in reversed(range(len(col_symbols))):
+            pair = row_symbols[row_index] + col_symbols[col_index]
+            code = array.array('H', pair.encode('ascii'))[0]
+            character = square[row_index][col_index]
+            if character == '?' and substitute is not None:
+                character = substitute
+            table[code] = character
+    return table
+
 # -----------------------------------------------------------------
 
 if __name__ == "__main__":
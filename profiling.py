@@ -0,0 +1,301 @@
+'''Per-stage profiling for the ciphers.
+
+Records call counts, wall time, and input/output sizes for each stage
+(`_reduce_characters`, `encrypt`, `decrypt`, `_group_text`,
+`_ungroup_text`) of each cipher class, and of the one-time pad
+(`apply_one_time_pad`, and `encrypt` and `decrypt`, which apply the pad
+and a cipher together).
+
+Times are inclusive: the time for `encrypt` includes the time spent in
+any `_reduce_characters` or `_group_text` calls it makes.
+
+Profiling is off unless turned on, either with the context manager:
+
+    with Profile() as profile:
+        Caesar().encrypt(text)
+    print(profile.report())
+
+or by setting the CIPHER_PROFILE environment variable (to anything other
+than '', '0' or 'no') before running secret_messages.py, which then prints
+the report when the program ends.
+
+For a closer look at one cipher setting, the cprofile subcommand runs a
+cipher from secret_messages.VALID_CIPHERS under cProfile and prints the
+functions it spent its time in. It can also write the pstats data, and
+the call stacks in the collapsed format that flamegraph tools read:
+
+    python profiling.py cprofile t --set num_rails=10 --size 100KB \
+        --engine python --collapsed rails.folded
+    flamegraph.pl rails.folded > rails.svg
+
+Running the file with no subcommand (or with 'stages') prints the stage
+report for a sample run of every cipher.
+'''
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import sys
+import time
+
+import instrumentation
+
+
+ENVIRONMENT_VARIABLE = 'CIPHER_PROFILE'
+
+
+class Profile:
+    def __init__(self):
+        self.stats = {}
+
+    def start(self):
+        instrumentation.add_observer(self._record)
+        return self
+
+    def stop(self):
+        instrumentation.remove_observer(self._record)
+
+    def as_dict(self):
+        '''returns the recorded stats as a nested dictionary of
+        {cipher_name: {stage: {'calls', 'errors', 'seconds', 'size_in',
+        'size_out'}}}
+        '''
+        output = {}
+        for (cipher_name, stage), stats in self.stats.items():
+            output.setdefault(cipher_name, {})[stage] = dict(stats)
+        return output
+
+    def report(self):
+        '''returns the recorded stats as a printable table'''
+        headings = ('cipher', 'stage', 'calls', 'errors', 'total s',
+                    'mean ms', 'chars in', 'chars out')
+        rows = []
+        for (cipher_name, stage), stats in sorted(self.stats.items()):
+            mean = stats['seconds'] / stats['calls'] * 1000
+            rows.append((cipher_name,
+                         stage,
+                         str(stats['calls']),
+                         str(stats['errors']),
+                         '{:.6f}'.format(stats['seconds']),
+                         '{:.4f}'.format(mean),
+                         str(stats['size_in']),
+                         str(stats['size_out'])))
+        widths = [len(heading) for heading in headings]
+        for row in rows:
+            widths = [max(width, len(cell)) for width, cell in zip(widths,
+                                                                    row)]
+        lines = []
+        for row in [headings] + rows:
+            cells = [cell.ljust(width) for cell, width in zip(row, widths)]
+            lines.append("  ".join(cells).rstrip())
+        lines.insert(1, "  ".join(['-' * width for width in widths]))
+        return "\n".join(lines)
+
+    def _record(self, cipher_name, stage, seconds, size_in, size_out, error):
+        key = (cipher_name, stage)
+        if key not in self.stats:
+            self.stats[key] = {'calls': 0,
+                               'errors': 0,
+                               'seconds': 0.0,
+                               'size_in': 0,
+                               'size_out': 0}
+        stats = self.stats[key]
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+        stats['size_in'] += size_in
+        stats['size_out'] += size_out
+        if error is not None:
+            stats['errors'] += 1
+
+    # Dunder methods
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def profile_from_environment():
+    '''returns a started Profile if the CIPHER_PROFILE environment variable
+    is set, otherwise None
+    '''
+    value = os.environ.get(ENVIRONMENT_VARIABLE, '')
+    if value.lower() in ['', '0', 'no']:
+        return None
+    return Profile().start()
+
+
+class StackRecorder:
+    '''A sys.setprofile hook that adds up the time spent in each distinct
+    call stack (excluding the time spent in the functions it calls), for
+    writing out in the collapsed stack format
+    '''
+    def __init__(self):
+        self.stack = []
+        self.totals = {}
+        self.last = None
+
+    def run(self, function, *args):
+        '''calls function(*args) with the hook in place and returns its
+        result
+        '''
+        self.last = time.perf_counter()
+        sys.setprofile(self._event)
+        try:
+            return function(*args)
+        finally:
+            sys.setprofile(None)
+
+    def collapsed(self):
+        '''returns the stacks as lines of 'outer;...;inner microseconds',
+        slowest first
+        '''
+        lines = []
+        for stack, seconds in sorted(self.totals.items(),
+                                     key=lambda item: -item[1]):
+            microseconds = int(seconds * 1000000)
+            if microseconds > 0:
+                lines.append("{} {}".format(";".join(stack), microseconds))
+        return lines
+
+    def _event(self, frame, event, arg):
+        now = time.perf_counter()
+        if self.stack:
+            stack = tuple(self.stack)
+            self.totals[stack] = self.totals.get(stack, 0) + now - self.last
+        if event == 'call':
+            code = frame.f_code
+            self.stack.append("{}:{}".format(
+                os.path.basename(code.co_filename), code.co_name))
+        elif event == 'c_call':
+            self.stack.append(getattr(arg, '__qualname__', repr(arg)))
+        elif self.stack:  # 'return', 'c_return' or 'c_exception'
+            self.stack.pop()
+        self.last = time.perf_counter()
+
+
+def profile_cipher(cipher, process, text, sort='cumulative', limit=30):
+    '''runs cipher.encrypt(text) (or decrypt, if process is 'd') under
+    cProfile, and then again under a StackRecorder.
+    Returns the pstats summary (as text), the pstats.Stats and the
+    collapsed stack lines
+    '''
+    function = cipher.encrypt if process == 'e' else cipher.decrypt
+
+    profiler = cProfile.Profile()
+    profiler.runcall(function, text)
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+    recorder = StackRecorder()
+    recorder.run(function, text)
+    return output.getvalue(), stats, recorder.collapsed()
+
+
+def run_stages():
+    '''prints the stage report for a sample run of every cipher'''
+    from caesar import Caesar
+    from keyword_cipher import Keyword
+    from transposition import Transposition
+    from polybius_square import PolybiusSquare
+    from adfgvx import Adfgvx
+    from one_time_pad import OneTimePad
+
+    plaintext = 'the quick brown fox jumps over the lazy dog' * 100
+    with Profile() as profile:
+        for cipher_class in [Caesar, Keyword, Transposition, PolybiusSquare,
+                             Adfgvx]:
+            cipher = cipher_class()
+            cipher.decrypt(cipher.encrypt(plaintext))
+        pad_numbers = ",".join(['3'] * len(plaintext))
+        pad = OneTimePad(pad_numbers, plaintext, {'name': 'Caesar'}, 'e')
+        pad.apply_one_time_pad(plaintext, Caesar())
+        pad.decrypt(pad.encrypt(plaintext, Caesar()), Caesar())
+    print(profile.report())
+
+
+def run_cprofile(options):
+    '''the cprofile subcommand (see main)'''
+    # imported here, as these modules import the ciphers (and
+    # secret_messages imports this module)
+    import benchmark
+    import engines
+    from secret_messages import VALID_CIPHERS, create_cipher
+
+    cipher_entry = VALID_CIPHERS[options.cipher]
+    settings = dict(setting.split('=', 1) for setting in options.set)
+    cipher = create_cipher(options.cipher, settings, options.process)
+
+    if options.input is not None:
+        with open(options.input, encoding='utf-8') as file:
+            text = file.read()
+    else:
+        text = benchmark.generate_text(benchmark.parse_size(options.size))
+    if options.process == 'd':
+        # profile decrypting what this cipher makes of the text
+        text = cipher.encrypt(text)
+
+    engines.force(options.engine)
+    summary, stats, collapsed = profile_cipher(cipher, options.process, text,
+                                               options.sort, options.limit)
+    engines.force(None)
+
+    print("{} {} ({} characters, engine: {})\n".format(
+        cipher_entry['name'], settings, len(text),
+        options.engine or 'automatic'))
+    print(summary)
+    if options.pstats is not None:
+        stats.dump_stats(options.pstats)
+        print("pstats data written to {}".format(options.pstats))
+    if options.collapsed is not None:
+        with open(options.collapsed, 'w') as file:
+            file.write("\n".join(collapsed) + "\n")
+        print("Collapsed stacks written to {}".format(options.collapsed))
+    return 0
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Profile the ciphers")
+    subcommands = parser.add_subparsers(dest='command')
+    subcommands.add_parser('stages',
+                           help="stage report for a sample of every cipher")
+
+    cprofile = subcommands.add_parser(
+        'cprofile', help="run one cipher setting under cProfile")
+    cprofile.add_argument('cipher', help="a cipher id from VALID_CIPHERS, "
+                                         "e.g. t for Transposition")
+    cprofile.add_argument('--set', nargs='+', default=[],
+                          metavar='NAME=VALUE',
+                          help="cipher parameters, e.g. num_rails=10")
+    cprofile.add_argument('--process', choices=['e', 'd'], default='e',
+                          help="encrypt or decrypt (default: e)")
+    cprofile.add_argument('--size', default='100KB',
+                          help="size of the generated input "
+                               "(default: 100KB)")
+    cprofile.add_argument('--input', default=None,
+                          help="profile the text in this file instead")
+    cprofile.add_argument('--engine', choices=['python', 'table'],
+                          default=None,
+                          help="force an engine (see engines.py)")
+    cprofile.add_argument('--sort', default='cumulative',
+                          help="pstats sort key (default: cumulative)")
+    cprofile.add_argument('--limit', type=int, default=30,
+                          help="number of functions to list (default: 30)")
+    cprofile.add_argument('--pstats', default=None,
+                          help="write the pstats data to this file")
+    cprofile.add_argument('--collapsed', default=None,
+                          help="write collapsed stacks (for flamegraph "
+                               "tools) to this file")
+    options = parser.parse_args(arguments)
+
+    if options.command == 'cprofile':
+        return run_cprofile(options)
+    run_stages()
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+'''A cache of cipher results, for messages that are sent again and again.
+
+Results are stored under a hash of the cipher's class, its settings, the
+direction (encrypt or decrypt) and the text, so the same message with the
+same settings is only ever processed once.
+
+    cache = ResultCache(max_bytes=64 * 1024 * 1024)
+    ciphertext = cache.encrypt(Keyword('SECRET'), 'heartbeat')
+    print(cache.stats())
+
+The in-memory cache holds at most max_bytes of results, dropping the least
+recently used ones when it is full. Giving a path adds a second tier in
+an SQLite database, which other processes can share: results missing
+from memory are looked for there, and new results are written to both.
+
+A one-time pad changes the result for every message, so whenever a pad
+is given the cache is bypassed and nothing is stored.
+'''
+import collections
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+from ciphers import Cipher
+
+
+MAX_BYTES = 64 * 1024 * 1024
+
+# attributes that hold what a cipher was working on last time, rather
+# than its settings
+TRANSIENT_ATTRIBUTES = ['rails']
+
+# how often (in results stored) to check the size of the SQLite tier
+DISK_CHECK_EVERY = 100
+
+
+class ResultCache:
+    def __init__(self, max_bytes=MAX_BYTES, path=None, max_disk_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.counts = {'hits': 0,
+                       'disk_hits': 0,
+                       'misses': 0,
+                       'bypassed': 0,
+                       'evictions': 0}
+        self.database = None
+        self._stored = 0
+        if path is not None:
+            self.database = sqlite3.connect(path, timeout=30,
+                                            check_same_thread=False)
+            self.database.execute("PRAGMA journal_mode=WAL")
+            self.database.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT, used REAL)")
+            self.database.commit()
+
+    def encrypt(self, cipher, plaintext, pad=None):
+        '''returns cipher.encrypt(plaintext), applying the one-time pad
+        first if one is given (as the menu does)
+        '''
+        if _has_pad(pad):
+            self._count('bypassed')
+            return pad.encrypt(plaintext, cipher)
+        return self._lookup(cipher, 'encrypt', plaintext, cipher.encrypt)
+
+    def decrypt(self, cipher, ciphertext, pad=None):
+        '''returns cipher.decrypt(ciphertext), taking the one-time pad off
+        afterwards if one is given (as the menu does)
+        '''
+        if _has_pad(pad):
+            self._count('bypassed')
+            return pad.decrypt(ciphertext, cipher)
+        return self._lookup(cipher, 'decrypt', ciphertext, cipher.decrypt)
+
+    def stats(self):
+        '''returns a dictionary of the hit and miss counts, the hit ratio
+        (of the lookups that were not bypassed) and the memory in use
+        '''
+        with self.lock:
+            stats = dict(self.counts)
+            stats['entries'] = len(self.entries)
+            stats['bytes'] = self.size
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        if lookups:
+            stats['hit_ratio'] = (stats['hits'] + stats['disk_hits']) / lookups
+        else:
+            stats['hit_ratio'] = 0.0
+        return stats
+
+    def clear(self):
+        '''empties the in-memory cache (the SQLite tier is kept)'''
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def close(self):
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+    # Helper methods
+    def _lookup(self, cipher, direction, text, process):
+        key = cache_key(cipher, direction, text)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.counts['hits'] += 1
+                return self.entries[key]
+
+        result = self._load(key)
+        if result is not None:
+            self._count('disk_hits')
+        else:
+            self._count('misses')
+            result = process(text)
+            self._save(key, result)
+        self._remember(key, result)
+        return result
+
+    def _remember(self, key, result):
+        '''adds a result to the in-memory cache, dropping the least
+        recently used results to make room
+        '''
+        size = sys.getsizeof(result)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = result
+            self.size += size
+            while self.size > self.max_bytes:
+                _, dropped = self.entries.popitem(last=False)
+                self.size -= sys.getsizeof(dropped)
+                self.counts['evictions'] += 1
+
+    def _load(self, key):
+        if self.database is None:
+            return None
+        with self.lock:
+            row = self.database.execute(
+                "SELECT value FROM results WHERE key = ?", (key, )).fetchone()
+            if row is None:
+                return None
+            self.database.execute("UPDATE results SET used = ? WHERE key = ?",
+                                  (time.time(), key))
+            self.database.commit()
+        return row[0]
+
+    def _save(self, key, result):
+        if self.database is None:
+            return
+        with self.lock:
+            self.database.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                (key, result, time.time()))
+            self.database.commit()
+            self._stored += 1
+            if (self.max_disk_bytes is not None and
+                    self._stored % DISK_CHECK_EVERY == 0):
+                self._trim_database()
+
+    def _trim_database(self):
+        '''deletes the least recently used results from the SQLite tier
+        until it is within max_disk_bytes
+        '''
+        total, = self.database.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM results").fetchone()
+        if total <= self.max_disk_bytes:
+            return
+        rows = self.database.execute(
+            "SELECT key, LENGTH(value) FROM results ORDER BY used")
+        expired = []
+        for key, length in rows:
+            if total <= self.max_disk_bytes:
+                break
+            expired.append((key, ))
+            total -= length
+        self.database.executemany("DELETE FROM results WHERE key = ?",
+                                  expired)
+        self.database.commit()
+
+    def _count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    # Dunder methods
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        text = "ResultCache (entries: {}, bytes: {}, max_bytes: {})"
+        return text.format(len(self.entries), self.size, self.max_bytes)
+
+
+def cache_key(cipher, direction, text):
+    '''returns the hash that a result is stored under'''
+    settings = json.dumps([type(cipher).__name__, cipher_settings(cipher),
+                           direction], sort_keys=True)
+    digest = hashlib.sha256(settings.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+def cipher_settings(cipher):
+    '''returns the cipher's settings (its public attributes, including
+    those of any ciphers it uses) in a form that can be turned into JSON
+    '''
+    settings = {}
+    for name, value in vars(cipher).items():
+        if name.startswith('_') or name in TRANSIENT_ATTRIBUTES:
+            continue
+        settings[name] = _plain(value)
+    return settings
+
+
+# Helper functions
+def _plain(value):
+    if isinstance(value, Cipher):
+        return [type(value).__name__, cipher_settings(value)]
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def _has_pad(pad):
+    return pad is not None and pad.pad_numbers is not None
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    from caesar import Caesar
+    from keyword_cipher import Keyword
+
+    messages = ['heartbeat', 'status ok', 'heartbeat', 'heartbeat',
+                'status ok', 'alert: disk full'] * 100
+    cache = ResultCache(max_bytes=1024)
+    for cipher in [Caesar(), Keyword('SECRET')]:
+        for message in messages:
+            ciphertext = cache.encrypt(cipher, message)
+            assert cache.decrypt(cipher, ciphertext) == cipher.decrypt(
+                ciphertext)
+    print(cache)
+    print(cache.stats())
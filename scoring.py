@@ -0,0 +1,54 @@
+'''Scores how much a text looks like English, for ranking the candidate
+plaintexts of a key search.
+
+score combines two things, each averaged over the letters of the text:
+- how likely each letter is in English (so it tells a substitution that
+  has the letters right from one that does not)
+- how often the most common English bigrams appear (so it tells a
+  transposition that has the letters in the right order from one that
+  only has the right letters)
+Higher is more English-like. Anything that is not a letter is ignored.
+'''
+import math
+
+
+# percentage of each letter in English text
+ENGLISH_FREQUENCIES = {
+    'a': 8.17, 'b': 1.49, 'c': 2.78, 'd': 4.25, 'e': 12.70, 'f': 2.23,
+    'g': 2.02, 'h': 6.09, 'i': 6.97, 'j': 0.15, 'k': 0.77, 'l': 4.03,
+    'm': 2.41, 'n': 6.75, 'o': 7.51, 'p': 1.93, 'q': 0.10, 'r': 5.99,
+    's': 6.33, 't': 9.06, 'u': 2.76, 'v': 0.98, 'w': 2.36, 'x': 0.15,
+    'y': 1.97, 'z': 0.07,
+}
+
+# percentage of the most common bigrams in English text
+COMMON_BIGRAMS = {
+    'th': 3.56, 'he': 3.07, 'in': 2.43, 'er': 2.05, 'an': 1.99, 're': 1.85,
+    'on': 1.76, 'at': 1.49, 'en': 1.45, 'nd': 1.35, 'ti': 1.34, 'es': 1.34,
+    'or': 1.28, 'te': 1.20, 'of': 1.17, 'ed': 1.17, 'is': 1.13, 'it': 1.12,
+    'al': 1.09, 'ar': 1.07, 'st': 1.05, 'to': 1.04, 'nt': 1.04, 'ng': 0.95,
+    'se': 0.93, 'ha': 0.93, 'as': 0.87, 'ou': 0.87, 'io': 0.83, 'le': 0.83,
+    've': 0.83, 'co': 0.79, 'me': 0.79, 'de': 0.76, 'hi': 0.76, 'ri': 0.73,
+    'ro': 0.73, 'ic': 0.70, 'ne': 0.69, 'ea': 0.69, 'ra': 0.69, 'ce': 0.65,
+}
+
+# how much the bigrams count for, against the letters
+BIGRAM_WEIGHT = 1.0
+
+# the log-probability of each letter
+_LETTER_SCORES = {letter: math.log(percentage / 100)
+                  for letter, percentage in ENGLISH_FREQUENCIES.items()}
+
+
+def score(text):
+    '''returns how English-like the letters of text are (higher is more
+    English-like), or minus infinity if it has no letters
+    '''
+    letters = [character for character in text.lower()
+               if character in _LETTER_SCORES]
+    if not letters:
+        return -math.inf
+    letter_score = sum(_LETTER_SCORES[letter] for letter in letters)
+    bigram_score = sum(COMMON_BIGRAMS.get(first + second, 0)
+                       for first, second in zip(letters, letters[1:]))
+    return (letter_score + BIGRAM_WEIGHT * bigram_score) / len(letters)
@@ -0,0 +1,306 @@
+'''Resumable encryption of large files.
+
+Caesar, Keyword and PolybiusSquare encrypt each character on its own,
+and a one-time pad only needs to know how far into the pad it is. So a
+file can be encrypted a chunk at a time, and the work done so far can be
+described by a handful of numbers:
+- input_offset: how many bytes of the input file have been read
+- output_offset: how many bytes of the output file have been written
+- group_phase: how many characters have been written (grouping spaces
+  not included), which decides where the next grouping space goes
+- pad_offset: how many numbers of the one-time pad have been used
+- carry: the bytes at the end of the input read so far that are the
+  start of a UTF-8 character that has not been completed yet
+
+StreamEncryptor keeps track of these as it encrypts each piece of a
+text, and encrypt_file writes them to a checkpoint file every few
+chunks. If the process is stopped, calling encrypt_file again with the
+same arguments picks up from the last checkpoint, and the output is
+byte-for-byte the same as if it had never been stopped (and the same as
+encrypting the whole text with cipher.encrypt). The checkpoint is
+removed once the file is finished.
+
+The checkpoint also holds a fingerprint of the cipher's settings (all of
+them, as result_cache.cipher_settings gives them) and of the pad (a
+digest of its numbers, or of its seed's key, so the pad itself is not
+written out), and encrypt_file refuses to resume from a checkpoint made
+with different ones, as the output so far would not match.
+
+Example:
+    encrypt_file('huge.txt', 'huge.enc', Keyword('PRIVACY'),
+                 checkpoint_path='huge.enc.checkpoint')
+
+or from the command line:
+    python streaming.py huge.txt huge.enc --cipher k --set grouping=0 \
+        --pad-seed 'shared secret'
+'''
+import argparse
+import codecs
+import hashlib
+import json
+import os
+import sys
+
+from caesar import Caesar
+from ciphers import TranslationTable
+from keyword_cipher import Keyword
+from one_time_pad import Keystream, OneTimePad, SeededPad
+from polybius_square import PolybiusSquare
+from result_cache import cipher_settings
+from secret_messages import VALID_CIPHERS, create_cipher
+
+
+STREAMABLE = (Caesar, Keyword, PolybiusSquare)
+
+CHUNK_SIZE = 1024 * 1024
+CHECKPOINT_EVERY = 16
+
+CHECKPOINT_VERSION = 2
+
+
+class StreamEncryptor:
+    '''Encrypts a UTF-8 text that arrives a piece at a time (e.g. from a
+    file or a socket), giving the same result as encrypting it all at
+    once. Feed it the bytes with update, and call finish at the end.
+
+    state is a dictionary of the offsets described above, which is kept
+    up to date as the text is encrypted; passing in a saved state carries
+    on from where it left off
+    '''
+    def __init__(self, cipher, pad=None, state=None):
+        if not isinstance(cipher, STREAMABLE):
+            raise TypeError("{} cannot be streamed; use one of {}".format(
+                type(cipher).__name__,
+                ", ".join(cls.__name__ for cls in STREAMABLE)))
+        if pad is not None and pad.pad_numbers is None:
+            raise ValueError("Invalid pad: {}".format(pad.error))
+        self.cipher = cipher
+        self.pad = pad
+        self.state = state if state is not None else _initial_state({})
+        self.table = TranslationTable(cipher._encrypt_character)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.decoder.setstate((bytes.fromhex(self.state['carry']), 0))
+
+    def update(self, data, final=False):
+        '''takes the next bytes of the plaintext and returns the bytes of
+        ciphertext they make (which may be empty)
+        '''
+        state = self.state
+        text = self.decoder.decode(data, final=final)
+        if self.pad is not None and text:
+            text = self.pad.apply_one_time_pad(text, self.cipher,
+                                               pad_offset=state['pad_offset'])
+            state['pad_offset'] += len(text)
+        ciphertext = text.translate(self.table)
+        grouped = _group_chunk(ciphertext, state['group_phase'],
+                               self.cipher.grouping)
+        state['group_phase'] += len(ciphertext)
+        output = grouped.encode('utf-8')
+
+        state['input_offset'] += len(data)
+        state['output_offset'] += len(output)
+        state['carry'] = self.decoder.getstate()[0].hex()
+        return output
+
+    def finish(self):
+        '''returns the last of the ciphertext (raising a ValueError if the
+        plaintext ended part way through a UTF-8 character)
+        '''
+        return self.update(b'', final=True)
+
+
+def encrypt_file(input_path, output_path, cipher, pad=None,
+                 checkpoint_path=None, chunk_size=CHUNK_SIZE,
+                 checkpoint_every=CHECKPOINT_EVERY):
+    '''Encrypts the UTF-8 text in the file at input_path with cipher (and
+    the one-time pad, if given) and writes the ciphertext to output_path.
+    - checkpoint_path: where to keep the checkpoint (default: output_path
+      with '.checkpoint' added). If it exists, encryption resumes from it
+    - chunk_size: the number of bytes to read at a time
+    - checkpoint_every: the number of chunks between checkpoints
+    Returns the final state (see the module docstring)
+    '''
+    if checkpoint_path is None:
+        checkpoint_path = output_path + '.checkpoint'
+
+    settings = {
+        'cipher': type(cipher).__name__,
+        'fingerprint': _fingerprint(cipher, pad),
+        'input_size': os.path.getsize(input_path),
+    }
+    state = _load_checkpoint(checkpoint_path, settings)
+    if state is None:
+        state = _initial_state(settings)
+        mode = 'wb'
+    else:
+        mode = 'r+b'
+    encryptor = StreamEncryptor(cipher, pad, state)
+
+    with open(input_path, 'rb') as source, open(output_path, mode) as target:
+        source.seek(state['input_offset'])
+        target.seek(state['output_offset'])
+        target.truncate()
+
+        chunks = 0
+        finished = False
+        while not finished:
+            data = source.read(chunk_size)
+            finished = not data
+            target.write(encryptor.update(data, final=finished))
+            chunks += 1
+            if not finished and chunks % checkpoint_every == 0:
+                _save_checkpoint(checkpoint_path, target, state)
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return state
+
+
+# Helper functions
+def _initial_state(settings):
+    '''returns the state for a file that has not been started'''
+    state = dict(settings)
+    state.update({
+        'version': CHECKPOINT_VERSION,
+        'input_offset': 0,
+        'output_offset': 0,
+        'group_phase': 0,
+        'pad_offset': 0,
+        'carry': '',
+    })
+    return state
+
+
+def _fingerprint(cipher, pad):
+    '''returns a digest of the cipher's settings and the pad's identity'''
+    if pad is None or pad.pad_numbers is None:
+        pad_identity = None
+    elif isinstance(pad.pad_numbers, Keystream):
+        pad_identity = pad.pad_numbers.key.hex()
+    else:
+        pad_identity = ",".join(map(str, pad.pad_numbers))
+    document = json.dumps([type(cipher).__name__, cipher_settings(cipher),
+                           pad_identity], sort_keys=True)
+    return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+
+def _load_checkpoint(checkpoint_path, settings):
+    '''returns the state saved in the checkpoint file, or None if there is
+    no checkpoint. Raises a ValueError if the checkpoint was made with
+    different cipher settings, a different pad or for a different input
+    file
+    '''
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path) as file:
+        state = json.load(file)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError("Unsupported checkpoint version {}".format(
+            state.get('version')))
+    if state.get('fingerprint') != settings['fingerprint']:
+        raise ValueError("Checkpoint {} was made with different cipher "
+                         "settings or a different pad".format(
+                             checkpoint_path))
+    for key, value in settings.items():
+        if state.get(key) != value:
+            raise ValueError(
+                "Checkpoint {} does not match this run ({}: {!r} in the "
+                "checkpoint, {!r} now)".format(checkpoint_path, key,
+                                               state.get(key), value))
+    return state
+
+
+def _save_checkpoint(checkpoint_path, target, state):
+    '''makes sure everything written so far is on disk, then replaces the
+    checkpoint file in one step, so a checkpoint never refers to output
+    that was lost
+    '''
+    target.flush()
+    os.fsync(target.fileno())
+    temporary_path = checkpoint_path + '.tmp'
+    with open(temporary_path, 'w') as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, checkpoint_path)
+
+
+def _group_chunk(text, group_phase, grouping):
+    '''groups the next piece of a longer ciphertext, where group_phase
+    characters have already been written before it, so that the spaces
+    fall where cipher._group_text would put them for the whole text
+    '''
+    if grouping <= 0 or not text:
+        return text
+    # the start of the text finishes off the current group
+    first = -group_phase % grouping
+    pieces = [text[:first]]
+    for start in range(first, len(text), grouping):
+        pieces.append(" " + text[start:start + grouping])
+    grouped = "".join(pieces)
+    if group_phase == 0:
+        grouped = grouped[1:]
+    return grouped
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Encrypt a large file, resuming from a checkpoint if "
+                    "an earlier run was interrupted")
+    parser.add_argument('input', help="the UTF-8 text file to encrypt")
+    parser.add_argument('output', help="where to write the ciphertext")
+    streamable = [key for key, entry in VALID_CIPHERS.items()
+                  if issubclass(entry['class'], STREAMABLE)]
+    parser.add_argument('--cipher', choices=streamable, default='k',
+                        help="the cipher to use (default: k)")
+    parser.add_argument('--set', nargs='+', default=[],
+                        metavar='NAME=VALUE',
+                        help="cipher parameters, e.g. keyphrase=SECRET")
+    parser.add_argument('--checkpoint', default=None,
+                        help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="bytes to read at a time")
+    parser.add_argument('--checkpoint-every', type=int,
+                        default=CHECKPOINT_EVERY,
+                        help="chunks between checkpoints")
+    parser.add_argument('--pad', default='',
+                        help="a one-time pad of comma-separated numbers, "
+                             "at least one for each character of the input")
+    parser.add_argument('--pad-seed', default='',
+                        help="instead of --pad, a seed to work the pad "
+                             "numbers out from")
+    options = parser.parse_args(arguments)
+    if options.pad and options.pad_seed:
+        parser.error("give either --pad or --pad-seed, not both")
+
+    pad = None
+    if options.pad:
+        # the length of the input is not known until it has been read, so
+        # a pad that is too short is only found on reaching its end
+        pad = OneTimePad(options.pad, '', VALID_CIPHERS[options.cipher],
+                         'e')
+    elif options.pad_seed:
+        pad = SeededPad(options.pad_seed)
+    if pad is not None and pad.error is not None:
+        parser.error("invalid pad: {}".format(pad.error))
+    settings = dict(setting.split('=', 1) for setting in options.set)
+    try:
+        cipher = create_cipher(options.cipher, settings, 'e', pad)
+    except ValueError as error:
+        parser.error(str(error))
+    try:
+        state = encrypt_file(options.input, options.output, cipher, pad,
+                             checkpoint_path=options.checkpoint,
+                             chunk_size=options.chunk_size,
+                             checkpoint_every=options.checkpoint_every)
+    except IndexError:
+        print("The pad is shorter than the input", file=sys.stderr)
+        return 1
+    print("Encrypted {} bytes into {} bytes".format(state['input_offset'],
+                                                     state['output_offset']))
+    return 0
+
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
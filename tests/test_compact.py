@@ -0,0 +1,57 @@
+import random
+import unittest
+
+import compact
+from adfgvx import Adfgvx
+from polybius_square import PolybiusSquare
+
+
+class CompactTests(unittest.TestCase):
+    def test_round_trip_every_length(self):
+        generator = random.Random(0)
+        for symbols in ('01', '01234', '012345', 'ADFGVX'):
+            for length in range(20):
+                ciphertext = "".join(generator.choice(symbols)
+                                     for _ in range(length))
+                for grouping in (0, 1, 5):
+                    with self.subTest(symbols=symbols, length=length,
+                                      grouping=grouping):
+                        grouped = compact._group(ciphertext, grouping)
+                        packed = compact.pack(grouped, symbols, grouping)
+                        self.assertEqual(compact.unpack(packed), grouped)
+
+    def test_three_symbols_to_a_byte(self):
+        packed = compact.pack('ADFGVX' * 100, 'ADFGVX')
+        header = compact.HEADER.size + 6 + compact.COUNT.size
+        self.assertEqual(len(packed) - header, 200)
+
+    def test_cipher_output(self):
+        plaintext = 'the quick brown fox jumps over the lazy dog 0123'
+        for cipher, symbols in ((PolybiusSquare(), '012345'),
+                                (Adfgvx('PRIVACY', 5), 'ADFGVX')):
+            with self.subTest(cipher=cipher):
+                ciphertext = cipher.encrypt(plaintext)
+                packed = compact.pack(ciphertext, symbols, cipher.grouping)
+                unpacked = compact.unpack(packed)
+                self.assertEqual(unpacked, ciphertext)
+                self.assertEqual(cipher.decrypt(unpacked),
+                                 cipher.decrypt(ciphertext))
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            compact.pack('ADFQ', 'ADFGVX')
+        with self.assertRaises(ValueError):
+            compact.pack('ADF GV', 'ADFGVX', grouping=5)
+        with self.assertRaises(ValueError):
+            compact.pack('AB', 'ABCDEFG')
+        with self.assertRaises(ValueError):
+            compact.unpack(b'XXXX' + compact.pack('ADFGVX', 'ADFGVX')[4:])
+
+    def test_rejects_truncated_data(self):
+        packed = compact.pack('ADFGVX' * 10, 'ADFGVX')
+        with self.assertRaises(ValueError):
+            compact.unpack(packed[:-2])
+
+
+if __name__ == '__main__':
+    unittest.main()
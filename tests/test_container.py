@@ -0,0 +1,75 @@
+import os
+import random
+import tempfile
+import unittest
+
+from container import ContainerReader, write_container
+from one_time_pad import SeededPad
+
+
+PLAINTEXT = ('it was the best of times, it was the worst of times, it was '
+             'the age of wisdom, it was the age of foolishness 1859. ') * 3
+
+
+class ContainerTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'archive.cpk')
+
+    def check_ranges(self, reader, pad=None):
+        whole = reader.read(pad=pad)
+        self.assertEqual(len(whole), len(reader))
+        generator = random.Random(0)
+        ranges = [(0, None), (5, 6), (6, 7), (0, 7), (13, 29),
+                  (len(whole) - 1, len(whole)), (-5, 3),
+                  (len(whole) - 3, len(whole) + 10), (20, 20), (30, 10)]
+        for _ in range(50):
+            start = generator.randrange(len(whole))
+            ranges.append((start, generator.randrange(start, len(whole))))
+        for start, stop in ranges:
+            with self.subTest(start=start, stop=stop):
+                self.assertEqual(reader.read(start, stop, pad=pad),
+                                 whole[max(start, 0):stop])
+        return whole
+
+    def test_range_reads(self):
+        letters = "".join(character for character in PLAINTEXT.lower()
+                          if character.isalpha())
+        for cipher_id, parameters in (('c', {'offset': 3}),
+                                      ('k', {'keyphrase': 'SECRET'}),
+                                      ('p', {})):
+            with self.subTest(cipher=cipher_id):
+                write_container(self.path, PLAINTEXT, cipher_id,
+                                parameters, chunk_size=7)
+                with ContainerReader(self.path) as reader:
+                    whole = self.check_ranges(reader)
+                self.assertEqual(whole.replace(' ', '').lower(), letters)
+
+    def test_range_reads_with_pad(self):
+        write_container(self.path, PLAINTEXT, 'k', {'keyphrase': 'SECRET'},
+                        pad=SeededPad('shared secret'), chunk_size=7)
+        with ContainerReader(self.path) as reader:
+            with self.assertRaises(ValueError):
+                reader.read(0, 10)
+            padded = self.check_ranges(reader, SeededPad('shared secret'))
+        write_container(self.path, PLAINTEXT, 'k', {'keyphrase': 'SECRET'},
+                        chunk_size=7)
+        with ContainerReader(self.path) as reader:
+            self.assertEqual(reader.read(), padded)
+
+    def test_rejects_ciphers_and_grouping(self):
+        with self.assertRaises(ValueError):
+            write_container(self.path, PLAINTEXT, 't')
+        with self.assertRaises(ValueError):
+            write_container(self.path, PLAINTEXT, 'k', {'grouping': 5})
+
+    def test_rejects_other_files(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'not a container at all, just some bytes')
+        with self.assertRaises(ValueError):
+            ContainerReader(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
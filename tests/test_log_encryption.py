@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+
+from caesar import Caesar
+from keyword_cipher import Keyword
+from log_encryption import LineEncryptor, encrypt_log
+from one_time_pad import OneTimePad, SeededPad
+from polybius_square import PolybiusSquare
+
+
+LINES = [
+    '2026-10-19 12:00:01 INFO user logged in\n',
+    '2026-10-19 12:00:02 WARN disk at 91%\r\n',
+    '\n',
+    'café ouvert\r',
+    '2026-10-19 12:00:03 ERROR no line ending',
+]
+TEXT = "".join(LINES)
+
+
+def ciphers():
+    return [Caesar(3), Caesar(3, 0), Keyword('SECRET'), Keyword('SECRET', 0),
+            PolybiusSquare(size=6, shared_character=None, grouping=2)]
+
+
+def contents(line):
+    return line.rstrip('\r\n'), line[len(line.rstrip('\r\n')):]
+
+
+class LineEncryptorTests(unittest.TestCase):
+    def test_each_line_as_encrypt_gives_it(self):
+        for cipher in ciphers():
+            with self.subTest(cipher=cipher):
+                expected = "".join(cipher.encrypt(content) + ending
+                                   for content, ending in map(contents,
+                                                              LINES))
+                self.assertEqual(LineEncryptor(cipher).encrypt(TEXT),
+                                 expected)
+
+    def test_pad_carries_on_from_line_to_line(self):
+        for cipher in ciphers():
+            with self.subTest(cipher=cipher):
+                pad = SeededPad('shared secret')
+                expected = []
+                pad_offset = 0
+                for content, ending in map(contents, LINES):
+                    padded = pad.apply_one_time_pad(content, cipher,
+                                                    pad_offset=pad_offset)
+                    pad_offset += len(padded)
+                    expected.append(cipher.encrypt(padded) + ending)
+                encryptor = LineEncryptor(cipher, pad)
+                self.assertEqual(encryptor.encrypt(TEXT), "".join(expected))
+                self.assertEqual(encryptor.pad_offset, pad_offset)
+
+    def test_batches_do_not_matter(self):
+        for cipher in ciphers():
+            for pad in (None, SeededPad('shared secret')):
+                with self.subTest(cipher=cipher, pad=pad):
+                    whole = LineEncryptor(cipher, pad).encrypt(TEXT)
+                    encryptor = LineEncryptor(cipher, pad)
+                    pieces = [encryptor.encrypt(line) for line in LINES]
+                    self.assertEqual("".join(pieces), whole)
+
+    def test_round_trip(self):
+        for cipher in ciphers():
+            for pad in (None, SeededPad('shared secret')):
+                with self.subTest(cipher=cipher, pad=pad):
+                    ciphertext = LineEncryptor(cipher, pad).encrypt(TEXT)
+                    decrypted = LineEncryptor(cipher, pad).decrypt(
+                        ciphertext)
+                    expected = "".join(
+                        cipher.decrypt(cipher.encrypt(content)) + ending
+                        for content, ending in map(contents, LINES))
+                    # the pad gives lower case, as apply_one_time_pad does
+                    self.assertEqual(decrypted.lower(), expected.lower())
+
+    def test_short_pad(self):
+        cipher = Keyword('SECRET', 0)
+        pad = OneTimePad('1,2,3', '', {'name': 'Keyword'}, 'e')
+        encryptor = LineEncryptor(cipher, pad)
+        # the line endings take no pad numbers
+        self.assertEqual(encryptor.encrypt('abc\n\r\n'),
+                         cipher.encrypt(pad.apply_one_time_pad('abc', cipher))
+                         + '\n\r\n')
+        with self.assertRaises(IndexError):
+            encryptor.encrypt('d\n')
+
+    def test_grouped_keyword_pad_skips_spaces(self):
+        # spaces are dropped when grouping, so they take no pad numbers
+        # (they used to, when the pad was applied before the first
+        # encrypt, and the text then never decrypted past a space)
+        cipher = Keyword('SECRET', 5)
+        pad = SeededPad('shared secret')
+        self.assertEqual(pad.encrypt('hello there world', cipher),
+                         pad.encrypt('hellothereworld', cipher))
+        ciphertext = pad.encrypt('hello there world', cipher)
+        self.assertEqual(pad.decrypt(ciphertext, cipher), 'hellothereworld')
+
+    def test_encrypt_log_keeps_line_endings(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        paths = [os.path.join(directory.name, name)
+                 for name in ('app.log', 'app.log.enc', 'app.log.dec')]
+        with open(paths[0], 'w', encoding='utf-8', newline='') as file:
+            file.write(TEXT)
+        cipher = Keyword('SECRET', 0)
+        self.assertEqual(encrypt_log(paths[0], paths[1], cipher,
+                                     SeededPad('seed'), batch_size=16),
+                         len(LINES))
+        encrypt_log(paths[1], paths[2], cipher, SeededPad('seed'),
+                    encrypt_mode=False)
+        with open(paths[2], encoding='utf-8', newline='') as file:
+            self.assertEqual(file.read(),
+                             LineEncryptor(cipher).decrypt(
+                                 LineEncryptor(cipher).encrypt(TEXT)))
+
+    def test_rejects_other_ciphers(self):
+        from transposition import Transposition
+        with self.assertRaises(TypeError):
+            LineEncryptor(Transposition())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import hashlib
+import struct
+import unittest
+
+from caesar import Caesar
+from keyword_cipher import Keyword
+from one_time_pad import Keystream, OneTimePad, SeededPad
+
+
+PLAINTEXT = 'the quick brown fox jumps over the lazy dog ' * 3
+
+
+class SeededPadTests(unittest.TestCase):
+    def test_known_numbers(self):
+        # the first block is SHAKE-256 of the seed's SHA-256 and block 0
+        key = hashlib.sha256('shared secret'.encode('utf-8')).digest()
+        digest = hashlib.shake_256(key + bytes(8)).digest(16)
+        expected = list(struct.unpack('<4I', digest))
+        self.assertEqual(list(Keystream('shared secret')[0:4]), expected)
+
+    def test_same_seed_same_numbers(self):
+        size = Keystream.BLOCK_SIZE
+        first = Keystream('shared secret')
+        second = Keystream('shared secret')
+        self.assertEqual(list(first[0:3 * size]), list(second[0:3 * size]))
+        self.assertNotEqual(list(first[0:16]),
+                            list(Keystream('another secret')[0:16]))
+
+    def test_any_position(self):
+        size = Keystream.BLOCK_SIZE
+        keystream = Keystream('shared secret')
+        numbers = list(keystream[0:2 * size + 10])
+        for position in (0, 1, size - 1, size, size + 1, 2 * size + 9):
+            with self.subTest(position=position):
+                # looked up out of order, and from a fresh keystream
+                self.assertEqual(keystream[position], numbers[position])
+                self.assertEqual(Keystream('shared secret')[position],
+                                 numbers[position])
+        self.assertEqual(list(keystream.numbers(size - 3, size + 3)),
+                         numbers[size - 3:size + 3])
+
+    def test_rejects_negative_positions(self):
+        keystream = Keystream('shared secret')
+        with self.assertRaises(IndexError):
+            keystream[-1]
+        with self.assertRaises(IndexError):
+            keystream.numbers(-1, 4)
+        with self.assertRaises(ValueError):
+            keystream[0:]
+
+    def test_same_as_the_numbers_given_as_a_list(self):
+        numbers = list(Keystream('shared secret')[0:len(PLAINTEXT)])
+        listed = OneTimePad(",".join(map(str, numbers)), PLAINTEXT,
+                            {'name': 'Keyword'}, 'e')
+        for cipher in (Caesar(3), Keyword('SECRET', 0)):
+            with self.subTest(cipher=cipher):
+                seeded = SeededPad('shared secret')
+                self.assertEqual(seeded.encrypt(PLAINTEXT, cipher),
+                                 listed.encrypt(PLAINTEXT, cipher))
+                self.assertEqual(
+                    seeded.apply_one_time_pad(PLAINTEXT, cipher),
+                    listed.apply_one_time_pad(PLAINTEXT, cipher))
+
+    def test_round_trip_with_offsets(self):
+        cipher = Keyword('SECRET', 0)
+        pad = SeededPad('shared secret')
+        whole = pad.encrypt(PLAINTEXT, cipher)
+        middle = len(PLAINTEXT) // 2
+        self.assertEqual(pad.encrypt(PLAINTEXT[:middle], cipher) +
+                         pad.encrypt(PLAINTEXT[middle:], cipher,
+                                     pad_offset=middle), whole)
+        self.assertEqual(pad.decrypt(whole, cipher), PLAINTEXT)
+
+    def test_seed_checks(self):
+        self.assertIsNone(SeededPad('').pad_numbers)
+        self.assertIsNone(SeededPad('').error)
+        self.assertIsNotNone(SeededPad(42).error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from adfgvx import Adfgvx
+from caesar import Caesar
+from keyword_cipher import Keyword
+from pipeline import Pipeline
+from transposition import Transposition
+
+
+PLAINTEXTS = [
+    'the quick brown fox jumps over the lazy dog',
+    'numb3r5 and punctuat!0n',
+    'Hello Peers',
+    '',
+]
+
+
+def letters(text):
+    return "".join(character for character in text.lower()
+                   if character.isalpha())
+
+
+class PipelineTests(unittest.TestCase):
+    def stage_lists(self):
+        '''returns lists of stages made afresh, with their own grouping
+        switched off, as the pipeline runs them
+        '''
+        return [
+            [Keyword(grouping=0), Transposition(grouping=0)],
+            [Caesar(grouping=0), Keyword('PEOPLE', grouping=0),
+             Transposition(4, grouping=0), Transposition(grouping=0)],
+            [Caesar(grouping=0), Adfgvx(grouping=0)],
+        ]
+
+    def test_round_trip(self):
+        for stages in self.stage_lists():
+            for grouping in (0, 5):
+                pipeline = Pipeline(stages, grouping)
+                for plaintext in PLAINTEXTS:
+                    with self.subTest(pipeline=pipeline,
+                                      plaintext=plaintext):
+                        ciphertext = pipeline.encrypt(plaintext)
+                        decrypted = pipeline.decrypt(ciphertext)
+                        self.assertEqual(decrypted.lower(),
+                                         letters(plaintext))
+
+    def test_same_as_each_stage_in_turn(self):
+        for stages in self.stage_lists():
+            pipeline = Pipeline(stages, grouping=5)
+            for plaintext in PLAINTEXTS:
+                with self.subTest(pipeline=pipeline, plaintext=plaintext):
+                    text = plaintext
+                    for stage in stages:
+                        text = stage.encrypt(text)
+                    groups = pipeline.encrypt(plaintext).split()
+                    self.assertEqual("".join(groups), text)
+                    self.assertTrue(all(len(group) == 5
+                                        for group in groups[:-1]))
+
+    def test_permutation_cache_is_bounded(self):
+        pipeline = Pipeline([Transposition(grouping=0),
+                             Transposition(4, grouping=0)])
+        for length in range(1, 40):
+            pipeline.encrypt('a' * length)
+        self.assertEqual(len(pipeline._permutations),
+                         Pipeline.PERMUTATION_CACHE_SIZE)
+
+    def test_needs_a_stage(self):
+        with self.assertRaises(ValueError):
+            Pipeline([])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import streaming
+from caesar import Caesar
+from keyword_cipher import Keyword
+from one_time_pad import SeededPad
+from polybius_square import PolybiusSquare
+
+
+PLAINTEXT = ('the quick brown fox jumps over the lazy dog, café '
+             'déjà vu 42\n') * 40
+
+
+class Stopped(Exception):
+    pass
+
+
+class StreamingTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.input_path = os.path.join(directory.name, 'plain.txt')
+        self.output_path = os.path.join(directory.name, 'plain.enc')
+        self.checkpoint_path = self.output_path + '.checkpoint'
+        with open(self.input_path, 'w', encoding='utf-8') as file:
+            file.write(PLAINTEXT)
+
+    def encrypt(self, cipher, pad=None):
+        # an odd chunk size splits some of the UTF-8 characters
+        streaming.encrypt_file(self.input_path, self.output_path, cipher,
+                               pad, chunk_size=7, checkpoint_every=3)
+        with open(self.output_path, encoding='utf-8') as file:
+            return file.read()
+
+    def stop_after_checkpoints(self, cipher, pad=None, count=2):
+        '''starts encrypting and stops it just after count checkpoints'''
+        save = streaming._save_checkpoint
+        saved = []
+
+        def save_then_stop(*arguments):
+            save(*arguments)
+            saved.append(True)
+            if len(saved) == count:
+                raise Stopped()
+
+        with mock.patch('streaming._save_checkpoint', save_then_stop):
+            with self.assertRaises(Stopped):
+                self.encrypt(cipher, pad)
+        self.assertTrue(os.path.exists(self.checkpoint_path))
+
+    def test_whole_file_matches_encrypt(self):
+        for cipher in (Caesar(3), Keyword('SECRET'), Keyword('SECRET', 0),
+                       PolybiusSquare(grouping=2)):
+            with self.subTest(cipher=cipher):
+                self.assertEqual(self.encrypt(cipher),
+                                 cipher.encrypt(PLAINTEXT))
+                self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_whole_file_matches_pad_encrypt(self):
+        for cipher in (Caesar(3, 0), Keyword('SECRET')):
+            with self.subTest(cipher=cipher):
+                self.assertEqual(
+                    self.encrypt(cipher, SeededPad('shared secret')),
+                    SeededPad('shared secret').encrypt(PLAINTEXT, cipher))
+
+    def test_resume_gives_the_same_output(self):
+        for cipher, pad in ((Keyword('SECRET'), None),
+                            (Caesar(3, 0), SeededPad('shared secret')),
+                            (Keyword('SECRET', 0), SeededPad('seed'))):
+            with self.subTest(cipher=cipher, pad=pad):
+                expected = self.encrypt(cipher, pad)
+                for count in (1, 4):
+                    self.stop_after_checkpoints(cipher, pad, count)
+                    self.assertEqual(self.encrypt(cipher, pad), expected)
+                    self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_refuses_a_different_cipher_or_pad(self):
+        pad = SeededPad('shared secret')
+        self.stop_after_checkpoints(Keyword('SECRET', 0), pad)
+        for cipher, other_pad in ((Keyword('OTHER', 0), pad),
+                                  (Keyword('SECRET', 5), pad),
+                                  (Caesar(3, 0), pad),
+                                  (Keyword('SECRET', 0), None),
+                                  (Keyword('SECRET', 0),
+                                   SeededPad('another secret'))):
+            with self.subTest(cipher=cipher, pad=other_pad):
+                with self.assertRaises(ValueError):
+                    self.encrypt(cipher, other_pad)
+        self.encrypt(Keyword('SECRET', 0), SeededPad('shared secret'))
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
-from ciphers import Cipher
+import itertools
+
+import engines
+from ciphers import Cipher, TranslationTable
 
 
 class Transposition(Cipher):
@@ -18,6 +21,7 @@ class Transposition(Cipher):
         self.grouping = grouping
         self.PASSTHROUGH_CHARACTERS = []
 
+    @engines.dispatch('encrypt_many')
     def encrypt(self, plaintext):
         '''Takes a string and returns an encrypted string
         '''
@@ -28,6 +32,7 @@ class Transposition(Cipher):
         grouped_text = self._group_text(flattened_text)
         return grouped_text
 
+    @engines.dispatch('decrypt_many')
     def decrypt(self, ciphertext):
         '''Takes an encrypted string and returns an decrypted string
         '''
@@ -44,6 +49,68 @@ class Transposition(Cipher):
         plaintext = self._get_plaintext_from_rails(len(ungrouped))
         return plaintext
 
+    def encrypt_many(self, plaintexts):
+        '''Takes a sequence of strings and returns a list of the encrypted
+        strings. The rail pattern is worked out once for each distinct
+        message length, so a batch of same-length messages shares a single
+        permutation
+        '''
+        def reduce_character(character):
+            if character.lower() in self.VALID_CHARACTERS:
+                return character.lower()
+            return ''
+
+        table = TranslationTable(reduce_character)
+        permutations = {}
+        ciphertexts = []
+        for plaintext in plaintexts:
+            plaintext = plaintext.translate(table)
+            length = len(plaintext)
+            if length not in permutations:
+                permutations[length] = self._permutation(length)
+            ciphertext = self._gather(plaintext, permutations[length])
+            ciphertexts.append(self._group_text(ciphertext))
+        return ciphertexts
+
+    def decrypt_many(self, ciphertexts):
+        '''Takes a sequence of encrypted strings and returns a list of the
+        decrypted strings, working out the rail pattern once for each
+        distinct message length
+        '''
+        inverses = {}
+        plaintexts = []
+        for ciphertext in ciphertexts:
+            ungrouped = self._ungroup_text(ciphertext)
+            length = len(ungrouped)
+            if length not in inverses:
+                inverses[length] = self._inverse_permutation(length)
+            plaintexts.append(self._gather(ungrouped, inverses[length]))
+        return plaintexts
+
+    def decrypt_range(self, ciphertext, start, stop=None):
+        '''Takes a string encrypted by this cipher (grouped as encrypt
+        grouped it) and returns the part of the plaintext from position
+        start up to (but not including) stop, without decrypting the rest.
+        Only the ciphertext characters that are needed are read, so
+        previewing the start of a long message is cheap
+        '''
+        length = self._ungrouped_length(ciphertext)
+        if stop is None or stop > length:
+            stop = length
+        start = max(start, 0)
+        if start >= stop:
+            return ""
+
+        rail_starts = self._rail_starts(length)
+        characters = []
+        for index in range(start, stop):
+            position = self._cipher_index(index, rail_starts)
+            if self.grouping > 0:
+                # skip the spaces between the groups before this position
+                position += position // self.grouping
+            characters.append(ciphertext[position])
+        return "".join(characters)
+
     # Helper methods
     def _initialise_rails(self, plaintext):
         '''creates the appropriate number of empty rails with the length
@@ -129,6 +196,96 @@ class Transposition(Cipher):
                     rail_number -= 1
         return plaintext
 
+    def _rail_for_index(self, index):
+        '''Works out which rail the character at position `index` of the
+        plaintext is written to, without building the rails. The rail
+        pattern repeats every 2 * (num_rails - 1) characters, e.g., with
+        three rails: 0, 1, 2, 1, 0, 1, 2, ...
+        '''
+        if self.num_rails < 2:
+            return 0
+        cycle = 2 * (self.num_rails - 1)
+        position = index % cycle
+        if position < self.num_rails:
+            return position
+        return cycle - position
+
+    def _permutation(self, length):
+        '''Returns a list giving, for each position in the ciphertext, the
+        position in the plaintext that the character came from
+        (i.e., ciphertext[k] == plaintext[permutation[k]])
+        '''
+        if self.num_rails < 2:
+            return list(range(length))
+        # each rail holds every cycle'th character, starting from the rail
+        # number (and, for the middle rails, from cycle - rail number too)
+        cycle = 2 * (self.num_rails - 1)
+        permutation = []
+        for rail in range(self.num_rails):
+            indices = range(rail, length, cycle)
+            if 0 < rail < self.num_rails - 1:
+                indices = sorted(itertools.chain(
+                    indices, range(cycle - rail, length, cycle)))
+            permutation.extend(indices)
+        return permutation
+
+    def _inverse_permutation(self, length):
+        '''Returns a list giving, for each position in the plaintext, the
+        position in the ciphertext that holds that character
+        '''
+        inverse = [0] * length
+        for position, index in enumerate(self._permutation(length)):
+            inverse[index] = position
+        return inverse
+
+    def _count_below(self, stop, remainder, cycle):
+        '''counts the positions below stop that are equal to remainder
+        modulo cycle
+        '''
+        if stop <= remainder:
+            return 0
+        return (stop - remainder + cycle - 1) // cycle
+
+    def _rail_count(self, rail, stop):
+        '''counts how many of the plaintext positions below stop are
+        written to the given rail. The top and bottom rails get one
+        character per cycle, the others get two
+        '''
+        if self.num_rails < 2:
+            return stop
+        cycle = 2 * (self.num_rails - 1)
+        count = self._count_below(stop, rail, cycle)
+        if 0 < rail < self.num_rails - 1:
+            count += self._count_below(stop, cycle - rail, cycle)
+        return count
+
+    def _rail_starts(self, length):
+        '''Returns a list giving, for each rail, the position in the
+        (ungrouped) ciphertext of the first character on that rail
+        '''
+        rail_starts = [0]
+        for rail in range(self.num_rails - 1):
+            rail_starts.append(rail_starts[-1] +
+                               self._rail_count(rail, length))
+        return rail_starts
+
+    def _cipher_index(self, index, rail_starts):
+        '''Works out the position in the (ungrouped) ciphertext of the
+        character at position `index` of the plaintext: the start of its
+        rail plus the number of earlier characters on the same rail
+        '''
+        rail = self._rail_for_index(index)
+        return rail_starts[rail] + self._rail_count(rail, index)
+
+    def _ungrouped_length(self, ciphertext):
+        '''works out the length of the ciphertext without its grouping
+        spaces, from the length of the grouped text (each full group but
+        the last is followed by a space)
+        '''
+        if self.grouping > 0:
+            return len(ciphertext) - len(ciphertext) // (self.grouping + 1)
+        return len(ciphertext)
+
     def _pretty_print_rails(self):
         '''Convenience method for when debugging, displays the text in
         the rails in a readable fashion
@@ -141,7 +298,7 @@ class Transposition(Cipher):
     # Dunder methods
     def __repr__(self):
         text = "Transposition (rail fence) Cipher (rails: {}, grouping: {})"
-        print(text.format(self.num_rails, self.grouping))
+        return text.format(self.num_rails, self.grouping)
 
 # -----------------------------------------------------------------
 